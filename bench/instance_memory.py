@@ -0,0 +1,57 @@
+import argparse
+import sys
+import tracemalloc
+from pathlib import Path
+from typing import Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from PyLox.lox_class import LoxClass, LoxInstance
+from PyLox.tokenclass import Token, TokenType
+
+
+class DictInstance:
+    # The representation LoxInstance had before shapes: a reference to the class and a dictionary of fields per instance
+    def __init__(self, klass: LoxClass):
+        self.klass: LoxClass = klass
+        self.fields: dict[str, object] = {}
+
+    def set(self, name: Token, value: object) -> None:
+        self.fields[name.lexeme] = value
+
+
+def measure(factory: Callable[[LoxClass], object], count: int, names: list[Token]) -> int:
+    # Returns the number of bytes held by "count" instances with the given fields
+    klass: LoxClass = LoxClass("Point", None, {})
+    tracemalloc.start()
+    instances: list[object] = []
+
+    for i in range(count):
+        instance = factory(klass)
+        for name in names:
+            instance.set(name, float(i))
+        instances.append(instance)
+
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size
+
+
+def main() -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description="Compares the memory used by instances with dictionary-based and shape-based field storage.")
+    parser.add_argument("-n", "--count", type=int, default=100_000, help="number of instances")
+    parser.add_argument("-f", "--fields", type=int, default=4, help="number of fields per instance")
+    args: argparse.Namespace = parser.parse_args()
+
+    names: list[Token] = [Token(TokenType.IDENTIFIER, f"field{i}", None, 1) for i in range(args.fields)]
+    print(f"{args.count} instances, {args.fields} fields each")
+
+    baseline: int = measure(DictInstance, args.count, names)
+    shaped: int = measure(LoxInstance, args.count, names)
+    for label, size in (("dict", baseline), ("shape", shaped)):
+        print(f"{label:6} {size / 2 ** 20:8.2f} MiB {size / args.count:8.1f} B/instance {size / baseline:6.0%}")
+
+
+if __name__ == "__main__":
+    main()
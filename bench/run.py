@@ -0,0 +1,223 @@
+import argparse
+import contextlib
+import gc
+import io
+import json
+import math
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable
+
+BENCH_DIRECTORY: Path = Path(__file__).resolve().parent
+REPOSITORY: Path = BENCH_DIRECTORY.parent
+
+
+def parse_arguments() -> argparse.Namespace:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description="Runs the Lox programs of the benchmark suite and reports how long they take and how much memory "
+                    "they use, for one or more engines and git revisions.")
+    parser.add_argument("programs", nargs="*", metavar="program",
+                        help="benchmarks to run, by name (e.g. fib) or path (default: every .lox file in bench/)")
+    parser.add_argument("-n", "--repeat", type=int, default=5, help="timed runs per benchmark (default: 5)")
+    parser.add_argument("--engine", action="append", choices=["tree", "closure", "vm"],
+                        help="engine to run the benchmarks with, may be repeated to compare engines (default: tree)")
+    parser.add_argument("--revision", action="append", metavar="REV",
+                        help="git revision to run the benchmarks on, may be repeated to compare revisions; "
+                             "'.' is the working tree (default: the working tree)")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="skip the run that measures peak memory, which is slowed down by tracing allocations")
+    parser.add_argument("--json", metavar="FILE", help="also write the results as JSON to FILE, - for the standard "
+                                                       "output instead of the report")
+    parser.add_argument("--src", metavar="DIR", default=str(REPOSITORY / "src"), help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def find_programs(names: list[str]) -> list[Path]:
+    if not names:
+        return sorted(BENCH_DIRECTORY.glob("*.lox"))
+
+    programs: list[Path] = []
+    for name in names:
+        path: Path = Path(name) if name.endswith(".lox") else BENCH_DIRECTORY / f"{name}.lox"
+        if not path.is_file():
+            sys.exit(f"No benchmark {name}")
+        programs.append(path.resolve())
+
+    return programs
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    # Nearest-rank percentile, which is one of the samples even when there are only a few of them
+    ordered: list[float] = sorted(samples)
+    return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+
+def interpreter_factory(engine: str) -> Callable[[], object] | None:
+    # How to make an interpreter running the engine with the sources being measured, or None if they don't have it:
+    # revisions from before the other engines were added only have the tree-walking interpreter, made by Lox()
+    from PyLox import pylox
+
+    if hasattr(pylox, "Engine"):
+        return lambda: pylox.Lox(pylox.Engine(engine))
+    if engine == "tree":
+        return pylox.Lox
+
+    return None
+
+
+def run_once(program: Path, engine: str, make_interpreter: Callable[[], object]) -> tuple[float, str]:
+    # A fresh interpreter for every run, so that runs don't share globals. Output is kept out of the report (and of the
+    # timing, as far as possible) by collecting it in memory
+    lox = make_interpreter()
+    output: io.StringIO = io.StringIO()
+
+    with contextlib.redirect_stdout(output):
+        start: float = time.perf_counter()
+        try:
+            lox.run_file(str(program))
+        except SystemExit:
+            sys.exit(f"{program.name} failed on the {engine} engine")
+        elapsed: float = time.perf_counter() - start
+
+    return elapsed, output.getvalue()
+
+
+def measure(program: Path, engine: str, make_interpreter: Callable[[], object], repeat: int, memory: bool) -> dict:
+    run_once(program, engine, make_interpreter)  # Warm-up: imports, caches of the host Python
+
+    collections: int = sum(stats["collections"] for stats in gc.get_stats())
+    times: list[float] = []
+    output: str = ""
+    for _ in range(repeat):
+        elapsed, output = run_once(program, engine, make_interpreter)
+        times.append(elapsed)
+    collections = sum(stats["collections"] for stats in gc.get_stats()) - collections
+
+    result: dict = {
+        "program": program.stem,
+        "engine": engine,
+        "times": times,
+        "median": statistics.median(times),
+        "p95": percentile(times, 0.95),
+        "collections": collections / repeat,
+        "peak": None,
+        "output": output.strip()
+    }
+
+    if memory:
+        tracemalloc.start()
+        run_once(program, engine, make_interpreter)
+        result["peak"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return result
+
+
+def run_here(arguments: argparse.Namespace, programs: list[Path], engines: list[str]) -> list[dict]:
+    sys.path.insert(0, arguments.src)
+    sys.setrecursionlimit(10_000)
+
+    results: list[dict] = []
+    for engine in engines:
+        make_interpreter: Callable[[], object] | None = interpreter_factory(engine)
+        if make_interpreter is None:
+            print(f"Skipping the {engine} engine, which these sources don't have", file=sys.stderr)
+            continue
+
+        results.extend(measure(program, engine, make_interpreter, arguments.repeat, not arguments.no_memory)
+                       for program in programs)
+
+    return results
+
+
+def run_revision(revision: str, arguments: argparse.Namespace, programs: list[Path], engines: list[str]) -> list[dict]:
+    # The sources of the revision are extracted to a temporary directory and measured by this same script in a separate
+    # process, so that the benchmarks themselves and the way they are measured don't change between revisions. A
+    # revision that can't be measured is reported and skipped, so that the others are still compared
+    archive: subprocess.CompletedProcess = subprocess.run(
+        ["git", "-C", str(REPOSITORY), "archive", "--format=tar", revision, "src"], capture_output=True)
+    if archive.returncode != 0:
+        print(f"Skipping revision {revision}: {archive.stderr.decode(errors='replace').strip()}", file=sys.stderr)
+        return []
+
+    with tempfile.TemporaryDirectory() as directory:
+        with tarfile.open(fileobj=io.BytesIO(archive.stdout)) as tar:
+            tar.extractall(directory)
+
+        command: list[str] = [sys.executable, __file__, "--src", str(Path(directory) / "src"), "--json", "-",
+                              "--repeat", str(arguments.repeat), *(f"--engine={engine}" for engine in engines),
+                              *(str(program) for program in programs)]
+        if arguments.no_memory:
+            command.append("--no-memory")
+
+        child: subprocess.CompletedProcess = subprocess.run(command, capture_output=True, text=True)
+
+    if child.returncode != 0:
+        print(f"Skipping revision {revision}, which failed:\n{child.stderr.rstrip()}", file=sys.stderr)
+        return []
+    # Notes about skipped engines, for instance
+    for line in child.stderr.splitlines():
+        print(f"{revision}: {line}", file=sys.stderr)
+
+    results: list[dict] = json.loads(child.stdout)
+    for result in results:
+        result["revision"] = revision
+
+    return results
+
+
+def report(results: list[dict]) -> None:
+    # One line per benchmark and configuration, compared to the first configuration of the same benchmark. Outputs that
+    # differ from it are flagged, since the comparison is meaningless if the programs didn't compute the same thing
+    print(f"{'program':16} {'configuration':20} {'median':>10} {'p95':>10} {'peak':>10} {'collections':>11} "
+          f"{'ratio':>7}")
+
+    first: dict[str, dict] = {}
+    for result in results:
+        baseline: dict = first.setdefault(result["program"], result)
+        label: str = result["engine"] if "revision" not in result else f"{result['revision']} {result['engine']}"
+        peak: str = f"{result['peak'] / 2 ** 20:.2f} MiB" if result["peak"] is not None else "-"
+        flag: str = "" if result["output"] == baseline["output"] else "  (different output)"
+
+        print(f"{result['program'] if result is baseline else '':16} {label:20} {result['median'] * 1000:7.1f} ms "
+              f"{result['p95'] * 1000:7.1f} ms {peak:>10} {result['collections']:11.1f} "
+              f"{result['median'] / baseline['median']:6.2f}x{flag}")
+
+
+def main() -> None:
+    arguments: argparse.Namespace = parse_arguments()
+    programs: list[Path] = find_programs(arguments.programs)
+    engines: list[str] = arguments.engine or ["tree"]
+
+    if arguments.revision is None:
+        results: list[dict] = run_here(arguments, programs, engines)
+    else:
+        results = []
+        for revision in arguments.revision:
+            if revision == ".":
+                for result in run_here(arguments, programs, engines):
+                    results.append(result | {"revision": revision})
+            else:
+                results.extend(run_revision(revision, arguments, programs, engines))
+        # Grouped by benchmark, revisions in the order they were given
+        order: list[str] = [program.stem for program in programs]
+        results.sort(key=lambda result: order.index(result["program"]))
+
+    if arguments.json == "-":
+        json.dump(results, sys.stdout, indent=2)
+        return
+    if arguments.json is not None:
+        with open(arguments.json, "wt", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+    report(results)
+
+
+if __name__ == "__main__":
+    main()
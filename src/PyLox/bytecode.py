@@ -0,0 +1,132 @@
+from .tokenclass import Token
+
+
+# Opcodes are plain integers rather than an Enum: the VM compares against them on every instruction, and
+# module-level ints are noticeably cheaper to compare against than enum members. The number after each opcode is the
+# count of operands following it in the code array
+OP_CONSTANT = 0             # 1: constant index
+OP_NIL = 1                  # 0
+OP_TRUE = 2                 # 0
+OP_FALSE = 3                # 0
+OP_POP = 4                  # 0
+OP_GET_LOCAL = 5            # 2: distance, slot
+OP_SET_LOCAL = 6            # 2: distance, slot
+OP_GET_GLOBAL = 7           # 2: name constant, name token constant
+OP_SET_GLOBAL = 8           # 2: name constant, name token constant
+OP_DEFINE = 9               # 0
+OP_GET_PROPERTY = 10        # 2: name token constant, inline cache constant
+OP_SET_PROPERTY = 11        # 1: name token constant
+OP_CHECK_INSTANCE = 12      # 1: name token constant
+OP_GET_SUPER = 13           # 3: distance to "super", distance to "this", method token constant
+OP_EQUAL = 14               # 0
+OP_NOT_EQUAL = 15           # 0
+OP_GREATER = 16             # 1: operator token constant
+OP_GREATER_EQUAL = 17       # 1: operator token constant
+OP_LESS = 18                # 1: operator token constant
+OP_LESS_EQUAL = 19          # 1: operator token constant
+OP_ADD = 20                 # 1: operator token constant
+OP_SUBTRACT = 21            # 1: operator token constant
+OP_MULTIPLY = 22            # 1: operator token constant
+OP_DIVIDE = 23              # 1: operator token constant
+OP_MODULO = 24              # 1: operator token constant
+OP_POWER = 25               # 1: operator token constant
+OP_NOT = 26                 # 0
+OP_NEGATE = 27              # 1: operator token constant
+OP_PRINT = 28               # 0
+OP_JUMP = 29                # 1: absolute target
+OP_JUMP_IF_FALSE = 30       # 1: absolute target (leaves the condition on the stack)
+OP_JUMP_IF_TRUE = 31        # 1: absolute target (leaves the condition on the stack)
+OP_POP_JUMP_IF_FALSE = 32   # 1: absolute target
+OP_CALL = 33                # 2: argument count, paren token constant
+OP_CLOSURE = 34             # 1: function prototype constant
+OP_CLASS = 35               # 1: class prototype constant
+OP_PUSH_SCOPE = 36          # 0
+OP_POP_SCOPE = 37           # 0
+OP_RETURN = 38              # 1: 1 for a "return" statement, 0 for the implicit return at the end of a body
+OP_DEFINE_GLOBAL = 39       # 1: name constant
+OP_GET_METHOD = 40          # 2: name token constant, inline cache constant
+OP_CALL_METHOD = 41         # 2: argument count, paren token constant (always followed by an OP_CALL)
+OP_LIST = 42                # 1: element count
+OP_GET_INDEX = 43           # 1: bracket token constant
+OP_SET_INDEX = 44           # 1: bracket token constant
+OP_SLICE = 45               # 1: bracket token constant
+OP_MAP = 46                 # 1: entry count
+
+OPERAND_COUNTS: tuple[int, ...] = (1, 0, 0, 0, 0, 2, 2, 2, 2, 0, 2, 1, 1, 3, 0, 0, 1, 1, 1, 1,
+                                   1, 1, 1, 1, 1, 1, 0, 1, 0, 1, 1, 1, 1, 2, 1, 1, 0, 0, 1, 1,
+                                   2, 2, 1, 1, 1, 1, 1)
+
+OP_NAMES: dict[int, str] = {value: name for name, value in globals().items() if name.startswith("OP_")}
+
+
+class Chunk:
+    __slots__ = "code", "constants", "lines", "__constant_indices"
+
+    def __init__(self):
+        self.code: list[int] = []
+        self.constants: list[object] = []
+        # Source line of every element of the code array, operands included, so that any instruction pointer can be
+        # mapped back to the source
+        self.lines: list[int] = []
+        self.__constant_indices: dict[tuple, int] = {}
+
+    def write(self, byte: int, line: int) -> int:
+        self.code.append(byte)
+        self.lines.append(line)
+
+        return len(self.code) - 1
+
+    def add_constant(self, value: object) -> int:
+        # Only literal values are deduplicated. Floats are keyed by their representation, so that 0.0 and -0.0 (which
+        # are equal) get separate entries; everything else (tokens, prototypes, inline caches) is unique anyway
+        key: tuple | None = None
+        if isinstance(value, float):
+            key = (float, repr(value))
+        elif value is None or isinstance(value, (bool, str)):
+            key = (type(value), value)
+
+        if key is not None and key in self.__constant_indices:
+            return self.__constant_indices[key]
+
+        self.constants.append(value)
+        index: int = len(self.constants) - 1
+        if key is not None:
+            self.__constant_indices[key] = index
+
+        return index
+
+    def disassemble(self, name: str) -> str:
+        lines: list[str] = [f"== {name} =="]
+        offset: int = 0
+        while offset < len(self.code):
+            op: int = self.code[offset]
+            operands: list[int] = self.code[offset + 1: offset + 1 + OPERAND_COUNTS[op]]
+            text: str = f"{offset:04d} {self.lines[offset]:4d} {OP_NAMES[op]:<20}"
+            text += " ".join(str(operand) for operand in operands)
+            lines.append(text)
+            offset += 1 + OPERAND_COUNTS[op]
+
+        return "\n".join(lines)
+
+
+class FunctionProto:
+    __slots__ = "name", "params", "arity", "chunk", "is_initializer"
+
+    def __init__(self, name: Token | None, params: list[str], is_initializer: bool):
+        self.name: Token | None = name
+        self.params: list[str] = params
+        self.arity: int = len(params)
+        self.chunk: Chunk = Chunk()
+        self.is_initializer: bool = is_initializer
+
+
+class ClassProto:
+    __slots__ = "name", "superclass", "methods"
+
+    def __init__(self, name: Token, superclass: Token | None, methods: list[FunctionProto]):
+        self.name: Token = name
+        self.superclass: Token | None = superclass
+        self.methods: list[FunctionProto] = methods
+
+
+__all__ = (*OP_NAMES.values(), "OPERAND_COUNTS", "OP_NAMES", "Chunk", "FunctionProto", "ClassProto")
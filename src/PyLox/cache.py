@@ -0,0 +1,59 @@
+import hashlib
+import os
+import pickle
+import sys
+from pathlib import Path
+
+from .stmt import Stmt
+
+
+# Has to be bumped whenever the syntax tree classes or the Resolver change in a way that makes previously cached
+# programs invalid. The Python implementation is part of the tag as well, since pickles refer to its classes
+CACHE_VERSION: str = "1.7"
+CACHE_DIRECTORY: str = "__loxcache__"
+
+
+class ProgramCache:
+    # Resolved programs are stored next to their sources (in the same fashion as Python's __pycache__), together with
+    # the hash of the source they were produced from. An entry is only used if both the hash and the tag match
+    def __init__(self):
+        self.__tag: str = f"pylox-{CACHE_VERSION}.{sys.implementation.cache_tag}"
+
+    def load(self, path: str, source: str) -> list[Stmt] | None:
+        try:
+            with open(self.__cache_path(path), "rb") as file:
+                tag, digest, statements = pickle.load(file)
+        # A missing, unreadable, truncated or otherwise corrupted entry is simply a cache miss
+        except Exception:
+            return None
+
+        if tag != self.__tag or digest != self.__digest(source):
+            return None
+
+        return statements
+
+    def store(self, path: str, source: str, statements: list[Stmt]) -> None:
+        cache_path: Path = self.__cache_path(path)
+        temporary_path: Path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+
+        # Failing to write the cache (read-only directory, a syntax tree too deep to pickle, ...) is never an error,
+        # the program just won't start any faster next time. The entry is written to a temporary file first, so that
+        # concurrent runs never see a half-written one
+        try:
+            data: bytes = pickle.dumps((self.__tag, self.__digest(source), statements))
+            cache_path.parent.mkdir(exist_ok=True)
+            temporary_path.write_bytes(data)
+            os.replace(temporary_path, cache_path)
+        except (OSError, RecursionError, pickle.PicklingError):
+            temporary_path.unlink(missing_ok=True)
+
+    def __cache_path(self, path: str) -> Path:
+        source_path: Path = Path(path)
+        return source_path.parent / CACHE_DIRECTORY / f"{source_path.stem}.{self.__tag}.pickle"
+
+    @staticmethod
+    def __digest(source: str) -> str:
+        return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+__all__ = "CACHE_VERSION", "CACHE_DIRECTORY", "ProgramCache"
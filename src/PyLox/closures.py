@@ -0,0 +1,882 @@
+from types import FrameType
+from typing import Callable
+
+from . import stats
+from .environment import *
+from .errors import LoxRuntimeError, LoxFunctionError
+from .expr import *
+from .interpreter import OpMode
+from .lox_callable import LoxCallable
+from .lox_class import *
+from .lox_list import LoxList
+from .lox_map import LoxMap
+from .lox_native import *
+from .operators import *
+from .profiler import CallFrames, LoxStack, nested_code, walk_frames
+from .return_class import TailCall
+from .stmt import *
+from .tokenclass import *
+
+# Compiled expressions take the current environment and return the value of the expression. Compiled statements take
+# the current environment and return None, unless a "return" statement was executed, in which case they return a
+# one-element tuple holding the returned value (a tuple, since the returned value itself may be nil), or a TailCall if
+# the value is a call in tail position, which is left to the function being returned from
+CompiledExpr = Callable[[Environment | GlobalEnvironment], object]
+CompiledStmt = Callable[[Environment | GlobalEnvironment], tuple[object] | TailCall | None]
+
+
+class ClosureFunction(LoxCallable):
+    __slots__ = "declaration", "params", "body", "closure", "is_initializer"
+
+    def __init__(self, declaration: FunctionStmt, body: CompiledStmt, closure: Environment, is_initializer: bool):
+        self.declaration: FunctionStmt = declaration
+        self.params: list[str] = [param.lexeme for param in declaration.params]
+        self.body: CompiledStmt = body
+        self.closure: Environment = closure
+        self.is_initializer: bool = is_initializer
+
+    def bind(self, instance: LoxInstance):
+        environment: Environment = Environment(self.closure)
+        environment.values.append(instance)
+
+        return ClosureFunction(self.declaration, self.body, environment, self.is_initializer)
+
+    def call(self, interpreter, arguments: list[object]) -> object:
+        if stats.active is not None:
+            stats.active["calls"] += 1
+
+        environment: Environment = Environment(self.closure)
+        environment.values = list(arguments)
+
+        completion: tuple[object] | TailCall | None = self.body(environment)
+        if type(completion) is TailCall:
+            completion = self.trampoline(completion)
+
+        if self.is_initializer:
+            return self.closure.values[0]
+
+        return None if completion is None else completion[0]
+
+    # Same as bind(instance).call(interpreter, arguments), without creating the bound method
+    def invoke(self, interpreter, instance: LoxInstance, arguments: list[object]) -> object:
+        if stats.active is not None:
+            stats.active["calls"] += 1
+
+        this_environment: Environment = Environment(self.closure)
+        this_environment.values.append(instance)
+        environment: Environment = Environment(this_environment)
+        environment.values = list(arguments)
+
+        completion: tuple[object] | TailCall | None = self.body(environment)
+        if type(completion) is TailCall:
+            completion = self.trampoline(completion)
+
+        if self.is_initializer:
+            return instance
+
+        return None if completion is None else completion[0]
+
+    @staticmethod
+    def trampoline(completion: TailCall) -> tuple[object] | None:
+        # Calls in tail position are made here one after another, in place of the call that started the chain, so that
+        # tail-recursive functions run in constant Python stack
+        while type(completion) is TailCall:
+            if stats.active is not None:
+                stats.active["calls"] += 1
+
+            function: ClosureFunction = completion.function
+            environment: Environment = Environment(function.closure)
+            environment.values = completion.arguments
+            completion = function.body(environment)
+
+        return completion
+
+    def arity(self) -> int:
+        return len(self.params)
+
+    def __str__(self) -> str:
+        return f"<fn {self.declaration.name.lexeme}>"
+
+
+class ClosureInterpreter(ExprVisitor, StmtVisitor):
+    def __init__(self, lox_main):
+        self.lox_main = lox_main
+        self.globals: GlobalEnvironment = GlobalEnvironment()
+
+        # Same bookkeeping as in the bytecode compiler: blocks that don't declare anything don't get an environment
+        self.__scopes: list[bool] = []
+
+        self.__define_natives(native_functions)
+
+    def interpret(self, statements: list[Stmt], mode: OpMode) -> None:
+        compiled: list[CompiledStmt] = [self.__compile_top_level(statement, mode) for statement in statements]
+
+        try:
+            for statement in compiled:
+                statement(self.globals)
+        except LoxRuntimeError as err:
+            self.lox_main.runtime_error(err)
+
+    def prepare(self, statements: list[Stmt]) -> Callable[[], None]:
+        # Compiles the script once into a function that runs it every time it's called. Errors are left to the caller
+        compiled: list[CompiledStmt] = [self.__compile_top_level(statement, OpMode.SCRIPT) for statement in statements]
+        globals_: GlobalEnvironment = self.globals
+
+        def run() -> None:
+            for statement in compiled:
+                statement(globals_)
+
+        return run
+
+    def interpret_module(self, statements: list[Stmt], module_globals: GlobalEnvironment) -> None:
+        # Compiled code captures the global environment it was compiled against, so it's enough to compile the module
+        # with its own globals: its functions keep using them wherever they're called from
+        self.__define_natives(native_functions, module_globals)
+
+        previous: GlobalEnvironment = self.globals
+        try:
+            self.globals = module_globals
+            compiled: list[CompiledStmt] = [self.__compile(statement) for statement in statements]
+        finally:
+            self.globals = previous
+
+        for statement in compiled:
+            statement(module_globals)
+
+    # Profiling (see profiler.py)
+
+    def lox_stack(self, frame: FrameType | None) -> LoxStack:
+        return walk_frames(frame, self.__call_frames(), {__file__})
+
+    def start_tracing(self) -> CallFrames:
+        return self.__call_frames()
+
+    def stop_tracing(self) -> None:
+        pass
+
+    @staticmethod
+    def __call_frames() -> CallFrames:
+        # Besides the methods of ClosureFunction, the compiled calls run function bodies themselves. Those frames are
+        # running the function once they have created its environment (before that, they may still be evaluating the
+        # arguments, or calling something else than a ClosureFunction)
+        def running(values: dict[str, object], function: str) -> Token | None:
+            return values[function].declaration.name if "environment" in values else None
+
+        return {
+            ClosureFunction.call.__code__: lambda values: values["self"].declaration.name,
+            ClosureFunction.invoke.__code__: lambda values: values["self"].declaration.name,
+            ClosureFunction.trampoline.__code__: lambda values: running(values, "function"),
+            nested_code(ClosureInterpreter.__call_value, "call_value"): lambda values: running(values, "function"),
+            nested_code(ClosureInterpreter.__compile_invoke, "invoke"): lambda values: running(values, "method")
+        }
+
+    # Expressions
+
+    def visit_assign_expr(self, expr: AssignExpr) -> CompiledExpr:
+        value: CompiledExpr = self.__compile(expr.value)
+
+        if expr.depth is None:
+            globals_: GlobalEnvironment = self.globals
+            global_values: dict[str, object] = globals_.values
+            name: str = expr.name.lexeme
+            token: Token = expr.name
+
+            def assign_global(env: Environment | GlobalEnvironment) -> object:
+                result: object = value(env)
+                if name in global_values:
+                    global_values[name] = result
+                else:
+                    globals_.assign(token, result)
+                return result
+
+            return assign_global
+
+        hops: int = self.__hops(expr.depth)
+        slot: int = expr.slot
+        if hops == 0:
+            def assign_local(env: Environment) -> object:
+                result: object = value(env)
+                env.values[slot] = result
+                return result
+
+            return assign_local
+
+        def assign_enclosing(env: Environment) -> object:
+            result: object = value(env)
+            env.ancestor(hops).values[slot] = result
+            return result
+
+        return assign_enclosing
+
+    def visit_binary_expr(self, expr: BinaryExpr) -> CompiledExpr:
+        left: CompiledExpr = self.__compile(expr.left)
+        right: CompiledExpr = self.__compile(expr.right)
+        operator: Token = expr.operator
+
+        # The most common arithmetic and comparison operators get a dedicated closure with the number case inlined,
+        # everything else goes straight to the shared handler. All of them count as dispatches, see stats.py
+        match operator.type:
+            case TokenType.PLUS:
+                def plus(env: Environment) -> object:
+                    a: object = left(env)
+                    b: object = right(env)
+                    if stats.active is not None:
+                        stats.active["operator_dispatches"] += 1
+                    if type(a) is float and type(b) is float:
+                        return a + b
+                    return binary_plus_handler(operator, a, b)
+
+                return plus
+
+            case TokenType.MINUS:
+                def minus(env: Environment) -> object:
+                    a: object = left(env)
+                    b: object = right(env)
+                    if stats.active is not None:
+                        stats.active["operator_dispatches"] += 1
+                    if type(a) is float and type(b) is float:
+                        return a - b
+                    return binary_minus_handler(operator, a, b)
+
+                return minus
+
+            case TokenType.STAR:
+                def star(env: Environment) -> object:
+                    a: object = left(env)
+                    b: object = right(env)
+                    if stats.active is not None:
+                        stats.active["operator_dispatches"] += 1
+                    if type(a) is float and type(b) is float:
+                        return a * b
+                    return binary_star_handler(operator, a, b)
+
+                return star
+
+            case TokenType.LESS:
+                def less(env: Environment) -> object:
+                    a: object = left(env)
+                    b: object = right(env)
+                    if stats.active is not None:
+                        stats.active["operator_dispatches"] += 1
+                    if type(a) is float and type(b) is float:
+                        return a < b
+                    return binary_less_handler(operator, a, b)
+
+                return less
+
+            case TokenType.GREATER:
+                def greater(env: Environment) -> object:
+                    a: object = left(env)
+                    b: object = right(env)
+                    if stats.active is not None:
+                        stats.active["operator_dispatches"] += 1
+                    if type(a) is float and type(b) is float:
+                        return a > b
+                    return binary_gtr_handler(operator, a, b)
+
+                return greater
+
+            case TokenType.EQUAL_EQUAL:
+                def equal(env: Environment) -> bool:
+                    a: object = left(env)
+                    b: object = right(env)
+                    if stats.active is not None:
+                        stats.active["operator_dispatches"] += 1
+                    return is_equal(a, b)
+
+                return equal
+
+            case TokenType.BANG_EQUAL:
+                def not_equal(env: Environment) -> bool:
+                    a: object = left(env)
+                    b: object = right(env)
+                    if stats.active is not None:
+                        stats.active["operator_dispatches"] += 1
+                    return not is_equal(a, b)
+
+                return not_equal
+
+        handler: callable = binary_operators[operator.type]
+
+        def binary(env: Environment) -> object:
+            a: object = left(env)
+            b: object = right(env)
+            if stats.active is not None:
+                stats.active["operator_dispatches"] += 1
+            return handler(operator, a, b)
+
+        return binary
+
+    def visit_call_expr(self, expr: CallExpr) -> CompiledExpr:
+        if type(expr.callee) is GetExpr:
+            return self.__compile_invoke(expr, expr.callee)
+
+        callee: CompiledExpr = self.__compile(expr.callee)
+        arguments: list[CompiledExpr] = [self.__compile(argument) for argument in expr.arguments]
+        call_value: Callable[[object, list[object]], object] = self.__call_value(expr.paren)
+
+        def call(env: Environment) -> object:
+            return call_value(callee(env), [argument(env) for argument in arguments])
+
+        return call
+
+    def visit_get_expr(self, expr: GetExpr) -> CompiledExpr:
+        obj: CompiledExpr = self.__compile(expr.obj)
+        get_property: Callable[[object], object] = self.__get_property(expr.name)
+
+        return lambda env: get_property(obj(env))
+
+    def visit_grouping_expr(self, expr: GroupingExpr) -> CompiledExpr:
+        return self.__compile(expr.expression)
+
+    def visit_index_expr(self, expr: IndexExpr) -> CompiledExpr:
+        obj: CompiledExpr = self.__compile(expr.obj)
+        index: CompiledExpr = self.__compile(expr.index)
+        bracket: Token = expr.bracket
+
+        def index_(env: Environment) -> object:
+            lox_list: object = obj(env)
+            return get_index(bracket, lox_list, index(env))
+
+        return index_
+
+    def visit_list_expr(self, expr: ListExpr) -> CompiledExpr:
+        elements: list[CompiledExpr] = [self.__compile(element) for element in expr.elements]
+        return lambda env: LoxList([element(env) for element in elements])
+
+    def visit_literal_expr(self, expr: LiteralExpr) -> CompiledExpr:
+        value: object = expr.value
+        return lambda env: value
+
+    def visit_logical_expr(self, expr: LogicalExpr) -> CompiledExpr:
+        left: CompiledExpr = self.__compile(expr.left)
+        right: CompiledExpr = self.__compile(expr.right)
+
+        if expr.operator.type == TokenType.OR:
+            def logical_or(env: Environment) -> object:
+                value: object = left(env)
+                return value if is_truthy(value) else right(env)
+
+            return logical_or
+
+        def logical_and(env: Environment) -> object:
+            value: object = left(env)
+            return right(env) if is_truthy(value) else value
+
+        return logical_and
+
+    def visit_map_expr(self, expr: MapExpr) -> CompiledExpr:
+        entries: list[tuple[CompiledExpr, CompiledExpr]] = [(self.__compile(key), self.__compile(value))
+                                                            for key, value in zip(expr.keys, expr.values)]
+        to_key: Callable[[object], object] = LoxMap.to_key
+
+        def map_(env: Environment) -> LoxMap:
+            values: dict[object, object] = {}
+            for key_expr, value_expr in entries:
+                key: object = to_key(key_expr(env))
+                values[key] = value_expr(env)
+
+            return LoxMap(values)
+
+        return map_
+
+    def visit_set_expr(self, expr: SetExpr) -> CompiledExpr:
+        obj: CompiledExpr = self.__compile(expr.obj)
+        value: CompiledExpr = self.__compile(expr.value)
+        name: Token = expr.name
+
+        def set_(env: Environment) -> object:
+            instance: object = obj(env)
+            if not isinstance(instance, LoxInstance):
+                raise LoxRuntimeError(name, "Only instances have fields.")
+
+            result: object = value(env)
+            instance.set(name, result)
+
+            if stats.active is not None:
+                stats.active["property_sets"] += 1
+            return result
+
+        return set_
+
+    def visit_set_index_expr(self, expr: SetIndexExpr) -> CompiledExpr:
+        obj: CompiledExpr = self.__compile(expr.obj)
+        index: CompiledExpr = self.__compile(expr.index)
+        value: CompiledExpr = self.__compile(expr.value)
+        bracket: Token = expr.bracket
+
+        def set_index_(env: Environment) -> object:
+            lox_list: object = obj(env)
+            position: object = index(env)
+            return set_index(bracket, lox_list, position, value(env))
+
+        return set_index_
+
+    def visit_slice_expr(self, expr: SliceExpr) -> CompiledExpr:
+        obj: CompiledExpr = self.__compile(expr.obj)
+        start: CompiledExpr = self.__compile(expr.start) if expr.start is not None else lambda env: None
+        end: CompiledExpr = self.__compile(expr.end) if expr.end is not None else lambda env: None
+        bracket: Token = expr.bracket
+
+        def slice_(env: Environment) -> LoxList:
+            lox_list: object = obj(env)
+            lower: object = start(env)
+            return get_slice(bracket, lox_list, lower, end(env))
+
+        return slice_
+
+    def visit_super_expr(self, expr: SuperExpr) -> CompiledExpr:
+        super_hops: int = self.__hops(expr.depth)
+        this_hops: int = self.__hops(expr.depth - 1)
+        method_name: Token = expr.method
+
+        def super_(env: Environment) -> object:
+            superclass: LoxClass = env.get_at(super_hops, 0)
+            method: ClosureFunction | None = superclass.find_method(method_name.lexeme)
+
+            if method is None:
+                raise LoxRuntimeError(method_name, f"Undefined property '{method_name.lexeme}'.")
+
+            if stats.active is not None:
+                stats.active["binds"] += 1
+            return method.bind(env.get_at(this_hops, 0))
+
+        return super_
+
+    def visit_this_expr(self, expr: ThisExpr) -> CompiledExpr:
+        return self.__variable(expr, expr.keyword)
+
+    def visit_unary_expr(self, expr: UnaryExpr) -> CompiledExpr:
+        right: CompiledExpr = self.__compile(expr.right)
+        operator: Token = expr.operator
+
+        if operator.type == TokenType.BANG:
+            def bang(env: Environment) -> bool:
+                value: object = right(env)
+                if stats.active is not None:
+                    stats.active["operator_dispatches"] += 1
+                return not is_truthy(value)
+
+            return bang
+
+        def negate(env: Environment) -> object:
+            value: object = right(env)
+            if stats.active is not None:
+                stats.active["operator_dispatches"] += 1
+            return unary_minus_handler(operator, value)
+
+        return negate
+
+    def visit_variable_expr(self, expr: VariableExpr) -> CompiledExpr:
+        return self.__variable(expr, expr.name)
+
+    # Statements
+
+    def visit_block_stmt(self, stmt: BlockStmt) -> CompiledStmt:
+        has_declarations: bool = any(isinstance(statement, (VarStmt, FunctionStmt, ClassStmt))
+                                     for statement in stmt.statements)
+
+        self.__scopes.append(has_declarations)
+        body: CompiledStmt = self.__compile_sequence(stmt.statements)
+        self.__scopes.pop()
+
+        if has_declarations:
+            return lambda env: body(Environment(env))
+
+        return body
+
+    def visit_class_stmt(self, stmt: ClassStmt) -> CompiledStmt:
+        superclass_expr: CompiledExpr | None = None
+        if stmt.superclass is not None:
+            superclass_expr = self.__compile(stmt.superclass)
+
+        scope_count: int = 2 if stmt.superclass is not None else 1
+        self.__scopes.extend([True] * scope_count)
+        methods: list[tuple[FunctionStmt, CompiledStmt]] = [(method, self.__compile_function(method))
+                                                            for method in stmt.methods]
+        del self.__scopes[-scope_count:]
+
+        name: Token = stmt.name
+        superclass_name: Token | None = stmt.superclass.name if stmt.superclass is not None else None
+
+        def class_(env: Environment | GlobalEnvironment) -> None:
+            superclass: object | None = None
+            if superclass_expr is not None:
+                superclass = superclass_expr(env)
+                if not isinstance(superclass, LoxClass):
+                    raise LoxRuntimeError(superclass_name, "Superclass must be a class.")
+
+            method_env: Environment | GlobalEnvironment = env
+            if superclass is not None:
+                method_env = Environment(env)
+                method_env.values.append(superclass)
+
+            functions: dict[str, ClosureFunction] = \
+                {method.name.lexeme: ClosureFunction(method, body, method_env, method.name.lexeme == "init")
+                 for method, body in methods}
+
+            env.define(name.lexeme, LoxClass(name.lexeme, superclass, functions))
+
+        return class_
+
+    def visit_expression_stmt(self, stmt: ExpressionStmt) -> CompiledStmt:
+        expression: CompiledExpr = self.__compile(stmt.expression)
+
+        def expression_(env: Environment) -> None:
+            expression(env)
+
+        return expression_
+
+    def visit_function_stmt(self, stmt: FunctionStmt) -> CompiledStmt:
+        body: CompiledStmt = self.__compile_function(stmt)
+        define: callable = self.__definition(stmt.name)
+
+        def function(env: Environment | GlobalEnvironment) -> None:
+            define(env, ClosureFunction(stmt, body, env, False))
+
+        return function
+
+    def visit_if_stmt(self, stmt: IfStmt) -> CompiledStmt:
+        condition: CompiledExpr = self.__compile(stmt.condition)
+        if_clause: CompiledStmt = self.__compile(stmt.if_clause)
+
+        if stmt.else_clause is None:
+            def if_(env: Environment) -> tuple[object] | None:
+                value: object = condition(env)
+                if value is not None and value is not False:
+                    return if_clause(env)
+
+            return if_
+
+        else_clause: CompiledStmt = self.__compile(stmt.else_clause)
+
+        def if_else(env: Environment) -> tuple[object] | None:
+            value: object = condition(env)
+            if value is not None and value is not False:
+                return if_clause(env)
+            return else_clause(env)
+
+        return if_else
+
+    def visit_print_stmt(self, stmt: PrintStmt) -> CompiledStmt:
+        expression: CompiledExpr = self.__compile(stmt.expression)
+        write: Callable[[str], None] = self.lox_main.output.print
+
+        def print_(env: Environment) -> None:
+            write(stringify(expression(env)))
+
+        return print_
+
+    def visit_return_stmt(self, stmt: ReturnStmt) -> CompiledStmt:
+        if stmt.tail_call:
+            return self.__compile_tail_call(stmt.value)
+
+        if stmt.value is None:
+            def return_nil(_: Environment) -> tuple[object]:
+                if stats.active is not None:
+                    stats.active["returns"] += 1
+                return None,
+
+            return return_nil
+
+        value: CompiledExpr = self.__compile(stmt.value)
+
+        def return_(env: Environment) -> tuple[object]:
+            if stats.active is not None:
+                stats.active["returns"] += 1
+            return value(env),
+
+        return return_
+
+    def visit_var_stmt(self, stmt: VarStmt) -> CompiledStmt:
+        define: callable = self.__definition(stmt.name)
+
+        if stmt.initializer is None:
+            return lambda env: define(env, None)
+
+        initializer: CompiledExpr = self.__compile(stmt.initializer)
+
+        def var(env: Environment | GlobalEnvironment) -> None:
+            define(env, initializer(env))
+
+        return var
+
+    def visit_while_stmt(self, stmt: WhileStmt) -> CompiledStmt:
+        condition: CompiledExpr = self.__compile(stmt.condition)
+        body: CompiledStmt = self.__compile(stmt.body)
+
+        if stmt.increment is not None:
+            increment: CompiledExpr = self.__compile(stmt.increment)
+
+            def for_(env: Environment) -> tuple[object] | None:
+                while True:
+                    value: object = condition(env)
+                    if value is None or value is False:
+                        return None
+
+                    completion: tuple[object] | None = body(env)
+                    if completion is not None:
+                        return completion
+
+                    increment(env)
+
+            return for_
+
+        def while_(env: Environment) -> tuple[object] | None:
+            while True:
+                value: object = condition(env)
+                if value is None or value is False:
+                    return None
+
+                completion: tuple[object] | None = body(env)
+                if completion is not None:
+                    return completion
+
+        return while_
+
+    # Helpers
+
+    def __compile(self, target: Expr | Stmt) -> CompiledExpr | CompiledStmt:
+        return target.accept(self)
+
+    def __call_value(self, paren: Token) -> Callable[[object, list[object]], object]:
+        def call_value(function: object, values: list[object]) -> object:
+            # Fast path for functions compiled by this engine: no arity() call and no extra Python frame
+            if type(function) is ClosureFunction:
+                if len(values) != len(function.params):
+                    raise LoxRuntimeError(paren, f"Expected {len(function.params)} arguments but got {len(values)}.")
+
+                if stats.active is not None:
+                    stats.active["calls"] += 1
+
+                environment: Environment = Environment(function.closure)
+                environment.values = values
+                completion: tuple[object] | TailCall | None = function.body(environment)
+                if type(completion) is TailCall:
+                    completion = ClosureFunction.trampoline(completion)
+
+                if function.is_initializer:
+                    return function.closure.values[0]
+                return None if completion is None else completion[0]
+
+            if not isinstance(function, LoxCallable):
+                raise LoxRuntimeError(paren, "Can only call functions and classes.")
+
+            if len(values) != (arity := function.arity()):
+                raise LoxRuntimeError(paren, f"Expected {arity} arguments but got {len(values)}.")
+
+            if stats.active is not None and isinstance(function, LoxNativeFunction):
+                stats.active["native_calls"] += 1
+
+            try:
+                return function.call(self, values)
+            except LoxFunctionError as err:
+                raise LoxRuntimeError(paren, f"in function {err.function}: {err.message}.")
+
+        return call_value
+
+    # A call to a Lox function in tail position isn't made here but handed over to the function being returned from
+    # (see ClosureFunction.trampoline), anything else is called right away
+    def __compile_tail_call(self, expr: CallExpr) -> CompiledStmt:
+        callee: CompiledExpr = self.__compile(expr.callee)
+        arguments: list[CompiledExpr] = [self.__compile(argument) for argument in expr.arguments]
+        paren: Token = expr.paren
+        call_value: Callable[[object, list[object]], object] = self.__call_value(paren)
+
+        def tail_call(env: Environment) -> tuple[object] | TailCall:
+            if stats.active is not None:
+                stats.active["returns"] += 1
+
+            function: object = callee(env)
+            values: list[object] = [argument(env) for argument in arguments]
+
+            if type(function) is ClosureFunction and not function.is_initializer:
+                if len(values) != len(function.params):
+                    raise LoxRuntimeError(paren, f"Expected {len(function.params)} arguments but got {len(values)}.")
+
+                return TailCall(function, values)
+
+            return (call_value(function, values),)
+
+        return tail_call
+
+    # A method call ("obj.method(...)") is compiled as a whole: a method found on the instance's class is called with
+    # "this" bound directly, without creating a bound method just to call it once. Anything else (fields holding
+    # functions, module members) is an ordinary property access followed by an ordinary call
+    def __compile_invoke(self, expr: CallExpr, get: GetExpr) -> CompiledExpr:
+        obj: CompiledExpr = self.__compile(get.obj)
+        arguments: list[CompiledExpr] = [self.__compile(argument) for argument in expr.arguments]
+        name: Token = get.name
+        paren: Token = expr.paren
+        arg_no: int = len(arguments)
+        get_property: Callable[[object], object] = self.__get_property(name)
+        call_value: Callable[[object, list[object]], object] = self.__call_value(paren)
+
+        # Monomorphic inline cache, see __get_property
+        cached_shape: Shape | None = None
+        cached_index: int | None = None
+        cached_method: ClosureFunction | None = None
+
+        def invoke(env: Environment) -> object:
+            nonlocal cached_shape, cached_index, cached_method
+
+            instance: object = obj(env)
+            if type(instance) is not LoxInstance:
+                return call_value(get_property(instance), [argument(env) for argument in arguments])
+
+            if instance.shape is not cached_shape:
+                cached_shape = instance.shape
+                cached_index = cached_shape.indices.get(name.lexeme)
+                cached_method = cached_shape.klass.find_method(name.lexeme) if cached_index is None else None
+
+            if stats.active is not None:
+                stats.active["property_gets"] += 1
+
+            if cached_index is not None:
+                return call_value(instance.values[cached_index], [argument(env) for argument in arguments])
+
+            method: ClosureFunction | None = cached_method
+            if method is None:
+                raise LoxRuntimeError(name, f"Undefined property '{name.lexeme}'.")
+            if stats.active is not None:
+                stats.active["binds"] += 1
+
+            values: list[object] = [argument(env) for argument in arguments]
+            if arg_no != len(method.params):
+                raise LoxRuntimeError(paren, f"Expected {len(method.params)} arguments but got {arg_no}.")
+
+            if stats.active is not None:
+                stats.active["calls"] += 1
+
+            this_environment: Environment = Environment(method.closure)
+            this_environment.values.append(instance)
+            environment: Environment = Environment(this_environment)
+            environment.values = values
+            completion: tuple[object] | TailCall | None = method.body(environment)
+            if type(completion) is TailCall:
+                completion = ClosureFunction.trampoline(completion)
+
+            if method.is_initializer:
+                return instance
+            return None if completion is None else completion[0]
+
+        return invoke
+
+    @staticmethod
+    def __get_property(name: Token) -> Callable[[object], object]:
+        # Monomorphic inline cache: every property access remembers the last shape it saw and where the property was
+        # found for it, either the index of a field or a method. A shape belongs to a single class and neither ever
+        # changes, so an entry never goes stale
+        cached_shape: Shape | None = None
+        cached_index: int | None = None
+        cached_method: ClosureFunction | None = None
+
+        def get_property(instance: object) -> object:
+            nonlocal cached_shape, cached_index, cached_method
+
+            # Plain instances are handled here to make use of the cache, anything else that has properties (i.e.
+            # modules) knows how to look them up itself
+            if stats.active is not None:
+                stats.active["property_gets"] += 1
+
+            if type(instance) is LoxInstance:
+                if instance.shape is not cached_shape:
+                    cached_shape = instance.shape
+                    cached_index = cached_shape.indices.get(name.lexeme)
+                    cached_method = cached_shape.klass.find_method(name.lexeme) if cached_index is None else None
+
+                if cached_index is not None:
+                    return instance.values[cached_index]
+                if cached_method is not None:
+                    if stats.active is not None:
+                        stats.active["binds"] += 1
+                    return cached_method.bind(instance)
+
+                raise LoxRuntimeError(name, f"Undefined property '{name.lexeme}'.")
+
+            if isinstance(instance, LoxInstance):
+                return instance.get(name)
+
+            raise LoxRuntimeError(name, "Only instances have properties.")
+
+        return get_property
+
+    def __compile_top_level(self, stmt: Stmt, mode: OpMode) -> CompiledStmt:
+        if mode == OpMode.INTERACTIVE and isinstance(stmt, ExpressionStmt):
+            expression: CompiledExpr = self.__compile(stmt.expression)
+            write: Callable[[str], None] = self.lox_main.output.print
+
+            def print_value(env: Environment) -> None:
+                write(stringify(expression(env)))
+
+            return print_value
+
+        return self.__compile(stmt)
+
+    def __compile_sequence(self, statements: list[Stmt]) -> CompiledStmt:
+        compiled: list[CompiledStmt] = [self.__compile(statement) for statement in statements]
+
+        if len(compiled) == 1:
+            return compiled[0]
+
+        def sequence(env: Environment) -> tuple[object] | None:
+            for statement in compiled:
+                completion: tuple[object] | None = statement(env)
+                if completion is not None:
+                    return completion
+
+        return sequence
+
+    def __compile_function(self, stmt: FunctionStmt) -> CompiledStmt:
+        self.__scopes.append(True)
+        body: CompiledStmt = self.__compile_sequence(stmt.body)
+        self.__scopes.pop()
+
+        return body
+
+    def __variable(self, expr: ThisExpr | VariableExpr, name: Token) -> CompiledExpr:
+        if expr.depth is None:
+            globals_: GlobalEnvironment = self.globals
+            global_values: dict[str, object] = globals_.values
+            lexeme: str = name.lexeme
+
+            def get_global(_: Environment | GlobalEnvironment) -> object:
+                if lexeme in global_values:
+                    return global_values[lexeme]
+                return globals_.get(name)
+
+            return get_global
+
+        hops: int = self.__hops(expr.depth)
+        slot: int = expr.slot
+        if hops == 0:
+            return lambda env: env.values[slot]
+        if hops == 1:
+            return lambda env: env.enclosing.values[slot]
+
+        return lambda env: env.ancestor(hops).values[slot]
+
+    def __definition(self, name: Token) -> callable:
+        # Locals simply take the next slot of the current frame, only globals need to know their name
+        if self.__scopes:
+            return lambda env, value: env.values.append(value)
+
+        lexeme: str = name.lexeme
+        global_values: dict[str, object] = self.globals.values
+
+        def define_global(_: GlobalEnvironment, value: object) -> None:
+            global_values[lexeme] = value
+
+        return define_global
+
+    def __hops(self, distance: int) -> int:
+        # Number of environments to walk up at runtime to cover the given resolver distance
+        return sum(self.__scopes[len(self.__scopes) - distance:]) if distance else 0
+
+    def __define_natives(self, functions, environment: GlobalEnvironment | None = None) -> None:
+        for native in functions:
+            native: LoxNativeFunction = native()
+            (environment or self.globals).define(native.name, native)
+
+
+__all__ = "ClosureInterpreter", "ClosureFunction"
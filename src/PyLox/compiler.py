@@ -0,0 +1,343 @@
+from .bytecode import *
+from .expr import *
+from .stmt import *
+from .tokenclass import *
+
+
+class Compiler(ExprVisitor, StmtVisitor):
+    __binary_opcodes: dict[TokenType, int] = {
+        TokenType.GREATER: OP_GREATER,
+        TokenType.GREATER_EQUAL: OP_GREATER_EQUAL,
+        TokenType.LESS: OP_LESS,
+        TokenType.LESS_EQUAL: OP_LESS_EQUAL,
+        TokenType.PLUS: OP_ADD,
+        TokenType.MINUS: OP_SUBTRACT,
+        TokenType.STAR: OP_MULTIPLY,
+        TokenType.SLASH: OP_DIVIDE,
+        TokenType.PERCENT: OP_MODULO,
+        TokenType.CARET: OP_POWER
+    }
+
+    def __init__(self):
+        self.__function: FunctionProto | None = None
+        self.__chunk: Chunk | None = None
+        self.__line: int = 0
+
+        # One entry per scope known to the resolver, telling whether the scope gets its own Environment at runtime.
+        # Blocks that don't declare anything directly don't need one, so resolved distances have to be translated into
+        # the number of environments that actually exist between the use of a variable and its declaration
+        self.__scopes: list[bool] = []
+
+    def compile(self, statements: list[Stmt], interactive: bool) -> FunctionProto:
+        script: FunctionProto = FunctionProto(None, [], False)
+        self.__function, self.__chunk = script, script.chunk
+
+        # In interactive mode top-level expression statements print their values instead of discarding them
+        for statement in statements:
+            if interactive and isinstance(statement, ExpressionStmt):
+                self.__compile(statement.expression)
+                self.__emit(OP_PRINT)
+            else:
+                self.__compile(statement)
+
+        self.__emit(OP_NIL)
+        self.__emit(OP_RETURN, 0)
+
+        return script
+
+    def visit_assign_expr(self, expr: AssignExpr) -> None:
+        self.__compile(expr.value)
+        self.__line = expr.name.line
+
+        if expr.depth is not None:
+            self.__emit(OP_SET_LOCAL, self.__hops(expr.depth), expr.slot)
+        else:
+            self.__emit(OP_SET_GLOBAL, self.__constant(expr.name.lexeme), self.__constant(expr.name))
+
+    def visit_binary_expr(self, expr: BinaryExpr) -> None:
+        self.__compile(expr.left)
+        self.__compile(expr.right)
+        self.__line = expr.operator.line
+
+        match expr.operator.type:
+            case TokenType.EQUAL_EQUAL:
+                self.__emit(OP_EQUAL)
+            case TokenType.BANG_EQUAL:
+                self.__emit(OP_NOT_EQUAL)
+            case typ:
+                self.__emit(self.__binary_opcodes[typ], self.__constant(expr.operator))
+
+    def visit_call_expr(self, expr: CallExpr) -> None:
+        if type(expr.callee) is GetExpr:
+            self.__method_call(expr, expr.callee)
+            return
+
+        self.__compile(expr.callee)
+        for argument in expr.arguments:
+            self.__compile(argument)
+
+        self.__line = expr.paren.line
+        self.__emit(OP_CALL, len(expr.arguments), self.__constant(expr.paren))
+
+    def visit_get_expr(self, expr: GetExpr) -> None:
+        self.__compile(expr.obj)
+        self.__line = expr.name.line
+        self.__emit(OP_GET_PROPERTY, self.__constant(expr.name), self.__inline_cache())
+
+    def visit_grouping_expr(self, expr: GroupingExpr) -> None:
+        self.__compile(expr.expression)
+
+    def visit_index_expr(self, expr: IndexExpr) -> None:
+        self.__compile(expr.obj)
+        self.__compile(expr.index)
+        self.__line = expr.bracket.line
+        self.__emit(OP_GET_INDEX, self.__constant(expr.bracket))
+
+    def visit_list_expr(self, expr: ListExpr) -> None:
+        for element in expr.elements:
+            self.__compile(element)
+
+        self.__emit(OP_LIST, len(expr.elements))
+
+    def visit_literal_expr(self, expr: LiteralExpr) -> None:
+        match expr.value:
+            case None: self.__emit(OP_NIL)
+            case True: self.__emit(OP_TRUE)
+            case False: self.__emit(OP_FALSE)
+            case value: self.__emit(OP_CONSTANT, self.__constant(value))
+
+    def visit_logical_expr(self, expr: LogicalExpr) -> None:
+        self.__compile(expr.left)
+        self.__line = expr.operator.line
+
+        # Short-circuiting: the jump keeps the left operand on the stack as the result of the whole expression
+        jump: int = self.__emit_jump(OP_JUMP_IF_TRUE if expr.operator.type == TokenType.OR else OP_JUMP_IF_FALSE)
+        self.__emit(OP_POP)
+        self.__compile(expr.right)
+        self.__patch_jump(jump)
+
+    def visit_map_expr(self, expr: MapExpr) -> None:
+        for key, value in zip(expr.keys, expr.values):
+            self.__compile(key)
+            self.__compile(value)
+
+        self.__emit(OP_MAP, len(expr.keys))
+
+    def visit_set_expr(self, expr: SetExpr) -> None:
+        self.__compile(expr.obj)
+        self.__line = expr.name.line
+
+        # The tree-walking interpreter rejects non-instances before evaluating the value, so we have to check first too
+        self.__emit(OP_CHECK_INSTANCE, self.__constant(expr.name))
+        self.__compile(expr.value)
+        self.__emit(OP_SET_PROPERTY, self.__constant(expr.name))
+
+    def visit_set_index_expr(self, expr: SetIndexExpr) -> None:
+        self.__compile(expr.obj)
+        self.__compile(expr.index)
+        self.__compile(expr.value)
+        self.__line = expr.bracket.line
+        self.__emit(OP_SET_INDEX, self.__constant(expr.bracket))
+
+    def visit_slice_expr(self, expr: SliceExpr) -> None:
+        self.__compile(expr.obj)
+
+        # An omitted bound is the same as nil
+        for bound in expr.start, expr.end:
+            if bound is not None:
+                self.__compile(bound)
+            else:
+                self.__emit(OP_NIL)
+
+        self.__line = expr.bracket.line
+        self.__emit(OP_SLICE, self.__constant(expr.bracket))
+
+    def visit_super_expr(self, expr: SuperExpr) -> None:
+        self.__line = expr.keyword.line
+        self.__emit(OP_GET_SUPER, self.__hops(expr.depth), self.__hops(expr.depth - 1), self.__constant(expr.method))
+
+    def visit_this_expr(self, expr: ThisExpr) -> None:
+        self.__line = expr.keyword.line
+        self.__variable(expr, expr.keyword)
+
+    def visit_unary_expr(self, expr: UnaryExpr) -> None:
+        self.__compile(expr.right)
+        self.__line = expr.operator.line
+
+        if expr.operator.type == TokenType.BANG:
+            self.__emit(OP_NOT)
+        else:
+            self.__emit(OP_NEGATE, self.__constant(expr.operator))
+
+    def visit_variable_expr(self, expr: VariableExpr) -> None:
+        self.__line = expr.name.line
+        self.__variable(expr, expr.name)
+
+    def visit_block_stmt(self, stmt: BlockStmt) -> None:
+        has_declarations: bool = any(isinstance(statement, (VarStmt, FunctionStmt, ClassStmt))
+                                     for statement in stmt.statements)
+        self.__scopes.append(has_declarations)
+
+        if has_declarations:
+            self.__emit(OP_PUSH_SCOPE)
+        for statement in stmt.statements:
+            self.__compile(statement)
+        if has_declarations:
+            self.__emit(OP_POP_SCOPE)
+
+        self.__scopes.pop()
+
+    def visit_class_stmt(self, stmt: ClassStmt) -> None:
+        superclass: Token | None = None
+        if stmt.superclass is not None:
+            self.__compile(stmt.superclass)
+            superclass = stmt.superclass.name
+
+        # Methods are resolved inside the scope holding "this" (and, for subclasses, the one holding "super")
+        scope_count: int = 2 if stmt.superclass is not None else 1
+        self.__scopes.extend([True] * scope_count)
+        methods: list[FunctionProto] = [self.__compile_function(method, method.name.lexeme == "init")
+                                        for method in stmt.methods]
+        del self.__scopes[-scope_count:]
+
+        self.__line = stmt.name.line
+        self.__emit(OP_CLASS, self.__constant(ClassProto(stmt.name, superclass, methods)))
+
+    def visit_expression_stmt(self, stmt: ExpressionStmt) -> None:
+        self.__compile(stmt.expression)
+        self.__emit(OP_POP)
+
+    def visit_function_stmt(self, stmt: FunctionStmt) -> None:
+        function: FunctionProto = self.__compile_function(stmt, False)
+
+        self.__line = stmt.name.line
+        self.__emit(OP_CLOSURE, self.__constant(function))
+        self.__define(stmt.name)
+
+    def visit_if_stmt(self, stmt: IfStmt) -> None:
+        self.__compile(stmt.condition)
+        else_jump: int = self.__emit_jump(OP_POP_JUMP_IF_FALSE)
+        self.__compile(stmt.if_clause)
+
+        if stmt.else_clause is not None:
+            end_jump: int = self.__emit_jump(OP_JUMP)
+            self.__patch_jump(else_jump)
+            self.__compile(stmt.else_clause)
+            self.__patch_jump(end_jump)
+        else:
+            self.__patch_jump(else_jump)
+
+    def visit_print_stmt(self, stmt: PrintStmt) -> None:
+        self.__compile(stmt.expression)
+        self.__emit(OP_PRINT)
+
+    def visit_return_stmt(self, stmt: ReturnStmt) -> None:
+        self.__line = stmt.keyword.line
+
+        if stmt.value is not None:
+            self.__compile(stmt.value)
+        else:
+            self.__emit(OP_NIL)
+
+        self.__emit(OP_RETURN, 1)
+
+    def visit_var_stmt(self, stmt: VarStmt) -> None:
+        if stmt.initializer is not None:
+            self.__compile(stmt.initializer)
+        else:
+            self.__emit(OP_NIL)
+
+        self.__line = stmt.name.line
+        self.__define(stmt.name)
+
+    def visit_while_stmt(self, stmt: WhileStmt) -> None:
+        loop_start: int = len(self.__chunk.code)
+        self.__compile(stmt.condition)
+        exit_jump: int = self.__emit_jump(OP_POP_JUMP_IF_FALSE)
+
+        self.__compile(stmt.body)
+        if stmt.increment is not None:
+            self.__compile(stmt.increment)
+            self.__emit(OP_POP)
+        self.__emit(OP_JUMP, loop_start)
+        self.__patch_jump(exit_jump)
+
+    def __compile(self, target: Expr | Stmt) -> None:
+        target.accept(self)
+
+    def __compile_function(self, stmt: FunctionStmt, is_initializer: bool) -> FunctionProto:
+        enclosing: tuple[FunctionProto, Chunk] = self.__function, self.__chunk
+
+        function: FunctionProto = FunctionProto(stmt.name, [param.lexeme for param in stmt.params], is_initializer)
+        self.__function, self.__chunk = function, function.chunk
+        self.__line = stmt.name.line
+
+        self.__scopes.append(True)
+        for statement in stmt.body:
+            self.__compile(statement)
+        self.__scopes.pop()
+
+        # Implicit "return nil;" at the end of the body (initializers return "this" anyway, the VM takes care of that)
+        self.__emit(OP_NIL)
+        self.__emit(OP_RETURN, 0)
+
+        self.__function, self.__chunk = enclosing
+        return function
+
+    def __variable(self, expr: ThisExpr | VariableExpr, name: Token) -> None:
+        if expr.depth is not None:
+            self.__emit(OP_GET_LOCAL, self.__hops(expr.depth), expr.slot)
+        else:
+            self.__emit(OP_GET_GLOBAL, self.__constant(name.lexeme), self.__constant(name))
+
+    def __define(self, name: Token) -> None:
+        # Locals simply take the next slot of the current frame, only globals need to know their name
+        if self.__scopes:
+            self.__emit(OP_DEFINE)
+        else:
+            self.__emit(OP_DEFINE_GLOBAL, self.__constant(name.lexeme))
+
+    def __hops(self, distance: int) -> int:
+        # Number of environments to walk up at runtime to cover the given resolver distance
+        return sum(self.__scopes[len(self.__scopes) - distance:]) if distance else 0
+
+    def __constant(self, value: object) -> int:
+        return self.__chunk.add_constant(value)
+
+    def __method_call(self, expr: CallExpr, get: GetExpr) -> None:
+        # The method is looked up before the arguments are evaluated, like in the other engines, but called with "this"
+        # bound directly. When the property turns out not to be a method of the instance's class, OP_CALL_METHOD falls
+        # through to the OP_CALL following it, which calls the property's value in the ordinary way
+        self.__compile(get.obj)
+        self.__line = get.name.line
+        self.__emit(OP_GET_METHOD, self.__constant(get.name), self.__inline_cache())
+
+        for argument in expr.arguments:
+            self.__compile(argument)
+
+        self.__line = expr.paren.line
+        paren: int = self.__constant(expr.paren)
+        self.__emit(OP_CALL_METHOD, len(expr.arguments), paren)
+        self.__emit(OP_CALL, len(expr.arguments), paren)
+
+    def __inline_cache(self) -> int:
+        # The shape of the instance the instruction last saw and where the property was found for it: the index of
+        # a field or a method
+        return self.__chunk.add_constant([None, None, None])
+
+    def __emit(self, *code: int) -> int:
+        offset: int = len(self.__chunk.code)
+        for byte in code:
+            self.__chunk.write(byte, self.__line)
+
+        return offset
+
+    def __emit_jump(self, op: int) -> int:
+        # The target is unknown yet, so a placeholder is written and its position is returned for later patching
+        return self.__emit(op, -1) + 1
+
+    def __patch_jump(self, position: int) -> None:
+        self.__chunk.code[position] = len(self.__chunk.code)
+
+
+__all__ = "Compiler",
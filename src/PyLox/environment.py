@@ -1,11 +1,19 @@
+from . import stats
 from .errors import LoxRuntimeError
 from .tokenclass import Token
 
 
 class Environment:
+    # Local scopes are fixed-layout frames: the Resolver assigns every local variable a slot index in the order of
+    # declaration, so variables are addressed by (distance, slot) pairs instead of being looked up by name
+    __slots__ = "values", "enclosing"
+
     def __init__(self, enclosing=None):
-        self.values: dict[str, object] = {}
-        self.enclosing: Environment | None = enclosing
+        self.values: list[object] = []
+        self.enclosing: Environment | GlobalEnvironment | None = enclosing
+
+        if stats.active is not None:
+            stats.active["environments"] += 1
 
     def ancestor(self, distance: int):
         environment: Environment = self
@@ -14,34 +22,41 @@ class Environment:
 
         return environment
 
+    def assign_at(self, distance: int, slot: int, value: object) -> None:
+        self.ancestor(distance).values[slot] = value
+
+    # Declarations within a scope are executed in the same order they were resolved in, so defining a variable simply
+    # fills the next slot. The name is only there to keep the signature the same as for the global environment
+    def define(self, _: str, value: object | None) -> None:
+        self.values.append(value)
+
+    def get_at(self, distance: int, slot: int) -> object:
+        return self.ancestor(distance).values[slot]
+
+
+class GlobalEnvironment:
+    # Globals aren't resolved statically (they can be used before being declared and redefined at will, especially in
+    # the REPL), so they stay in a name-keyed dictionary
+    __slots__ = "values",
+
+    def __init__(self):
+        self.values: dict[str, object] = {}
+
     def assign(self, name: Token, value: object) -> None:
         if name.lexeme in self.values:
             self.values[name.lexeme] = value
             return
 
-        if self.enclosing is not None:
-            self.enclosing.assign(name, value)
-            return
-
         raise LoxRuntimeError(name, f"Undefined variable '{name.lexeme}'.")
 
-    def assign_at(self, distance: int, name: Token, value: object) -> None:
-        self.ancestor(distance).values |= {name.lexeme: value}
-
     def define(self, name: str, value: object | None) -> None:
-        self.values |= {name: value}
+        self.values[name] = value
 
     def get(self, name: Token) -> object:
         if name.lexeme in self.values:
             return self.values[name.lexeme]
 
-        if self.enclosing is not None:
-            return self.enclosing.get(name)
-
         raise LoxRuntimeError(name, f"Undefined variable '{name.lexeme}'.")
 
-    def get_at(self, distance: int, name: str) -> object:
-        return self.ancestor(distance).values.get(name)
-
 
-__all__ = "Environment",
+__all__ = "Environment", "GlobalEnvironment"
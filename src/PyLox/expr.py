@@ -3,6 +3,10 @@ from abc import ABC, abstractmethod
 from .tokenclass import Token
 
 
+# The "depth" and "slot" fields of expressions referring to variables are filled in by the Resolver: the number of
+# scopes between the use and the declaration of the variable, and the variable's slot within its scope. Both stay None
+# for global variables. The "cached_*" fields of property accesses are the tree-walking interpreter's inline cache,
+# filled in at runtime
 class Expr(ABC):
     @abstractmethod
     def accept(self, visitor): ...
@@ -26,6 +30,12 @@ class ExprVisitor(ABC):
     @abstractmethod
     def visit_grouping_expr(self, expr: Expr) -> object | None: ...
 
+    @abstractmethod
+    def visit_index_expr(self, expr: Expr) -> object | None: ...
+
+    @abstractmethod
+    def visit_list_expr(self, expr: Expr) -> object | None: ...
+
     @staticmethod
     @abstractmethod
     def visit_literal_expr(expr: Expr) -> object | None: ...
@@ -33,9 +43,18 @@ class ExprVisitor(ABC):
     @abstractmethod
     def visit_logical_expr(self, expr: Expr) -> object | None: ...
 
+    @abstractmethod
+    def visit_map_expr(self, expr: Expr) -> object | None: ...
+
     @abstractmethod
     def visit_set_expr(self, expr: Expr) -> object | None: ...
 
+    @abstractmethod
+    def visit_set_index_expr(self, expr: Expr) -> object | None: ...
+
+    @abstractmethod
+    def visit_slice_expr(self, expr: Expr) -> object | None: ...
+
     @abstractmethod
     def visit_super_expr(self, expr: Expr) -> object | None: ...
 
@@ -53,6 +72,8 @@ class AssignExpr(Expr):
     def __init__(self, name: Token, value: Expr):
         self.name: Token = name
         self.value: Expr = value
+        self.depth: int | None = None
+        self.slot: int | None = None
 
     def accept(self, visitor: ExprVisitor):
         return visitor.visit_assign_expr(self)
@@ -82,6 +103,9 @@ class GetExpr(Expr):
     def __init__(self, obj: Expr, name: Token):
         self.obj: Expr = obj
         self.name: Token = name
+        self.cached_shape: object | None = None
+        self.cached_index: int | None = None
+        self.cached_method: object | None = None
 
     def accept(self, visitor: ExprVisitor):
         return visitor.visit_get_expr(self)
@@ -95,6 +119,24 @@ class GroupingExpr(Expr):
         return visitor.visit_grouping_expr(self)
 
 
+class IndexExpr(Expr):
+    def __init__(self, obj: Expr, bracket: Token, index: Expr):
+        self.obj: Expr = obj
+        self.bracket: Token = bracket
+        self.index: Expr = index
+
+    def accept(self, visitor: ExprVisitor):
+        return visitor.visit_index_expr(self)
+
+
+class ListExpr(Expr):
+    def __init__(self, elements: list[Expr]):
+        self.elements: list[Expr] = elements
+
+    def accept(self, visitor: ExprVisitor):
+        return visitor.visit_list_expr(self)
+
+
 class LiteralExpr(Expr):
     def __init__(self, value: object):
         self.value: object = value
@@ -113,6 +155,15 @@ class LogicalExpr(Expr):
         return visitor.visit_logical_expr(self)
 
 
+class MapExpr(Expr):
+    def __init__(self, keys: list[Expr], values: list[Expr]):
+        self.keys: list[Expr] = keys
+        self.values: list[Expr] = values
+
+    def accept(self, visitor: ExprVisitor):
+        return visitor.visit_map_expr(self)
+
+
 class SetExpr(Expr):
     def __init__(self, obj: Expr, name: Token, value: Expr):
         self.obj: Expr = obj
@@ -123,10 +174,34 @@ class SetExpr(Expr):
         return visitor.visit_set_expr(self)
 
 
+class SetIndexExpr(Expr):
+    def __init__(self, obj: Expr, bracket: Token, index: Expr, value: Expr):
+        self.obj: Expr = obj
+        self.bracket: Token = bracket
+        self.index: Expr = index
+        self.value: Expr = value
+
+    def accept(self, visitor: ExprVisitor):
+        return visitor.visit_set_index_expr(self)
+
+
+class SliceExpr(Expr):
+    def __init__(self, obj: Expr, bracket: Token, start: Expr | None, end: Expr | None):
+        self.obj: Expr = obj
+        self.bracket: Token = bracket
+        self.start: Expr | None = start
+        self.end: Expr | None = end
+
+    def accept(self, visitor: ExprVisitor):
+        return visitor.visit_slice_expr(self)
+
+
 class SuperExpr(Expr):
     def __init__(self, keyword: Token, method: Token):
         self.keyword: Token = keyword
         self.method: Token = method
+        self.depth: int | None = None
+        self.slot: int | None = None
 
     def accept(self, visitor: ExprVisitor):
         return visitor.visit_super_expr(self)
@@ -135,6 +210,8 @@ class SuperExpr(Expr):
 class ThisExpr(Expr):
     def __init__(self, keyword: Token):
         self.keyword: Token = keyword
+        self.depth: int | None = None
+        self.slot: int | None = None
 
     def accept(self, visitor: ExprVisitor):
         return visitor.visit_this_expr(self)
@@ -152,10 +229,13 @@ class UnaryExpr(Expr):
 class VariableExpr(Expr):
     def __init__(self, name: Token):
         self.name: Token = name
+        self.depth: int | None = None
+        self.slot: int | None = None
 
     def accept(self, visitor: ExprVisitor):
         return visitor.visit_variable_expr(self)
 
 
-__all__ = ("Expr", "ExprVisitor", "AssignExpr", "BinaryExpr", "CallExpr", "GetExpr", "GroupingExpr",
-           "LiteralExpr", "LogicalExpr", "SetExpr", "SuperExpr", "ThisExpr", "UnaryExpr", "VariableExpr")
+__all__ = ("Expr", "ExprVisitor", "AssignExpr", "BinaryExpr", "CallExpr", "GetExpr", "GroupingExpr", "IndexExpr",
+           "ListExpr", "LiteralExpr", "LogicalExpr", "MapExpr", "SetExpr", "SetIndexExpr", "SliceExpr", "SuperExpr",
+           "ThisExpr", "UnaryExpr", "VariableExpr")
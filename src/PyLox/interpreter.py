@@ -1,19 +1,33 @@
 from enum import Enum, auto
-from math import nan
-from typing import SupportsFloat
-
-from .environment import Environment
+from operator import ge, gt, le, lt
+from types import FrameType
+from typing import Callable
+from . import stats
+from .environment import *
 from .errors import LoxRuntimeError, LoxFunctionError
 from .expr import *
 from .lox_callable import LoxCallable
 from .lox_class import *
 from .lox_function import LoxFunction
+from .lox_list import LoxList
+from .lox_map import LoxMap
 from .lox_native import *
-from .return_class import Return
+from .operators import *
+from .profiler import CallFrames, LoxStack, walk_frames
+from .return_class import Return, TailCall
 from .stmt import *
 from .tokenclass import *
 
 
+# Comparisons that counted loops (see visit_while_stmt) make themselves when both operands are numbers
+COUNTER_COMPARISONS: dict[TokenType, Callable[[float, float], bool]] = {
+    TokenType.LESS: lt,
+    TokenType.LESS_EQUAL: le,
+    TokenType.GREATER: gt,
+    TokenType.GREATER_EQUAL: ge
+}
+
+
 class OpMode(Enum):
     SCRIPT = auto()
     INTERACTIVE = auto()
@@ -22,28 +36,11 @@ class OpMode(Enum):
 class Interpreter(ExprVisitor, StmtVisitor):
     def __init__(self, lox_main):
         self.lox_main = lox_main
-        self.globals: Environment = Environment()
-        self.__environment: Environment = self.globals
-        self.__locals: dict[Expr, int] = {}
-
-        self.__unary_operators: dict[TokenType, callable] = {
-            TokenType.MINUS: self.__unary_minus_handler,
-            TokenType.BANG: lambda _, x: not self.__is_truthy(x)
-        }
-        self.__binary_operators: dict[TokenType, callable] = {
-            TokenType.MINUS: self.__binary_minus_handler,
-            TokenType.PLUS: self.__binary_plus_handler,
-            TokenType.SLASH: self.__binary_slash_handler,
-            TokenType.STAR: self.__binary_star_handler,
-            TokenType.CARET: self.__binary_caret_handler,
-            TokenType.PERCENT: self.__binary_percent_handler,
-            TokenType.GREATER: self.__binary_gtr_handler,
-            TokenType.GREATER_EQUAL: self.__binary_geq_handler,
-            TokenType.LESS: self.__binary_less_handler,
-            TokenType.LESS_EQUAL: self.__binary_leq_handler,
-            TokenType.BANG_EQUAL: lambda _, l, r: not self.__is_equal(l, r),
-            TokenType.EQUAL_EQUAL: lambda _, l, r: self.__is_equal(l, r)
-        }
+        self.globals: GlobalEnvironment = GlobalEnvironment()
+        self.__environment: Environment | GlobalEnvironment = self.globals
+
+        self.__unary_operators: dict[TokenType, callable] = unary_operators
+        self.__binary_operators: dict[TokenType, callable] = binary_operators
 
         self.__define_natives(native_functions)
 
@@ -54,11 +51,40 @@ class Interpreter(ExprVisitor, StmtVisitor):
         except LoxRuntimeError as err:
             self.lox_main.runtime_error(err)
 
+    def prepare(self, statements: list[Stmt]) -> Callable[[], None]:
+        # A function that runs the script again every time it's called, for the engines that translate it first to do so
+        # only once. Errors are left to the caller. The tree is executed as it is, so there's nothing to prepare here
+        def run() -> None:
+            self.execute_block(statements, self.globals)
+
+        return run
+
+    def interpret_module(self, statements: list[Stmt], module_globals: GlobalEnvironment) -> None:
+        # Modules run in a global environment of their own, errors are left to the "require" call that loads them
+        self.__define_natives(native_functions, module_globals)
+
+        previous: GlobalEnvironment = self.globals
+        try:
+            self.globals = module_globals
+            self.execute_block(statements, module_globals)
+        finally:
+            self.globals = previous
+
+    # Profiling (see profiler.py). Every Lox call is a Python call of one of LoxFunction's methods
+
+    def lox_stack(self, frame: FrameType | None) -> LoxStack:
+        return walk_frames(frame, LoxFunction.call_frames(), {__file__})
+
+    def start_tracing(self) -> CallFrames:
+        return LoxFunction.call_frames()
+
+    def stop_tracing(self) -> None:
+        pass
+
     def visit_assign_expr(self, expr: AssignExpr) -> object:
         value: object = self.__evaluate(expr.value)
-        distance: int = self.__locals.get(expr)
 
-        self.__environment.assign_at(distance, expr.name, value) if distance is not None \
+        self.__environment.assign_at(expr.depth, expr.slot, value) if expr.depth is not None \
             else self.globals.assign(expr.name, value)
 
         return value
@@ -67,34 +93,40 @@ class Interpreter(ExprVisitor, StmtVisitor):
         left: object = self.__evaluate(expr.left)
         right: object = self.__evaluate(expr.right)
 
+        if stats.active is not None:
+            stats.active["operator_dispatches"] += 1
+
         return self.__binary_operators[expr.operator.type](expr.operator, left, right)
 
     def visit_call_expr(self, expr: CallExpr) -> object:
+        if type(expr.callee) is GetExpr:
+            return self.__invoke(expr, expr.callee)
+
         callee: object = self.__evaluate(expr.callee)
-        arguments: list[object] = [self.__evaluate(argument) for argument in expr.arguments]
+        arguments: list[object] = self.__arguments(expr.arguments)
 
-        if not isinstance(callee, LoxCallable):
-            raise LoxRuntimeError(expr.paren, "Can only call functions and classes.")
+        # Fast path for Lox functions: no isinstance() or arity() calls
+        if type(callee) is LoxFunction:
+            if len(arguments) != len(callee.params):
+                raise LoxRuntimeError(expr.paren, f"Expected {len(callee.params)} arguments but got {len(arguments)}.")
 
-        function: LoxCallable = callee
-        if (arg_no := len(arguments)) != (arity := function.arity()):
-            raise LoxRuntimeError(expr.paren, f"Expected {arity} arguments but got {arg_no}.")
+            return callee.call(self, arguments)
 
-        try:
-            return function.call(self, arguments)
-        except LoxFunctionError as err:
-            raise LoxRuntimeError(expr.paren, f"in function {err.function}: {err.message}.")
+        return self.__call(callee, arguments, expr.paren)
 
     def visit_get_expr(self, expr: GetExpr) -> object:
-        obj: object = self.__evaluate(expr.obj)
-        if isinstance(obj, LoxInstance):
-            return obj.get(expr.name)
-
-        raise LoxRuntimeError(expr.name, "Only instances have properties.")
+        return self.__get_property(self.__evaluate(expr.obj), expr)
 
     def visit_grouping_expr(self, expr: GroupingExpr) -> object:
         return self.__evaluate(expr.expression)
 
+    def visit_index_expr(self, expr: IndexExpr) -> object:
+        obj: object = self.__evaluate(expr.obj)
+        return get_index(expr.bracket, obj, self.__evaluate(expr.index))
+
+    def visit_list_expr(self, expr: ListExpr) -> LoxList:
+        return LoxList([self.__evaluate(element) for element in expr.elements])
+
     @staticmethod
     def visit_literal_expr(expr: LiteralExpr) -> object:
         return expr.value
@@ -102,14 +134,22 @@ class Interpreter(ExprVisitor, StmtVisitor):
     def visit_logical_expr(self, expr: LogicalExpr) -> object:
         left: object = self.__evaluate(expr.left)
         if expr.operator.type == TokenType.OR:
-            if self.__is_truthy(left):
+            if is_truthy(left):
                 return left
         else:
-            if not self.__is_truthy(left):
+            if not is_truthy(left):
                 return left
 
         return self.__evaluate(expr.right)
 
+    def visit_map_expr(self, expr: MapExpr) -> LoxMap:
+        entries: dict[object, object] = {}
+        for key_expr, value_expr in zip(expr.keys, expr.values):
+            key: object = LoxMap.to_key(self.__evaluate(key_expr))
+            entries[key] = self.__evaluate(value_expr)
+
+        return LoxMap(entries)
+
     def visit_set_expr(self, expr: SetExpr) -> object:
         obj: object = self.__evaluate(expr.obj)
 
@@ -119,32 +159,55 @@ class Interpreter(ExprVisitor, StmtVisitor):
         value: object = self.__evaluate(expr.value)
         obj.set(expr.name, value)
 
+        if stats.active is not None:
+            stats.active["property_sets"] += 1
+
         return value
 
+    def visit_set_index_expr(self, expr: SetIndexExpr) -> object:
+        obj: object = self.__evaluate(expr.obj)
+        index: object = self.__evaluate(expr.index)
+
+        return set_index(expr.bracket, obj, index, self.__evaluate(expr.value))
+
+    def visit_slice_expr(self, expr: SliceExpr) -> LoxList:
+        obj: object = self.__evaluate(expr.obj)
+        start: object | None = None if expr.start is None else self.__evaluate(expr.start)
+        end: object | None = None if expr.end is None else self.__evaluate(expr.end)
+
+        return get_slice(expr.bracket, obj, start, end)
+
     def visit_super_expr(self, expr: SuperExpr) -> object:
-        distance: int = self.__locals.get(expr)
-        superclass: LoxClass = self.__environment.get_at(distance, "super")
-        obj: LoxInstance = self.__environment.get_at(distance - 1, "this")
+        # "super" and "this" are the only variables in their scopes, so both are always in slot 0
+        superclass: LoxClass = self.__environment.get_at(expr.depth, 0)
+        obj: LoxInstance = self.__environment.get_at(expr.depth - 1, 0)
         method: LoxFunction = superclass.find_method(expr.method.lexeme)
 
         if method is None:
             raise LoxRuntimeError(expr.method, f"Undefined property '{expr.method.lexeme}'.")
 
+        if stats.active is not None:
+            stats.active["binds"] += 1
+
         return method.bind(obj)
 
     def visit_this_expr(self, expr: ThisExpr) -> object:
-        return self.__lookup_variable(expr.keyword, expr)
+        return self.__environment.get_at(expr.depth, expr.slot)
 
     def visit_unary_expr(self, expr: UnaryExpr) -> object:
         right: object = self.__evaluate(expr.right)
 
+        if stats.active is not None:
+            stats.active["operator_dispatches"] += 1
+
         return self.__unary_operators[expr.operator.type](expr.operator, right)
 
     def visit_variable_expr(self, expr: VariableExpr) -> object:
-        return self.__lookup_variable(expr.name, expr)
+        return self.__environment.get_at(expr.depth, expr.slot) if expr.depth is not None \
+            else self.globals.get(expr.name)
 
-    def visit_block_stmt(self, stmt: BlockStmt) -> None:
-        self.execute_block(stmt.statements, Environment(self.__environment))
+    def visit_block_stmt(self, stmt: BlockStmt) -> Return | None:
+        return self.execute_block(stmt.statements, Environment(self.__environment))
 
     def visit_class_stmt(self, stmt: ClassStmt) -> None:
         superclass: object | None = None
@@ -153,14 +216,12 @@ class Interpreter(ExprVisitor, StmtVisitor):
             if not isinstance(superclass, LoxClass):
                 raise LoxRuntimeError(stmt.superclass.name, "Superclass must be a class.")
 
-        self.__environment.define(stmt.name.lexeme, None)
-
         if stmt.superclass is not None:
             self.__environment = Environment(self.__environment)
             self.__environment.define("super", superclass)
 
         methods: dict[str, LoxFunction] = \
-            {method.name.lexeme: LoxFunction(method, self.__environment, method.name.lexeme == "init")
+            {method.name.lexeme: LoxFunction(method, self.__environment, self.globals, method.name.lexeme == "init")
              for method in stmt.methods}
 
         klass: LoxClass = LoxClass(stmt.name.lexeme, superclass, methods)
@@ -168,31 +229,39 @@ class Interpreter(ExprVisitor, StmtVisitor):
         if superclass is not None:
             self.__environment = self.__environment.enclosing
 
-        self.__environment.assign(stmt.name, klass)
+        # Unlike jlox, the name is defined only once the class is complete: nothing can observe the class name between
+        # the two points, and this way the class takes the slot the Resolver assigned to it with a single definition
+        self.__environment.define(stmt.name.lexeme, klass)
 
     def visit_expression_stmt(self, stmt: ExpressionStmt) -> None:
         self.__evaluate(stmt.expression)
 
     def visit_function_stmt(self, stmt: FunctionStmt) -> None:
-        function: LoxFunction = LoxFunction(stmt, self.__environment, False)
+        function: LoxFunction = LoxFunction(stmt, self.__environment, self.globals, False)
         self.__environment.define(stmt.name.lexeme, function)
 
-    def visit_if_stmt(self, stmt: IfStmt) -> None:
-        if self.__is_truthy(self.__evaluate(stmt.condition)):
-            self.__execute(stmt.if_clause)
+    def visit_if_stmt(self, stmt: IfStmt) -> Return | None:
+        if is_truthy(self.__evaluate(stmt.condition)):
+            return self.__execute(stmt.if_clause)
         elif stmt.else_clause is not None:
-            self.__execute(stmt.else_clause)
+            return self.__execute(stmt.else_clause)
 
     def visit_print_stmt(self, stmt: PrintStmt) -> None:
         value: object = self.__evaluate(stmt.expression)
-        print(self.__stringify(value))
+        self.lox_main.output.print(stringify(value))
+
+    def visit_return_stmt(self, stmt: ReturnStmt) -> Return:
+        if stats.active is not None:
+            stats.active["returns"] += 1
+
+        if stmt.tail_call:
+            return self.__tail_call(stmt.value)
 
-    def visit_return_stmt(self, stmt: ReturnStmt) -> None:
         value: object | None = None
         if stmt.value is not None:
             value = self.__evaluate(stmt.value)
 
-        raise Return(value)
+        return Return(value)
 
     def visit_var_stmt(self, stmt: VarStmt) -> None:
         value: object | None = None
@@ -201,139 +270,234 @@ class Interpreter(ExprVisitor, StmtVisitor):
 
         self.__environment.define(stmt.name.lexeme, value)
 
-    def visit_while_stmt(self, stmt: WhileStmt) -> None:
-        while self.__is_truthy(self.__evaluate(stmt.condition)):
-            self.__execute(stmt.body)
-
-    def __mode_execute(self, stmt: Stmt, mode: OpMode) -> None:
-        if mode == OpMode.INTERACTIVE and isinstance(stmt, ExpressionStmt):
-            value: object = self.__evaluate(stmt.expression)
-            print(self.__stringify(value))
-        else:
-            self.__execute(stmt)
+    def visit_while_stmt(self, stmt: WhileStmt) -> Return | None:
+        # A body that no closure can capture runs in the same environment on every iteration, emptied in between,
+        # instead of a new one each time
+        body: Stmt = stmt.body
+        environment: Environment | None = None
+        if type(body) is BlockStmt and not body.escapes:
+            environment = Environment(self.__environment)
+
+        counter: VariableExpr | None = self.__loop_counter(stmt)
+        if counter is not None:
+            return self.__counted_loop(stmt, counter, environment)
+
+        while is_truthy(self.__evaluate(stmt.condition)):
+            if environment is not None:
+                environment.values.clear()
+                completion: Return | None = self.execute_block(body.statements, environment)
+            else:
+                completion = self.__execute(body)
+            if completion is not None:
+                return completion
+
+            if stmt.increment is not None:
+                self.__evaluate(stmt.increment)
 
-    def __evaluate(self, expr: Expr) -> object:
-        return expr.accept(self)
+    @staticmethod
+    def __loop_counter(stmt: WhileStmt) -> VariableExpr | None:
+        # The counter of a counted loop, "for (...; i < n; i = i + 1)" and the like: a local variable compared to
+        # anything, then incremented or decremented by a number
+        condition: Expr = stmt.condition
+        if type(condition) is not BinaryExpr or condition.operator.type not in COUNTER_COMPARISONS:
+            return None
+
+        counter: Expr = condition.left
+        increment: Expr | None = stmt.increment
+        if type(counter) is not VariableExpr or counter.depth is None or type(increment) is not AssignExpr:
+            return None
+
+        step: Expr = increment.value
+        if type(step) is not BinaryExpr or step.operator.type not in (TokenType.PLUS, TokenType.MINUS) or \
+                type(step.left) is not VariableExpr or type(step.right) is not LiteralExpr or \
+                type(step.right.value) is not float:
+            return None
+
+        if not counter.depth == increment.depth == step.left.depth or \
+                not counter.slot == increment.slot == step.left.slot:
+            return None
+
+        return counter
+
+    def __counted_loop(self, stmt: WhileStmt, counter: VariableExpr, environment: Environment | None) -> Return | None:
+        # Same as the generic loop, except that the counter is compared and stepped right here when it's a number,
+        # instead of by visiting the condition and the increment and dispatching to the operator handlers
+        values: list[object] = self.__environment.ancestor(counter.depth).values
+        slot: int = counter.slot
+
+        condition: BinaryExpr = stmt.condition
+        compare: Callable[[float, float], bool] = COUNTER_COMPARISONS[condition.operator.type]
+        bound: Expr = condition.right
+
+        step: BinaryExpr = stmt.increment.value
+        amount: float = step.right.value if step.operator.type == TokenType.PLUS else -step.right.value
+        body: Stmt = stmt.body
+
+        while True:
+            value: object = values[slot]
+            limit: object = bound.accept(self)
+            # The comparison and the step are operators all the same
+            if stats.active is not None:
+                stats.active["operator_dispatches"] += 1
+
+            if type(value) is float and type(limit) is float:
+                if not compare(value, limit):
+                    return None
+            elif not is_truthy(self.__binary_operators[condition.operator.type](condition.operator, value, limit)):
+                return None
+
+            if environment is not None:
+                environment.values.clear()
+                completion: Return | None = self.execute_block(body.statements, environment)
+            else:
+                completion = self.__execute(body)
+            if completion is not None:
+                return completion
+
+            if stats.active is not None:
+                stats.active["operator_dispatches"] += 1
+
+            value = values[slot]
+            if type(value) is float:
+                values[slot] = value + amount
+            else:
+                values[slot] = self.__binary_operators[step.operator.type](step.operator, value, step.right.value)
+
+    def __call(self, callee: object, arguments: list[object], paren: Token) -> object:
+        if not isinstance(callee, LoxCallable):
+            raise LoxRuntimeError(paren, "Can only call functions and classes.")
 
-    def __execute(self, stmt: Stmt) -> None:
-        return stmt.accept(self)
+        function: LoxCallable = callee
+        if (arg_no := len(arguments)) != (arity := function.arity()):
+            raise LoxRuntimeError(paren, f"Expected {arity} arguments but got {arg_no}.")
 
-    def __lookup_variable(self, name: Token, expr: Expr) -> object:
-        distance: int | None = self.__locals.get(expr)
-        return self.__environment.get_at(distance, name.lexeme) if distance is not None else self.globals.get(name)
+        if stats.active is not None and isinstance(function, LoxNativeFunction):
+            stats.active["native_calls"] += 1
 
-    def execute_block(self, statements: list[Stmt], environment: Environment) -> None:
-        previous: Environment = self.__environment
         try:
-            self.__environment = environment
-            for statement in statements:
-                self.__execute(statement)
-        finally:
-            self.__environment = previous
+            return function.call(self, arguments)
+        except LoxFunctionError as err:
+            raise LoxRuntimeError(paren, f"in function {err.function}: {err.message}.")
 
-    def resolve(self, expr: Expr, depth: int) -> None:
-        self.__locals |= {expr: depth}
+    # A call to a Lox function in tail position isn't made here but handed over to the function being returned from
+    # (see LoxFunction.call), anything else is called right away
+    def __tail_call(self, expr: CallExpr) -> Return:
+        callee: object = self.__evaluate(expr.callee)
+        arguments: list[object] = self.__arguments(expr.arguments)
 
-    @staticmethod
-    def __is_equal(a: object, b: object) -> bool:
-        # Apparently, the original Java version treats anything of different types as unequal, so we're going to do the
-        # same: if the types aren't precisely the same, the operands aren't equal, otherwise properly check for equality
-        return type(a) is type(b) and a == b
+        if type(callee) is LoxFunction and not callee.is_initializer:
+            if (arg_no := len(arguments)) != (arity := len(callee.params)):
+                raise LoxRuntimeError(expr.paren, f"Expected {arity} arguments but got {arg_no}.")
 
-    @staticmethod
-    def __is_truthy(obj: object) -> bool:
-        if obj is None:
-            return False
-        if isinstance(obj, bool):
-            return obj
+            return TailCall(callee, arguments)
 
-        return True
+        return Return(self.__call(callee, arguments, expr.paren))
 
-    @staticmethod
-    def __check_number_operand(operator: Token, operand: object) -> None:
-        if not isinstance(operand, float):
-            raise LoxRuntimeError(operator, "Operand must be a number.")
+    # A method call ("obj.method(...)") is handled as a whole: a method found on the instance's class is called with
+    # "this" bound directly, without creating a bound method just to call it once. Anything else (fields holding
+    # functions, module members) is an ordinary property access followed by an ordinary call
+    def __invoke(self, expr: CallExpr, get: GetExpr) -> object:
+        obj: object = self.__evaluate(get.obj)
 
-    @staticmethod
-    def __check_number_operands(operator: Token, left: object, right: object) -> None:
-        if not (isinstance(left, float) and isinstance(right, float)):
-            raise LoxRuntimeError(operator, "Operands must be numbers.")
-
-    @staticmethod
-    def __stringify(obj: object) -> str:
-        match obj:
-            case True: return "true"
-            case False: return "false"
-            case None: return "nil"
-            case _ if isinstance(obj, float):
-                text: str = str(obj)
-                if text.endswith(".0"):
-                    text = text[:-2]
-                return text
+        if type(obj) is LoxInstance:
+            if obj.shape is not get.cached_shape:
+                self.__update_cache(get, obj.shape)
 
-        return str(obj)
+            if get.cached_index is None:
+                method: LoxFunction | None = get.cached_method
+                if method is None:
+                    raise LoxRuntimeError(get.name, f"Undefined property '{get.name.lexeme}'.")
 
-    # Operator handlers
+                if stats.active is not None:
+                    stats.active["property_gets"] += 1
+                    stats.active["binds"] += 1
 
-    @staticmethod
-    def __binary_plus_handler(operator: Token, left: object, right: object) -> float | str:
-        if isinstance(left, float) and isinstance(right, float):
-            return left + right
+                arguments: list[object] = self.__arguments(expr.arguments)
+                if (arg_no := len(arguments)) != (arity := len(method.params)):
+                    raise LoxRuntimeError(expr.paren, f"Expected {arity} arguments but got {arg_no}.")
 
-        if isinstance(left, str) and isinstance(right, str):
-            return left + right
+                return method.invoke(self, obj, arguments)
 
-        raise LoxRuntimeError(operator, "Operands must be two numbers or two strings.")
+        callee: object = self.__get_property(obj, get)
+        return self.__call(callee, self.__arguments(expr.arguments), expr.paren)
 
-    def __binary_minus_handler(self, operator: Token, left: SupportsFloat, right: SupportsFloat) -> float:
-        self.__check_number_operands(operator, left, right)
-        return left - right
+    def __get_property(self, obj: object, expr: GetExpr) -> object:
+        # Plain instances are handled here to make use of the inline cache, anything else that has properties (i.e.
+        # modules) knows how to look them up itself
+        if stats.active is not None:
+            stats.active["property_gets"] += 1
 
-    def __binary_slash_handler(self, operator: Token, left: SupportsFloat, right: SupportsFloat) -> float:
-        self.__check_number_operands(operator, left, right)
+        if type(obj) is LoxInstance:
+            if obj.shape is not expr.cached_shape:
+                self.__update_cache(expr, obj.shape)
 
-        # Java, apparently, automatically returns NaN when it encounters 0/0, but Python raises an error. Therefore,
-        # we manually handle this case
-        return nan if left == right == 0 else left / right
+            if expr.cached_index is not None:
+                return obj.values[expr.cached_index]
+            if expr.cached_method is not None:
+                if stats.active is not None:
+                    stats.active["binds"] += 1
+                return expr.cached_method.bind(obj)
 
-    def __binary_percent_handler(self, operator: Token, left: SupportsFloat, right: SupportsFloat) -> float:
-        self.__check_number_operands(operator, left, right)
-        return left % right
+            raise LoxRuntimeError(expr.name, f"Undefined property '{expr.name.lexeme}'.")
 
-    def __binary_star_handler(self, operator: Token, left: SupportsFloat, right: SupportsFloat) -> float:
-        self.__check_number_operands(operator, left, right)
-        return left * right
+        if isinstance(obj, LoxInstance):
+            return obj.get(expr.name)
 
-    def __binary_caret_handler(self, operator: Token, left: SupportsFloat, right: SupportsFloat) -> float:
-        self.__check_number_operands(operator, left, right)
-        return left ** right
+        raise LoxRuntimeError(expr.name, "Only instances have properties.")
 
-    def __binary_gtr_handler(self, operator: Token, left: SupportsFloat, right: SupportsFloat) -> bool:
-        self.__check_number_operands(operator, left, right)
-        return left > right
+    @staticmethod
+    def __update_cache(expr: GetExpr, shape: Shape) -> None:
+        # Monomorphic inline cache: every property access remembers the last shape it saw and where the property was
+        # found for it, either the index of a field or a method. A shape belongs to a single class and neither ever
+        # changes, so an entry never goes stale
+        expr.cached_shape = shape
+        expr.cached_index = shape.indices.get(expr.name.lexeme)
+        expr.cached_method = shape.klass.find_method(expr.name.lexeme) if expr.cached_index is None else None
 
-    def __binary_geq_handler(self, operator: Token, left: SupportsFloat, right: SupportsFloat) -> bool:
-        self.__check_number_operands(operator, left, right)
-        return left >= right
+    def __mode_execute(self, stmt: Stmt, mode: OpMode) -> None:
+        if mode == OpMode.INTERACTIVE and isinstance(stmt, ExpressionStmt):
+            value: object = self.__evaluate(stmt.expression)
+            self.lox_main.output.print(stringify(value))
+        else:
+            self.__execute(stmt)
 
-    def __binary_less_handler(self, operator: Token, left: SupportsFloat, right: SupportsFloat) -> bool:
-        self.__check_number_operands(operator, left, right)
-        return left < right
+    def __evaluate(self, expr: Expr) -> object:
+        return expr.accept(self)
 
-    def __binary_leq_handler(self, operator: Token, left: SupportsFloat, right: SupportsFloat) -> bool:
-        self.__check_number_operands(operator, left, right)
-        return left <= right
+    def __execute(self, stmt: Stmt) -> Return | None:
+        return stmt.accept(self)
 
-    def __unary_minus_handler(self, operator: Token, x: SupportsFloat) -> float:
-        self.__check_number_operand(operator, x)
-        return -x
+    def __arguments(self, arguments: list[Expr]) -> list[object]:
+        # Calls mostly have few arguments, which are evaluated here without the Python frame of a list comprehension
+        count: int = len(arguments)
+        if count == 0:
+            return []
+        if count == 1:
+            return [arguments[0].accept(self)]
+        if count == 2:
+            return [arguments[0].accept(self), arguments[1].accept(self)]
+        if count == 3:
+            return [arguments[0].accept(self), arguments[1].accept(self), arguments[2].accept(self)]
+
+        return [argument.accept(self) for argument in arguments]
+
+    def execute_block(self, statements: list[Stmt], environment: Environment | GlobalEnvironment) -> Return | None:
+        previous: Environment = self.__environment
+        try:
+            self.__environment = environment
+            for statement in statements:
+                completion: Return | None = self.__execute(statement)
+                if completion is not None:
+                    return completion
+        finally:
+            self.__environment = previous
 
     # Method to define native Lox functions (so as to not pollute the __init__)
 
-    def __define_natives(self, functions) -> None:
+    def __define_natives(self, functions, environment: GlobalEnvironment | None = None) -> None:
         for native in functions:
             native: LoxNativeFunction = native()
-            self.globals.define(native.name, native)
+            (environment or self.globals).define(native.name, native)
 
 
 __all__ = "Interpreter", "OpMode"
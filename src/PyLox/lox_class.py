@@ -1,3 +1,4 @@
+from . import stats
 from .errors import LoxRuntimeError
 from .lox_callable import LoxCallable
 from .lox_function import LoxFunction
@@ -12,33 +13,69 @@ class LoxClass(LoxCallable):
         self.methods: dict[str, LoxFunction] = self.superclass.methods | methods if self.superclass is not None \
             else methods
 
+        # The shape of instances without fields, the root of this class's tree of shapes
+        self.shape: Shape = Shape(self, {})
+
+        # Methods never change once the class exists, so the initializer is looked up only once
+        self.__initializer: LoxFunction | None = self.methods.get("init")
+        self.__arity: int = 0 if self.__initializer is None else self.__initializer.arity()
+
     def find_method(self, name: str) -> LoxFunction | None:
         return self.methods.get(name)
 
     def call(self, interpreter, arguments: list[object]) -> object:
         instance: LoxInstance = LoxInstance(self)
-        initializer: LoxFunction = self.find_method("init")
-        if initializer is not None:
-            initializer.bind(instance).call(interpreter, arguments)
+        if self.__initializer is not None:
+            self.__initializer.invoke(interpreter, instance, arguments)
 
         return instance
 
     def arity(self) -> int:
-        initializer: LoxFunction = self.find_method("init")
-        return 0 if initializer is None else initializer.arity()
+        return self.__arity
 
     def __str__(self) -> str:
         return f"<class {self.name}>"
 
 
+class Shape:
+    # A hidden class: the layout of the fields of an instance. Instances of a class that got the same fields in the same
+    # order share a shape, so field names are stored once per shape rather than once per instance, and each instance
+    # only keeps a list of values. Shapes form a tree rooted in the class: adding a field to an instance moves it to the
+    # child shape for the field's name, which is created the first time any instance takes that path
+    __slots__ = "klass", "indices", "transitions"
+
+    def __init__(self, klass: LoxClass, indices: dict[str, int]):
+        self.klass: LoxClass = klass
+        self.indices: dict[str, int] = indices
+        self.transitions: dict[str, Shape] = {}
+
+    def with_field(self, name: str) -> "Shape":
+        shape: Shape | None = self.transitions.get(name)
+        if shape is None:
+            shape = self.transitions[name] = Shape(self.klass, self.indices | {name: len(self.indices)})
+
+        return shape
+
+
 class LoxInstance:
+    # Public, so that the engines can access fields directly on their fast paths
+    __slots__ = "shape", "values"
+
     def __init__(self, klass: LoxClass):
-        self.klass: LoxClass = klass
-        self.__fields: dict[str, object] = {}
+        self.shape: Shape = klass.shape
+        self.values: list[object] = []
+
+        if stats.active is not None:
+            stats.active["instances"] += 1
+
+    @property
+    def klass(self) -> LoxClass:
+        return self.shape.klass
 
     def get(self, name: Token) -> object:
-        if name.lexeme in self.__fields:
-            return self.__fields[name.lexeme]
+        index: int | None = self.shape.indices.get(name.lexeme)
+        if index is not None:
+            return self.values[index]
 
         method: LoxFunction | None = self.klass.find_method(name.lexeme)
         if method is not None:
@@ -47,10 +84,15 @@ class LoxInstance:
         raise LoxRuntimeError(name, f"Undefined property '{name.lexeme}'.")
 
     def set(self, name: Token, value: object) -> None:
-        self.__fields |= {name.lexeme: value}
+        index: int | None = self.shape.indices.get(name.lexeme)
+        if index is not None:
+            self.values[index] = value
+        else:
+            self.shape = self.shape.with_field(name.lexeme)
+            self.values.append(value)
 
     def __str__(self) -> str:
         return f"<{self.klass.name} instance>"
 
 
-__all__ = "LoxClass", "LoxInstance"
+__all__ = "LoxClass", "LoxInstance", "Shape"
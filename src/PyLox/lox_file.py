@@ -0,0 +1,17 @@
+from typing import TextIO
+
+
+class LoxFile:
+    # A file opened by the "open" native (or the standard input). Reads and writes go through the buffered Python file
+    # object, and reading line by line keeps only the current line in memory, however large the file is
+    __slots__ = "file", "name"
+
+    def __init__(self, file: TextIO, name: str):
+        self.file: TextIO = file
+        self.name: str = name
+
+    def __str__(self) -> str:
+        return f"<file {self.name}>"
+
+
+__all__ = "LoxFile",
@@ -1,37 +1,106 @@
-from .environment import Environment
+from . import stats
+from .environment import Environment, GlobalEnvironment
 from .lox_callable import LoxCallable
-from .return_class import Return
+from .profiler import CallFrames
+from .return_class import Return, TailCall
 from .stmt import FunctionStmt
 
 
 class LoxFunction(LoxCallable):
-    def __init__(self, declaration: FunctionStmt, closure: Environment, is_initializer: bool):
+    def __init__(self, declaration: FunctionStmt, closure: Environment, function_globals: GlobalEnvironment,
+                 is_initializer: bool):
         self.__declaration: FunctionStmt = declaration
         self.__closure: Environment = closure
+        # The globals of the module the function was defined in, which may not be those of its caller
+        self.__globals: GlobalEnvironment = function_globals
         self.__is_initializer: bool = is_initializer
+        # Public, like ClosureFunction's, so that the interpreter can check the number of arguments without a call
+        self.params: list[str] = [param.lexeme for param in declaration.params]
 
     def bind(self, instance):
         environment: Environment = Environment(self.__closure)
         environment.define("this", instance)
 
-        return LoxFunction(self.__declaration, environment, self.__is_initializer)
+        return LoxFunction(self.__declaration, environment, self.__globals, self.__is_initializer)
 
     def call(self, interpreter, arguments: list[object]) -> object:
+        # Parameters are the first slots of the function's scope, in order, so the arguments are the frame itself.
+        # Argument lists are built for the call by every caller, which is why the list is used as it is
+        if stats.active is not None:
+            stats.active["calls"] += 1
         environment: Environment = Environment(self.__closure)
+        environment.values = arguments
 
-        # A tiny sprinkle of Haskell-like functional programming:
-        for param, argument in zip(self.__declaration.params, arguments):
-            environment.define(param.lexeme, argument)
+        previous: GlobalEnvironment = interpreter.globals
+        try:
+            interpreter.globals = self.__globals
+            completion: Return | None = interpreter.execute_block(self.__declaration.body, environment)
+            if type(completion) is TailCall:
+                completion = self.__trampoline(interpreter, completion)
+        finally:
+            interpreter.globals = previous
+
+        if self.__is_initializer:
+            return self.__closure.get_at(0, 0)
+
+        return None if completion is None else completion.value
 
+    # Same as bind(instance).call(interpreter, arguments), without creating the bound method
+    def invoke(self, interpreter, instance, arguments: list[object]) -> object:
+        if stats.active is not None:
+            stats.active["calls"] += 1
+        this_environment: Environment = Environment(self.__closure)
+        this_environment.values.append(instance)
+        environment: Environment = Environment(this_environment)
+        environment.values = arguments
+
+        previous: GlobalEnvironment = interpreter.globals
         try:
-            interpreter.execute_block(self.__declaration.body, environment)
-        except Return as return_value:
-            return self.__closure.get_at(0, "this") if self.__is_initializer else return_value.value
+            interpreter.globals = self.__globals
+            completion: Return | None = interpreter.execute_block(self.__declaration.body, environment)
+            if type(completion) is TailCall:
+                completion = self.__trampoline(interpreter, completion)
+        finally:
+            interpreter.globals = previous
+
+        if self.__is_initializer:
+            return instance
+
+        return None if completion is None else completion.value
+
+    @staticmethod
+    def __trampoline(interpreter, completion: TailCall) -> Return | None:
+        # Calls in tail position are made here one after another, in place of the call that started the chain, so that
+        # tail-recursive functions run in constant Python stack. The caller restores the globals afterwards
+        while type(completion) is TailCall:
+            if stats.active is not None:
+                stats.active["calls"] += 1
+
+            function: LoxFunction = completion.function
+            environment: Environment = Environment(function.__closure)
+            environment.values = completion.arguments
+
+            interpreter.globals = function.__globals
+            completion = interpreter.execute_block(function.__declaration.body, environment)
+
+        return completion
+
+    @staticmethod
+    def call_frames() -> CallFrames:
+        # For the profiler: the methods that run the body of a Lox function, and which function they run
+        return {
+            LoxFunction.call.__code__: lambda values: values["self"].__declaration.name,
+            LoxFunction.invoke.__code__: lambda values: values["self"].__declaration.name,
+            LoxFunction.__trampoline.__code__:
+                lambda values: values["function"].__declaration.name if "function" in values else None
+        }
 
-        return self.__closure.get_at(0, "this") if self.__is_initializer else None
+    @property
+    def is_initializer(self) -> bool:
+        return self.__is_initializer
 
     def arity(self) -> int:
-        return len(self.__declaration.params)
+        return len(self.params)
 
     def __str__(self) -> str:
         return f"<fn {self.__declaration.name.lexeme}>"
@@ -0,0 +1,11 @@
+class LoxList:
+    # The list type. It wraps a Python list instead of being one, so that lists are compared by identity (like
+    # instances) rather than element by element with Python's notion of equality, under which true == 1
+    __slots__ = "elements",
+
+    def __init__(self, elements: list[object]):
+        # Public, so that the engines and natives work on the Python list directly
+        self.elements: list[object] = elements
+
+
+__all__ = "LoxList",
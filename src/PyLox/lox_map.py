@@ -0,0 +1,37 @@
+class LoxMap:
+    # The map type, a wrapper around a Python dictionary compared by identity (see LoxList). Keys may be any Lox values,
+    # but dictionaries compare keys with Python's notion of equality, under which true == 1 (and they hash the same).
+    # Booleans are therefore stored as stand-in keys, so that keys are equal exactly when they are equal in Lox
+    __slots__ = "entries",
+
+    __true_key: object = object()
+    __false_key: object = object()
+
+    def __init__(self, entries: dict[object, object]):
+        # Public, so that the engines and natives work on the Python dictionary directly. Its keys must come from
+        # to_key, see keys() to get the Lox values back
+        self.entries: dict[object, object] = entries
+
+    @staticmethod
+    def to_key(value: object) -> object:
+        if value is True:
+            return LoxMap.__true_key
+        if value is False:
+            return LoxMap.__false_key
+
+        return value
+
+    @staticmethod
+    def from_key(key: object) -> object:
+        if key is LoxMap.__true_key:
+            return True
+        if key is LoxMap.__false_key:
+            return False
+
+        return key
+
+    def keys(self) -> list[object]:
+        return [self.from_key(key) for key in self.entries]
+
+
+__all__ = "LoxMap",
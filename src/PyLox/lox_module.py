@@ -0,0 +1,35 @@
+from .environment import GlobalEnvironment
+from .errors import LoxRuntimeError
+from .lox_class import LoxInstance, Shape
+from .tokenclass import Token
+
+
+class LoxModule(LoxInstance):
+    # A module is the value returned by "require": its properties are the top-level definitions of the module, i.e. the
+    # global environment the module was executed in. It derives from LoxInstance so that property access and
+    # assignment work on it exactly like on instances, in every engine
+    def __init__(self, name: str, module_globals: GlobalEnvironment, natives: list[type]):
+        # LoxInstance.__init__ isn't called, as a module isn't an instance of a class and mustn't be counted as one. The
+        # slots still get values, so that code reading them after an isinstance check finds a module without fields
+        self.shape: Shape = Shape(None, {})
+        self.values: list[object] = []
+        self.name: str = name
+        self.globals: GlobalEnvironment = module_globals
+
+        # The engines define the native functions in the globals of every module, but they aren't members of the module
+        self.__natives: tuple[type, ...] = tuple(natives)
+
+    def get(self, name: Token) -> object:
+        if name.lexeme in self.globals.values and type(self.globals.values[name.lexeme]) not in self.__natives:
+            return self.globals.values[name.lexeme]
+
+        raise LoxRuntimeError(name, f"Undefined property '{name.lexeme}'.")
+
+    def set(self, name: Token, value: object) -> None:
+        self.globals.define(name.lexeme, value)
+
+    def __str__(self) -> str:
+        return f"<module {self.name}>"
+
+
+__all__ = "LoxModule",
@@ -1,12 +1,19 @@
 import math
+import sys
 import time
 from abc import ABC, abstractmethod
-from pathlib import Path
-
+from array import array
+from typing import Callable
 from .errors import LoxFunctionError
 from .lox_callable import LoxCallable
 from .lox_class import *
-from .lox_function import LoxFunction
+from .lox_file import LoxFile
+from .lox_list import LoxList
+from .lox_map import LoxMap
+from .lox_module import LoxModule
+from .lox_string_builder import LoxStringBuilder
+from .lox_vector import LoxVector
+from .operators import stringify
 
 
 class LoxNativeFunction(LoxCallable, ABC):
@@ -33,15 +40,19 @@ class Require(LoxNativeFunction):
     def arity(self) -> int:
         return 1
 
-    def call(self, interpreter, arguments: list[object]) -> None:
+    def call(self, interpreter, arguments: list[object]) -> LoxModule:
         lib = arguments[0]
-        lib_path = Path(str(lib))
+        path = interpreter.lox_main.find_module(str(lib))
 
-        if lib_path.is_file() and lib_path.suffix == ".lox":
-            interpreter.lox_main.run_file(lib)
-        else:
+        if path is None:
             raise LoxFunctionError(self.name, f"{lib} not found or is not a valid Lox library")
 
+        module: LoxModule | None = interpreter.lox_main.load_module(path)
+        if module is None:
+            raise LoxFunctionError(self.name, f"{lib} contains errors")
+
+        return module
+
 
 class Clock(LoxNativeFunction):
     def __init__(self):
@@ -61,10 +72,39 @@ class GetLine(LoxNativeFunction):
     def arity(self) -> int:
         return 0
 
+    # Whatever has been printed so far (a prompt, typically) must be visible before waiting for input
     def call(self, interpreter, _: list[object]) -> str:
+        interpreter.lox_main.output.flush()
         return input()
 
 
+class Flush(LoxNativeFunction):
+    def __init__(self):
+        self.name: str = "flush"
+
+    def arity(self) -> int:
+        return 0
+
+    def call(self, interpreter, _: list[object]) -> None:
+        interpreter.lox_main.output.flush()
+
+
+class Statistics(LoxNativeFunction):
+    # The counts of the events counted so far (see stats.py), or nil if they aren't being counted
+    def __init__(self):
+        self.name: str = "stats"
+
+    def arity(self) -> int:
+        return 0
+
+    def call(self, interpreter, _: list[object]) -> LoxMap | None:
+        stats = interpreter.lox_main.stats
+        if stats is None:
+            return None
+
+        return LoxMap({event: float(count) for event, count in stats.counts().items()})
+
+
 class Type(LoxNativeFunction):
     def __init__(self):
         self.name: str = "type"
@@ -81,10 +121,22 @@ class Type(LoxNativeFunction):
             return "number"
         elif isinstance(obj, str):
             return "string"
-        elif isinstance(obj, (LoxFunction, LoxNativeFunction)):
-            return "function"
+        elif isinstance(obj, LoxList):
+            return "list"
+        elif isinstance(obj, LoxMap):
+            return "map"
+        elif isinstance(obj, LoxVector):
+            return "vector"
+        elif isinstance(obj, LoxStringBuilder):
+            return "stringbuilder"
+        elif isinstance(obj, LoxFile):
+            return "file"
         elif isinstance(obj, LoxClass):
             return "class"
+        elif isinstance(obj, LoxCallable):
+            return "function"
+        elif isinstance(obj, LoxModule):
+            return "module"
         elif isinstance(obj, LoxInstance):
             return obj.klass.name
         elif obj is None:
@@ -105,6 +157,8 @@ class ToString(LoxNativeFunction):
 
         if isinstance(obj, LoxNativeFunction):
             return f"fn <{obj.name}>"
+        if isinstance(obj, (LoxList, LoxMap, LoxVector, LoxStringBuilder)):
+            return stringify(obj)
 
         return str(obj)
 
@@ -128,158 +182,584 @@ class ToNumber(LoxNativeFunction):
             raise LoxFunctionError(self.name, "The string doesn't represent a valid number")
 
 
-# Mathematical functions
+# Collection functions
+
+class Length(LoxNativeFunction):
+    def __init__(self):
+        self.name: str = "len"
+
+    def arity(self) -> int:
+        return 1
+
+    def call(self, interpreter, arguments: list[object]) -> float:
+        obj: object = arguments[0]
+
+        if isinstance(obj, LoxList):
+            return float(len(obj.elements))
+        if isinstance(obj, LoxMap):
+            return float(len(obj.entries))
+        if isinstance(obj, LoxVector):
+            return float(len(obj.values))
+        if isinstance(obj, str):
+            return float(len(obj))
+        if isinstance(obj, LoxStringBuilder):
+            return float(obj.length)
+
+        raise LoxFunctionError(self.name, "Expect type 'list', 'map', 'vector', 'string' or 'stringbuilder'")
+
+
+class Push(LoxNativeFunction):
+    def __init__(self):
+        self.name: str = "push"
+
+    def arity(self) -> int:
+        return 2
+
+    def call(self, interpreter, arguments: list[object]) -> None:
+        obj: object = arguments[0]
+
+        if not isinstance(obj, LoxList):
+            raise LoxFunctionError(self.name, "Expect type 'list'")
+
+        obj.elements.append(arguments[1])
+
+
+class Pop(LoxNativeFunction):
+    def __init__(self):
+        self.name: str = "pop"
+
+    def arity(self) -> int:
+        return 1
+
+    def call(self, interpreter, arguments: list[object]) -> object:
+        obj: object = arguments[0]
+
+        if not isinstance(obj, LoxList):
+            raise LoxFunctionError(self.name, "Expect type 'list'")
+        if not obj.elements:
+            raise LoxFunctionError(self.name, "Can't pop from an empty list")
+
+        return obj.elements.pop()
+
+
+class MapFunction(LoxNativeFunction, ABC):
+    @abstractmethod
+    def __init__(self):
+        self.name: str | None = None
+
+    def check_map(self, argument: object) -> LoxMap:
+        if not isinstance(argument, LoxMap):
+            raise LoxFunctionError(self.name, "Expect type 'map'")
+
+        return argument
+
+
+class Get(MapFunction):
+    def __init__(self):
+        self.name: str = "get"
+
+    def arity(self) -> int:
+        return 2
+
+    # Missing keys are nil, use "has" to tell them from keys set to nil
+    def call(self, interpreter, arguments: list[object]) -> object:
+        lox_map: LoxMap = self.check_map(arguments[0])
+        return lox_map.entries.get(LoxMap.to_key(arguments[1]))
+
+
+class Set(MapFunction):
+    def __init__(self):
+        self.name: str = "set"
+
+    def arity(self) -> int:
+        return 3
+
+    def call(self, interpreter, arguments: list[object]) -> None:
+        lox_map: LoxMap = self.check_map(arguments[0])
+        lox_map.entries[LoxMap.to_key(arguments[1])] = arguments[2]
+
+
+class Has(MapFunction):
+    def __init__(self):
+        self.name: str = "has"
+
+    def arity(self) -> int:
+        return 2
+
+    def call(self, interpreter, arguments: list[object]) -> bool:
+        lox_map: LoxMap = self.check_map(arguments[0])
+        return LoxMap.to_key(arguments[1]) in lox_map.entries
+
+
+class Delete(MapFunction):
+    def __init__(self):
+        self.name: str = "delete"
+
+    def arity(self) -> int:
+        return 2
+
+    # Returns whether the key was there
+    def call(self, interpreter, arguments: list[object]) -> bool:
+        lox_map: LoxMap = self.check_map(arguments[0])
+        key: object = LoxMap.to_key(arguments[1])
+
+        if key not in lox_map.entries:
+            return False
+
+        del lox_map.entries[key]
+        return True
+
+
+class Keys(MapFunction):
+    def __init__(self):
+        self.name: str = "keys"
+
+    def arity(self) -> int:
+        return 1
+
+    # A new list of the keys, in insertion order. This copies them, O(n) time and memory per call, unlike the rest of
+    # the map functions: Lox has no iteration protocol, so going through a map means indexing the result of keys(),
+    # which a live view of the dictionary couldn't do in constant time. The copy also lets the loop change the map
+    def call(self, interpreter, arguments: list[object]) -> LoxList:
+        lox_map: LoxMap = self.check_map(arguments[0])
+        return LoxList(lox_map.keys())
+
+
+# String builder functions
+
+class StringBuilder(LoxNativeFunction):
+    def __init__(self):
+        self.name: str = "stringbuilder"
+
+    def arity(self) -> int:
+        return 0
+
+    def call(self, interpreter, _: list[object]) -> LoxStringBuilder:
+        return LoxStringBuilder()
+
+
+class BuilderFunction(LoxNativeFunction, ABC):
+    @abstractmethod
+    def __init__(self):
+        self.name: str | None = None
+
+    def check_builder(self, argument: object) -> LoxStringBuilder:
+        if not isinstance(argument, LoxStringBuilder):
+            raise LoxFunctionError(self.name, "Expect type 'stringbuilder'")
+
+        return argument
+
+
+class Append(BuilderFunction):
+    def __init__(self):
+        self.name: str = "append"
+
+    def arity(self) -> int:
+        return 2
+
+    # Values are appended the way "print" shows them
+    def call(self, interpreter, arguments: list[object]) -> None:
+        builder: LoxStringBuilder = self.check_builder(arguments[0])
+        builder.append(stringify(arguments[1]))
+
+
+class AppendLine(BuilderFunction):
+    def __init__(self):
+        self.name: str = "appendline"
+
+    def arity(self) -> int:
+        return 2
+
+    def call(self, interpreter, arguments: list[object]) -> None:
+        builder: LoxStringBuilder = self.check_builder(arguments[0])
+        builder.append(stringify(arguments[1]) + "\n")
+
+
+class Build(BuilderFunction):
+    def __init__(self):
+        self.name: str = "build"
+
+    def arity(self) -> int:
+        return 1
+
+    def call(self, interpreter, arguments: list[object]) -> str:
+        builder: LoxStringBuilder = self.check_builder(arguments[0])
+        return builder.build()
+
+
+# File functions. Files are read and written as UTF-8 text
+
+class FileFunction(LoxNativeFunction, ABC):
+    @abstractmethod
+    def __init__(self):
+        self.name: str | None = None
+
+    def check_path(self, argument: object) -> str:
+        if not isinstance(argument, str):
+            raise LoxFunctionError(self.name, "Expect type 'string'")
+
+        return argument
+
+    def check_file(self, argument: object) -> LoxFile:
+        if not isinstance(argument, LoxFile):
+            raise LoxFunctionError(self.name, "Expect type 'file'")
+
+        return argument
+
+    # Errors of the operating system (missing files, denied permissions...) and operations on closed files or in the
+    # wrong mode are reported as errors of the function
+    def io_error(self, error: OSError | ValueError) -> LoxFunctionError:
+        if isinstance(error, OSError) and error.strerror is not None:
+            message: str = error.strerror if error.filename is None else f"{error.strerror}: '{error.filename}'"
+        else:
+            message = str(error).rstrip(".")
+
+        return LoxFunctionError(self.name, message[:1].upper() + message[1:])
+
+
+class ReadFile(FileFunction):
+    def __init__(self):
+        self.name: str = "readfile"
+
+    def arity(self) -> int:
+        return 1
+
+    def call(self, interpreter, arguments: list[object]) -> str:
+        path: str = self.check_path(arguments[0])
+
+        try:
+            with open(path, "rt", encoding="utf-8") as file:
+                return file.read()
+        except (OSError, ValueError) as error:
+            raise self.io_error(error)
+
+
+class WriteFile(FileFunction):
+    def __init__(self):
+        self.name: str = "writefile"
+        self.mode: str = "wt"
+
+    def arity(self) -> int:
+        return 2
+
+    # Values are written the way "print" shows them
+    def call(self, interpreter, arguments: list[object]) -> None:
+        path: str = self.check_path(arguments[0])
+
+        try:
+            with open(path, self.mode, encoding="utf-8") as file:
+                file.write(stringify(arguments[1]))
+        except (OSError, ValueError) as error:
+            raise self.io_error(error)
+
+
+class AppendFile(WriteFile):
+    def __init__(self):
+        self.name: str = "appendfile"
+        self.mode: str = "at"
+
+
+class Open(FileFunction):
+    def __init__(self):
+        self.name: str = "open"
+
+    def arity(self) -> int:
+        return 2
+
+    # "r" to read the file, "w" to replace it or "a" to append to it
+    def call(self, interpreter, arguments: list[object]) -> LoxFile:
+        path: str = self.check_path(arguments[0])
+        mode: object = arguments[1]
+
+        if mode not in ("r", "w", "a"):
+            raise LoxFunctionError(self.name, "Expect mode 'r', 'w' or 'a'")
+
+        try:
+            return LoxFile(open(path, f"{mode}t", encoding="utf-8"), path)
+        except (OSError, ValueError) as error:
+            raise self.io_error(error)
+
+
+class Stdin(FileFunction):
+    def __init__(self):
+        self.name: str = "stdin"
+
+    def arity(self) -> int:
+        return 0
+
+    def call(self, interpreter, _: list[object]) -> LoxFile:
+        return LoxFile(sys.stdin, "<stdin>")
+
+
+class ReadLine(FileFunction):
+    def __init__(self):
+        self.name: str = "readline"
+
+    def arity(self) -> int:
+        return 1
+
+    # The next line without its line break, or nil at the end of the file
+    def call(self, interpreter, arguments: list[object]) -> str | None:
+        lox_file: LoxFile = self.check_file(arguments[0])
+        if lox_file.file is sys.stdin:
+            interpreter.lox_main.output.flush()
+
+        try:
+            line: str = lox_file.file.readline()
+        except (OSError, ValueError) as error:
+            raise self.io_error(error)
+
+        if not line:
+            return None
+        return line[:-1] if line.endswith("\n") else line
+
+
+class Read(FileFunction):
+    def __init__(self):
+        self.name: str = "read"
+
+    def arity(self) -> int:
+        return 1
+
+    # Everything from the current position to the end of the file
+    def call(self, interpreter, arguments: list[object]) -> str:
+        lox_file: LoxFile = self.check_file(arguments[0])
+        if lox_file.file is sys.stdin:
+            interpreter.lox_main.output.flush()
+
+        try:
+            return lox_file.file.read()
+        except (OSError, ValueError) as error:
+            raise self.io_error(error)
+
+
+class Write(FileFunction):
+    def __init__(self):
+        self.name: str = "write"
+
+    def arity(self) -> int:
+        return 2
+
+    def call(self, interpreter, arguments: list[object]) -> None:
+        lox_file: LoxFile = self.check_file(arguments[0])
+
+        try:
+            lox_file.file.write(stringify(arguments[1]))
+        except (OSError, ValueError) as error:
+            raise self.io_error(error)
+
+
+class Close(FileFunction):
+    def __init__(self):
+        self.name: str = "close"
+
+    def arity(self) -> int:
+        return 1
+
+    def call(self, interpreter, arguments: list[object]) -> None:
+        lox_file: LoxFile = self.check_file(arguments[0])
+
+        # The standard input belongs to the interpreter, which still reads from it (the REPL, the input natives)
+        if lox_file.file is sys.stdin:
+            return None
+
+        try:
+            lox_file.file.close()
+        except OSError as error:
+            raise self.io_error(error)
+
+
+# Vector functions
+
+class Vector(LoxNativeFunction):
+    def __init__(self):
+        self.name: str = "vector"
+
+    def arity(self) -> int:
+        return 1
+
+    # A vector of the numbers in a list (or another vector), or a vector of zeros of the given size
+    def call(self, interpreter, arguments: list[object]) -> LoxVector:
+        obj: object = arguments[0]
+
+        if isinstance(obj, LoxVector):
+            return LoxVector(array("d", obj.values))
+        if isinstance(obj, LoxList):
+            if not all(isinstance(element, float) for element in obj.elements):
+                raise LoxFunctionError(self.name, "Expect a list of numbers")
+            return LoxVector(array("d", obj.elements))
+        if isinstance(obj, float):
+            if not obj.is_integer() or obj < 0:
+                raise LoxFunctionError(self.name, "Expect a non-negative integer size")
+            return LoxVector(array("d", bytes(8 * int(obj))))
+
+        raise LoxFunctionError(self.name, "Expect type 'list', 'vector' or 'number'")
+
+
+class Linspace(LoxNativeFunction):
+    def __init__(self):
+        self.name: str = "linspace"
+
+    def arity(self) -> int:
+        return 3
+
+    # "count" evenly spaced numbers from "start" to "stop", both included
+    def call(self, interpreter, arguments: list[object]) -> LoxVector:
+        start, stop, count = arguments
+
+        if not all(isinstance(argument, float) for argument in arguments):
+            raise LoxFunctionError(self.name, "Expect type 'number'")
+        if not count.is_integer() or count < 0:
+            raise LoxFunctionError(self.name, "Expect a non-negative integer count")
+        if count == 1:
+            return LoxVector(array("d", [start]))
+
+        step: float = (stop - start) / (count - 1) if count else 0.0
+        return LoxVector(array("d", (start + i * step for i in range(int(count)))))
+
+
+class Sum(LoxNativeFunction):
+    def __init__(self):
+        self.name: str = "sum"
+
+    def arity(self) -> int:
+        return 1
+
+    def call(self, interpreter, arguments: list[object]) -> float:
+        obj: object = arguments[0]
+
+        if not isinstance(obj, LoxVector):
+            raise LoxFunctionError(self.name, "Expect type 'vector'")
+
+        return math.fsum(obj.values)
+
+
+# Mathematical functions. They take a number, or a vector to which they are applied elementwise
 
 class MathFunction(LoxNativeFunction, ABC):
     @abstractmethod
     def __init__(self):
         self.name: str | None = None
+        # Applied to each number. Preferably a builtin, so that mapping it over a vector doesn't run any Python code
+        self.function: Callable[[float], float] | None = None
 
     def arity(self) -> int:
         return 1
 
     def check_number(self, argument: object) -> float | None:
         if not isinstance(argument, float):
-            raise LoxFunctionError(self.name, "Expect type 'number'")
+            raise LoxFunctionError(self.name, "Expect type 'number' or 'vector'")
 
         return argument
 
-    @abstractmethod
-    def call(self, interpreter, arguments: list[object]) -> object: ...
+    def call(self, interpreter, arguments: list[object]) -> float | LoxVector:
+        obj: object = arguments[0]
+        function: Callable[[float], float] = self.function
+
+        try:
+            if isinstance(obj, LoxVector):
+                return LoxVector(array("d", map(function, obj.values)))
+            return function(self.check_number(obj))
+        except (ValueError, OverflowError) as error:
+            raise LoxFunctionError(self.name, str(error).capitalize())
 
 
 class Exponent(MathFunction):
     def __init__(self):
         self.name: str = "exp"
-
-    def call(self, interpreter, arguments: list[object]) -> float:
-        obj: float = self.check_number(arguments[0])
-        return math.exp(obj)
+        self.function: Callable[[float], float] = math.exp
 
 
 class Logarithm(MathFunction):
     def __init__(self):
         self.name: str = "log"
-
-    def call(self, interpreter, arguments: list[object]) -> float:
-        obj: float = self.check_number(arguments[0])
-        return math.log(obj)
+        self.function: Callable[[float], float] = math.log
 
 
 class ToRadians(MathFunction):
     def __init__(self):
         self.name: str = "rad"
-
-    def call(self, interpreter, arguments: list[object]) -> float:
-        obj: float = self.check_number(arguments[0])
-        return math.radians(obj)
+        self.function: Callable[[float], float] = math.radians
 
 
 class Sine(MathFunction):
     def __init__(self):
         self.name: str = "sin"
-
-    def call(self, interpreter, arguments: list[object]) -> float:
-        obj: float = self.check_number(arguments[0])
-        return math.sin(obj)
+        self.function: Callable[[float], float] = math.sin
 
 
 class ArcSine(MathFunction):
     def __init__(self):
         self.name: str = "asin"
-
-    def call(self, interpreter, arguments: list[object]) -> float:
-        obj: float = self.check_number(arguments[0])
-        return math.asin(obj)
+        self.function: Callable[[float], float] = math.asin
 
 
 class Cosine(MathFunction):
     def __init__(self):
         self.name: str = "cos"
-
-    def call(self, interpreter, arguments: list[object]) -> float:
-        obj: float = self.check_number(arguments[0])
-        return math.cos(obj)
+        self.function: Callable[[float], float] = math.cos
 
 
 class ArcCosine(MathFunction):
     def __init__(self):
         self.name: str = "acos"
-
-    def call(self, interpreter, arguments: list[object]) -> float:
-        obj: float = self.check_number(arguments[0])
-        return math.acos(obj)
+        self.function: Callable[[float], float] = math.acos
 
 
 class Tangent(MathFunction):
     def __init__(self):
         self.name: str = "tan"
-
-    def call(self, interpreter, arguments: list[object]) -> float:
-        obj: float = self.check_number(arguments[0])
-        return math.tan(obj)
+        self.function: Callable[[float], float] = math.tan
 
 
 class ArcTangent(MathFunction):
     def __init__(self):
         self.name: str = "atan"
-
-    def call(self, interpreter, arguments: list[object]) -> float:
-        obj: float = self.check_number(arguments[0])
-        return math.atan(obj)
+        self.function: Callable[[float], float] = math.atan
 
 
 class Ceiling(MathFunction):
     def __init__(self):
         self.name: str = "ceil"
-
-    def call(self, interpreter, arguments: list[object]) -> float:
-        obj: float = self.check_number(arguments[0])
-        return math.ceil(obj)
+        self.function: Callable[[float], float] = math.ceil
 
 
 class Floor(MathFunction):
     def __init__(self):
         self.name: str = "floor"
-
-    def call(self, interpreter, arguments: list[object]) -> float:
-        obj: float = self.check_number(arguments[0])
-        return math.floor(obj)
+        self.function: Callable[[float], float] = math.floor
 
 
 class Round(MathFunction):
     def __init__(self):
         self.name: str = "round"
-
-    def call(self, interpreter, arguments: list[object]) -> float:
-        obj: float = self.check_number(arguments[0])
-        return round(obj)
+        self.function: Callable[[float], float] = round
 
 
 class Absolute(MathFunction):
     def __init__(self):
-        self.name = "abs"
-
-    def call(self, interpreter, arguments: list[object]) -> float:
-        obj: float = self.check_number(arguments[0])
-        return abs(obj)
+        self.name: str = "abs"
+        self.function: Callable[[float], float] = abs
 
 
 class Sign(MathFunction):
     def __init__(self):
         self.name: str = "sign"
+        self.function: Callable[[float], float] = self.__sign
 
-    def call(self, interpreter, arguments: list[object]) -> float:
-        obj: float = self.check_number(arguments[0])
-
-        if obj == 0:
+    @staticmethod
+    def __sign(x: float) -> float:
+        if x == 0:
             return 0
-        elif obj > 0:
+        elif x > 0:
             return 1
         return -1
 
 
-native_functions: list = [Clock, GetLine, Type, ToString, ToNumber, Require, Exponent, Logarithm, ToRadians, Sine,
-                          Cosine, Tangent, ArcSine, ArcCosine, ArcTangent, Ceiling, Floor, Round, Absolute, Sign]
+native_functions: list = [Clock, GetLine, Flush, Statistics, Type, ToString, ToNumber, Require, Length, Push, Pop, Get,
+                          Set, Has, Delete, Keys, StringBuilder, Append, AppendLine, Build, ReadFile, WriteFile,
+                          AppendFile, Open, Stdin, ReadLine, Read, Write, Close, Vector, Linspace, Sum, Exponent,
+                          Logarithm, ToRadians, Sine, Cosine, Tangent, ArcSine, ArcCosine, ArcTangent, Ceiling, Floor,
+                          Round, Absolute, Sign]
 
 __all__ = "LoxNativeFunction", "native_functions"
@@ -0,0 +1,23 @@
+class LoxStringBuilder:
+    # A string that is built piece by piece. Concatenating strings with "+" copies both operands each time, which makes
+    # building a string in a loop quadratic in its length; appending to a builder only stores the piece, and the pieces
+    # are joined once when the string is needed
+    __slots__ = "parts", "length"
+
+    def __init__(self):
+        self.parts: list[str] = []
+        self.length: int = 0
+
+    def append(self, text: str) -> None:
+        self.parts.append(text)
+        self.length += len(text)
+
+    def build(self) -> str:
+        # The joined string replaces the pieces, so that building again without appending in between is cheap
+        if len(self.parts) > 1:
+            self.parts = ["".join(self.parts)]
+
+        return self.parts[0] if self.parts else ""
+
+
+__all__ = "LoxStringBuilder",
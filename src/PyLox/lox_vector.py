@@ -0,0 +1,15 @@
+from array import array
+
+
+class LoxVector:
+    # The numeric vector type: a fixed-size sequence of numbers packed into a C array of doubles. Arithmetic operators
+    # and the mathematical natives work on all elements at once, so that numerical code does a single native operation
+    # per vector instead of an interpreted one per element. Compared by identity, like lists
+    __slots__ = "values",
+
+    def __init__(self, values: array):
+        # Public, so that the operators and natives work on the array directly. Its type code must be 'd'
+        self.values: array = values
+
+
+__all__ = "LoxVector",
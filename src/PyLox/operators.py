@@ -0,0 +1,298 @@
+from array import array
+from itertools import repeat
+from math import copysign, inf, nan, pow
+from operator import add, mul, neg, sub
+from typing import Callable, SupportsFloat
+
+from .errors import LoxRuntimeError
+from .lox_list import LoxList
+from .lox_map import LoxMap
+from .lox_string_builder import LoxStringBuilder
+from .lox_vector import LoxVector
+from .tokenclass import *
+
+
+# Semantics of Lox operators shared by all execution engines. The engines are free to inline fast paths for the most
+# common operand types, but they must fall back to these functions for everything else, so that results and error
+# messages stay identical no matter which engine runs the code
+
+def is_equal(a: object, b: object) -> bool:
+    # Apparently, the original Java version treats anything of different types as unequal, so we're going to do the
+    # same: if the types aren't precisely the same, the operands aren't equal, otherwise properly check for equality
+    return type(a) is type(b) and a == b
+
+
+def is_truthy(obj: object) -> bool:
+    if obj is None:
+        return False
+    if isinstance(obj, bool):
+        return obj
+
+    return True
+
+
+def stringify(obj: object) -> str:
+    match obj:
+        case True: return "true"
+        case False: return "false"
+        case None: return "nil"
+        case _ if isinstance(obj, float):
+            text: str = str(obj)
+            if text.endswith(".0"):
+                text = text[:-2]
+            return text
+        case LoxList() | LoxMap():
+            return stringify_collection(obj, set())
+        case LoxVector():
+            return f"vector[{', '.join(stringify(value) for value in obj.values)}]"
+        case LoxStringBuilder():
+            return obj.build()
+
+    return str(obj)
+
+
+def stringify_collection(collection: LoxList | LoxMap, enclosing: set[int]) -> str:
+    # Lists and maps are shown the way they are written. A collection that (directly or not) contains itself is shown
+    # as "[...]" where it recurs instead of recursing forever
+    if id(collection) in enclosing:
+        return "[...]"
+
+    def item(value: object) -> str:
+        return stringify_collection(value, enclosing) if isinstance(value, (LoxList, LoxMap)) else stringify(value)
+
+    enclosing.add(id(collection))
+    if isinstance(collection, LoxList):
+        text: str = ", ".join(item(element) for element in collection.elements)
+    else:
+        text = ", ".join(f"{item(LoxMap.from_key(key))}: {item(value)}" for key, value in collection.entries.items())
+        text = text or ":"
+    enclosing.remove(id(collection))
+
+    return f"[{text}]"
+
+
+def check_number_operand(operator: Token, operand: object) -> None:
+    if not isinstance(operand, float):
+        raise LoxRuntimeError(operator, "Operand must be a number.")
+
+
+def check_number_operands(operator: Token, left: object, right: object) -> None:
+    if not (isinstance(left, float) and isinstance(right, float)):
+        raise LoxRuntimeError(operator, "Operands must be numbers.")
+
+
+# Subscripts of lists and vectors. Indices are integral numbers, negative ones count from the end. A slice bound that's
+# omitted (or nil) extends the slice to the corresponding end, bounds out of range are clamped
+
+def check_index(bracket: Token, index: object, length: int) -> int:
+    if not isinstance(index, float) or not index.is_integer():
+        raise LoxRuntimeError(bracket, "Index must be an integer.")
+
+    position: int = int(index)
+    if position < 0:
+        position += length
+    if not 0 <= position < length:
+        raise LoxRuntimeError(bracket, "Index out of range.")
+
+    return position
+
+
+def check_slice_bound(bracket: Token, bound: object) -> int | None:
+    if bound is None:
+        return None
+    if not isinstance(bound, float) or not bound.is_integer():
+        raise LoxRuntimeError(bracket, "Slice bounds must be integers.")
+
+    return int(bound)
+
+
+def get_index(bracket: Token, obj: object, index: object) -> object:
+    if isinstance(obj, LoxList):
+        return obj.elements[check_index(bracket, index, len(obj.elements))]
+    if isinstance(obj, LoxVector):
+        return obj.values[check_index(bracket, index, len(obj.values))]
+
+    raise LoxRuntimeError(bracket, "Only lists and vectors can be indexed.")
+
+
+def set_index(bracket: Token, obj: object, index: object, value: object) -> object:
+    if isinstance(obj, LoxList):
+        obj.elements[check_index(bracket, index, len(obj.elements))] = value
+        return value
+    if isinstance(obj, LoxVector):
+        position: int = check_index(bracket, index, len(obj.values))
+        if not isinstance(value, float):
+            raise LoxRuntimeError(bracket, "Vector elements must be numbers.")
+        obj.values[position] = value
+        return value
+
+    raise LoxRuntimeError(bracket, "Only lists and vectors can be indexed.")
+
+
+def get_slice(bracket: Token, obj: object, start: object, end: object) -> LoxList | LoxVector:
+    if isinstance(obj, LoxList):
+        return LoxList(obj.elements[check_slice_bound(bracket, start):check_slice_bound(bracket, end)])
+    if isinstance(obj, LoxVector):
+        return LoxVector(obj.values[check_slice_bound(bracket, start):check_slice_bound(bracket, end)])
+
+    raise LoxRuntimeError(bracket, "Only lists and vectors can be sliced.")
+
+
+# Elementwise arithmetic on vectors. Both operands are vectors of the same length, or one of them is a number that is
+# combined with every element of the other. The loop over the elements runs in C through map(), with the same function
+# the operator uses on two numbers, so that "x op y" has the same value whether or not it's computed within a vector
+
+def vector_operation(operator: Token, left: object, right: object,
+                     function: Callable[[float, float], float]) -> LoxVector:
+    if isinstance(left, LoxVector):
+        if isinstance(right, LoxVector):
+            if len(left.values) != len(right.values):
+                raise LoxRuntimeError(operator, "Vectors must have the same length.")
+            return LoxVector(array("d", map(function, left.values, right.values)))
+        if isinstance(right, float):
+            return LoxVector(array("d", map(function, left.values, repeat(right))))
+    elif isinstance(left, float) and isinstance(right, LoxVector):
+        return LoxVector(array("d", map(function, repeat(left), right.values)))
+
+    raise LoxRuntimeError(operator, "Operands must be numbers or vectors.")
+
+
+def divide(left: float, right: float) -> float:
+    # IEEE 754 division, like Java: Python raises an error instead of returning an infinity or NaN for a zero divisor
+    if right:
+        return left / right
+    if left == 0 or left != left:
+        return nan
+
+    return copysign(inf, left) * copysign(1.0, right)
+
+
+def power(base: float, exponent: float) -> float:
+    # Unlike "**", which returns a complex number for a negative base and a fractional exponent, and raises an error for
+    # a zero base and a negative exponent or on overflow, this always returns a number, NaN or an infinity like Java
+    try:
+        return pow(base, exponent)
+    except ValueError:
+        return inf if base == 0 else nan
+    except OverflowError:
+        return -inf if base < 0 and exponent % 2 == 1 else inf
+
+
+# Operator handlers
+
+def binary_plus_handler(operator: Token, left: object, right: object) -> float | str | LoxVector:
+    if isinstance(left, float) and isinstance(right, float):
+        return left + right
+
+    if isinstance(left, str) and isinstance(right, str):
+        return left + right
+
+    if isinstance(left, LoxVector) or isinstance(right, LoxVector):
+        return vector_operation(operator, left, right, add)
+
+    raise LoxRuntimeError(operator, "Operands must be two numbers or two strings.")
+
+
+def binary_minus_handler(operator: Token, left: SupportsFloat, right: SupportsFloat) -> float | LoxVector:
+    if isinstance(left, LoxVector) or isinstance(right, LoxVector):
+        return vector_operation(operator, left, right, sub)
+
+    check_number_operands(operator, left, right)
+    return left - right
+
+
+def binary_slash_handler(operator: Token, left: SupportsFloat, right: SupportsFloat) -> float | LoxVector:
+    if isinstance(left, LoxVector) or isinstance(right, LoxVector):
+        return vector_operation(operator, left, right, divide)
+
+    check_number_operands(operator, left, right)
+    return divide(left, right)
+
+
+def binary_percent_handler(operator: Token, left: SupportsFloat, right: SupportsFloat) -> float:
+    check_number_operands(operator, left, right)
+    return left % right
+
+
+def binary_star_handler(operator: Token, left: SupportsFloat, right: SupportsFloat) -> float | LoxVector:
+    if isinstance(left, LoxVector) or isinstance(right, LoxVector):
+        return vector_operation(operator, left, right, mul)
+
+    check_number_operands(operator, left, right)
+    return left * right
+
+
+def binary_caret_handler(operator: Token, left: SupportsFloat, right: SupportsFloat) -> float | LoxVector:
+    if isinstance(left, LoxVector) or isinstance(right, LoxVector):
+        return vector_operation(operator, left, right, power)
+
+    check_number_operands(operator, left, right)
+    return power(left, right)
+
+
+def binary_gtr_handler(operator: Token, left: SupportsFloat, right: SupportsFloat) -> bool:
+    check_number_operands(operator, left, right)
+    return left > right
+
+
+def binary_geq_handler(operator: Token, left: SupportsFloat, right: SupportsFloat) -> bool:
+    check_number_operands(operator, left, right)
+    return left >= right
+
+
+def binary_less_handler(operator: Token, left: SupportsFloat, right: SupportsFloat) -> bool:
+    check_number_operands(operator, left, right)
+    return left < right
+
+
+def binary_leq_handler(operator: Token, left: SupportsFloat, right: SupportsFloat) -> bool:
+    check_number_operands(operator, left, right)
+    return left <= right
+
+
+def binary_equal_handler(_: Token, left: object, right: object) -> bool:
+    return is_equal(left, right)
+
+
+def binary_neq_handler(_: Token, left: object, right: object) -> bool:
+    return not is_equal(left, right)
+
+
+def unary_minus_handler(operator: Token, x: SupportsFloat) -> float | LoxVector:
+    if isinstance(x, LoxVector):
+        return LoxVector(array("d", map(neg, x.values)))
+
+    check_number_operand(operator, x)
+    return -x
+
+
+def unary_bang_handler(_: Token, x: object) -> bool:
+    return not is_truthy(x)
+
+
+unary_operators: dict[TokenType, callable] = {
+    TokenType.MINUS: unary_minus_handler,
+    TokenType.BANG: unary_bang_handler
+}
+
+binary_operators: dict[TokenType, callable] = {
+    TokenType.MINUS: binary_minus_handler,
+    TokenType.PLUS: binary_plus_handler,
+    TokenType.SLASH: binary_slash_handler,
+    TokenType.STAR: binary_star_handler,
+    TokenType.CARET: binary_caret_handler,
+    TokenType.PERCENT: binary_percent_handler,
+    TokenType.GREATER: binary_gtr_handler,
+    TokenType.GREATER_EQUAL: binary_geq_handler,
+    TokenType.LESS: binary_less_handler,
+    TokenType.LESS_EQUAL: binary_leq_handler,
+    TokenType.BANG_EQUAL: binary_neq_handler,
+    TokenType.EQUAL_EQUAL: binary_equal_handler
+}
+
+
+__all__ = ("is_equal", "is_truthy", "stringify", "get_index", "set_index", "get_slice",
+           "unary_operators", "binary_operators",
+           "binary_plus_handler", "binary_minus_handler", "binary_slash_handler", "binary_percent_handler",
+           "binary_star_handler", "binary_caret_handler", "binary_gtr_handler", "binary_geq_handler",
+           "binary_less_handler", "binary_leq_handler", "unary_minus_handler")
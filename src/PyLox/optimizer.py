@@ -0,0 +1,266 @@
+import sys
+
+from .errors import LoxRuntimeError
+from .expr import *
+from .operators import *
+from .stmt import *
+from .tokenclass import *
+
+
+class Optimizer(ExprVisitor, StmtVisitor):
+    # Folds constant expressions and removes unreachable branches from a resolved program. Folding uses the very same
+    # operator handlers as the interpreters, so a folded expression has exactly the value it would have at runtime.
+    # Expressions that would fail at runtime are left alone, so that the error is still reported (with the correct
+    # line) when, and if, the expression is actually evaluated
+
+    def __init__(self, debug: bool = False):
+        self.__debug: bool = debug
+
+        # Same idea as in the bytecode compiler: one entry per scope known to the Resolver, False for the scopes of
+        # blocks this pass has removed. Resolved depths of variables have to be decreased by the number of removed
+        # scopes between their use and their declaration
+        self.__scopes: list[bool] = []
+
+    def optimize(self, statements: list[Stmt]) -> list[Stmt]:
+        return self.__optimize_sequence(statements)
+
+    # Expressions
+
+    def visit_assign_expr(self, expr: AssignExpr) -> Expr:
+        expr.value = self.__optimize(expr.value)
+        self.__relocate(expr)
+
+        return expr
+
+    def visit_binary_expr(self, expr: BinaryExpr) -> Expr:
+        expr.left = self.__optimize(expr.left)
+        expr.right = self.__optimize(expr.right)
+
+        if not (isinstance(expr.left, LiteralExpr) and isinstance(expr.right, LiteralExpr)):
+            return expr
+
+        try:
+            value: object = binary_operators[expr.operator.type](expr.operator, expr.left.value, expr.right.value)
+        except (LoxRuntimeError, ArithmeticError):
+            return expr
+
+        self.__report(expr.operator.line, f"folded {self.__describe(expr.left.value)} {expr.operator.lexeme} "
+                                          f"{self.__describe(expr.right.value)} into {self.__describe(value)}")
+        return LiteralExpr(value)
+
+    def visit_call_expr(self, expr: CallExpr) -> Expr:
+        expr.callee = self.__optimize(expr.callee)
+        expr.arguments = [self.__optimize(argument) for argument in expr.arguments]
+
+        return expr
+
+    def visit_get_expr(self, expr: GetExpr) -> Expr:
+        expr.obj = self.__optimize(expr.obj)
+        return expr
+
+    def visit_grouping_expr(self, expr: GroupingExpr) -> Expr:
+        # Grouping only matters to the parser, once the tree is built it's just an extra node to walk through
+        return self.__optimize(expr.expression)
+
+    def visit_index_expr(self, expr: IndexExpr) -> Expr:
+        expr.obj = self.__optimize(expr.obj)
+        expr.index = self.__optimize(expr.index)
+
+        return expr
+
+    def visit_list_expr(self, expr: ListExpr) -> Expr:
+        expr.elements = [self.__optimize(element) for element in expr.elements]
+        return expr
+
+    @staticmethod
+    def visit_literal_expr(expr: LiteralExpr) -> Expr:
+        return expr
+
+    def visit_logical_expr(self, expr: LogicalExpr) -> Expr:
+        expr.left = self.__optimize(expr.left)
+        expr.right = self.__optimize(expr.right)
+
+        if not isinstance(expr.left, LiteralExpr):
+            return expr
+
+        # The right operand doesn't have to be constant: it's either skipped or becomes the value of the expression
+        short_circuits: bool = is_truthy(expr.left.value) == (expr.operator.type == TokenType.OR)
+        result: Expr = expr.left if short_circuits else expr.right
+
+        self.__report(expr.operator.line, f"folded {self.__describe(expr.left.value)} {expr.operator.lexeme} ... "
+                                          f"into its {'left' if short_circuits else 'right'} operand")
+        return result
+
+    def visit_map_expr(self, expr: MapExpr) -> Expr:
+        expr.keys = [self.__optimize(key) for key in expr.keys]
+        expr.values = [self.__optimize(value) for value in expr.values]
+
+        return expr
+
+    def visit_set_expr(self, expr: SetExpr) -> Expr:
+        expr.obj = self.__optimize(expr.obj)
+        expr.value = self.__optimize(expr.value)
+
+        return expr
+
+    def visit_set_index_expr(self, expr: SetIndexExpr) -> Expr:
+        expr.obj = self.__optimize(expr.obj)
+        expr.index = self.__optimize(expr.index)
+        expr.value = self.__optimize(expr.value)
+
+        return expr
+
+    def visit_slice_expr(self, expr: SliceExpr) -> Expr:
+        expr.obj = self.__optimize(expr.obj)
+
+        if expr.start is not None:
+            expr.start = self.__optimize(expr.start)
+        if expr.end is not None:
+            expr.end = self.__optimize(expr.end)
+
+        return expr
+
+    def visit_super_expr(self, expr: SuperExpr) -> Expr:
+        self.__relocate(expr)
+        return expr
+
+    def visit_this_expr(self, expr: ThisExpr) -> Expr:
+        self.__relocate(expr)
+        return expr
+
+    def visit_unary_expr(self, expr: UnaryExpr) -> Expr:
+        expr.right = self.__optimize(expr.right)
+
+        if not isinstance(expr.right, LiteralExpr):
+            return expr
+
+        try:
+            value: object = unary_operators[expr.operator.type](expr.operator, expr.right.value)
+        except LoxRuntimeError:
+            return expr
+
+        self.__report(expr.operator.line, f"folded {expr.operator.lexeme}{self.__describe(expr.right.value)} "
+                                          f"into {self.__describe(value)}")
+        return LiteralExpr(value)
+
+    def visit_variable_expr(self, expr: VariableExpr) -> Expr:
+        self.__relocate(expr)
+        return expr
+
+    # Statements. Visiting a statement returns its replacement or None if the statement can be dropped altogether
+
+    def visit_block_stmt(self, stmt: BlockStmt) -> Stmt | None:
+        # A block that declares nothing and holds at most one statement can be replaced by that statement, which also
+        # removes its scope. The decision has to be made before the statements are visited, since the depths of the
+        # variables inside are adjusted along the way
+        unwrap: bool = len(stmt.statements) <= 1 and not isinstance(stmt.statements[0] if stmt.statements else None,
+                                                                     (VarStmt, FunctionStmt, ClassStmt))
+
+        self.__scopes.append(not unwrap)
+        stmt.statements = self.__optimize_sequence(stmt.statements)
+        self.__scopes.pop()
+
+        if not unwrap:
+            return stmt
+
+        if not stmt.statements:
+            self.__report(None, "removed an empty block")
+            return None
+
+        self.__report(None, "unwrapped a single-statement block")
+        return stmt.statements[0]
+
+    def visit_class_stmt(self, stmt: ClassStmt) -> Stmt:
+        if stmt.superclass is not None:
+            self.__relocate(stmt.superclass)
+
+        scope_count: int = 2 if stmt.superclass is not None else 1
+        self.__scopes.extend([True] * scope_count)
+        for method in stmt.methods:
+            self.__optimize_function(method)
+        del self.__scopes[-scope_count:]
+
+        return stmt
+
+    def visit_expression_stmt(self, stmt: ExpressionStmt) -> Stmt:
+        stmt.expression = self.__optimize(stmt.expression)
+        return stmt
+
+    def visit_function_stmt(self, stmt: FunctionStmt) -> Stmt:
+        self.__optimize_function(stmt)
+        return stmt
+
+    def visit_if_stmt(self, stmt: IfStmt) -> Stmt | None:
+        stmt.condition = self.__optimize(stmt.condition)
+        if_clause: Stmt | None = self.__optimize(stmt.if_clause)
+        else_clause: Stmt | None = self.__optimize(stmt.else_clause) if stmt.else_clause is not None else None
+
+        if isinstance(stmt.condition, LiteralExpr):
+            taken: bool = is_truthy(stmt.condition.value)
+            self.__report(None, f"removed the {'else' if taken else 'then'} branch of an 'if' with constant "
+                                f"condition {self.__describe(stmt.condition.value)}")
+            return if_clause if taken else else_clause
+
+        stmt.if_clause = if_clause if if_clause is not None else BlockStmt([])
+        stmt.else_clause = else_clause
+        return stmt
+
+    def visit_print_stmt(self, stmt: PrintStmt) -> Stmt:
+        stmt.expression = self.__optimize(stmt.expression)
+        return stmt
+
+    def visit_return_stmt(self, stmt: ReturnStmt) -> Stmt:
+        if stmt.value is not None:
+            stmt.value = self.__optimize(stmt.value)
+
+        return stmt
+
+    def visit_var_stmt(self, stmt: VarStmt) -> Stmt:
+        if stmt.initializer is not None:
+            stmt.initializer = self.__optimize(stmt.initializer)
+
+        return stmt
+
+    def visit_while_stmt(self, stmt: WhileStmt) -> Stmt | None:
+        stmt.condition = self.__optimize(stmt.condition)
+        body: Stmt | None = self.__optimize(stmt.body)
+        if stmt.increment is not None:
+            stmt.increment = self.__optimize(stmt.increment)
+
+        if isinstance(stmt.condition, LiteralExpr) and not is_truthy(stmt.condition.value):
+            self.__report(None, f"removed a 'while' loop with constant condition "
+                                f"{self.__describe(stmt.condition.value)}")
+            return None
+
+        stmt.body = body if body is not None else BlockStmt([])
+        return stmt
+
+    # Helpers
+
+    def __optimize(self, target: Expr | Stmt) -> Expr | Stmt | None:
+        return target.accept(self)
+
+    def __optimize_sequence(self, statements: list[Stmt]) -> list[Stmt]:
+        optimized: list[Stmt | None] = [self.__optimize(statement) for statement in statements]
+        return [statement for statement in optimized if statement is not None]
+
+    def __optimize_function(self, function: FunctionStmt) -> None:
+        self.__scopes.append(True)
+        function.body = self.__optimize_sequence(function.body)
+        self.__scopes.pop()
+
+    def __relocate(self, expr: AssignExpr | SuperExpr | ThisExpr | VariableExpr) -> None:
+        if expr.depth:
+            expr.depth -= self.__scopes[len(self.__scopes) - expr.depth:].count(False)
+
+    def __report(self, line: int | None, message: str) -> None:
+        if self.__debug:
+            where: str = f"[line {line}] " if line is not None else ""
+            print(f"{where}Optimizer: {message}.", file=sys.stderr)
+
+    @staticmethod
+    def __describe(value: object) -> str:
+        return f'"{value}"' if isinstance(value, str) else stringify(value)
+
+
+__all__ = "Optimizer",
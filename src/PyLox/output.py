@@ -0,0 +1,41 @@
+import sys
+from typing import TextIO
+
+
+class Output:
+    # Where "print" writes. Printed lines are collected and written to the file in chunks of about "buffer_size"
+    # characters, instead of with a write (and, on a terminal, a flush) per line. With a buffer size of 0 every line is
+    # written and flushed at once. Lox flushes the buffer whenever its output must be visible: after running a script or
+    # a line of the REPL, before reporting an error and before reading input
+    __slots__ = "__file", "__buffer_size", "__lines", "__size"
+
+    DEFAULT_BUFFER_SIZE: int = 64 * 1024
+
+    def __init__(self, file: TextIO | None = None, buffer_size: int = DEFAULT_BUFFER_SIZE):
+        # Without a file, the output goes to whatever sys.stdout is at the time of writing, so that redirecting it
+        # (as pytest's capture does) works even after the interpreter has been created
+        self.__file: TextIO | None = file
+        self.__buffer_size: int = buffer_size
+        self.__lines: list[str] = []
+        self.__size: int = 0
+
+    def print(self, text: str) -> None:
+        self.__lines.append(text)
+        self.__size += len(text) + 1
+
+        if self.__size > self.__buffer_size:
+            self.flush()
+
+    def flush(self) -> None:
+        file: TextIO = self.__file if self.__file is not None else sys.stdout
+
+        if self.__lines:
+            self.__lines.append("")
+            file.write("\n".join(self.__lines))
+            self.__lines.clear()
+            self.__size = 0
+
+        file.flush()
+
+
+__all__ = "Output",
@@ -1,3 +1,5 @@
+from typing import Iterable, Iterator
+
 from .errors import ParseError
 from .expr import *
 from .stmt import *
@@ -16,17 +18,21 @@ class Parser:
         TokenType.RETURN
     ]
 
-    def __init__(self, tokens: list[Token], lox_main):
+    # The parser never looks further than one token ahead or one token back, so tokens are taken from an iterator and
+    # only the current and the previous ones are kept. This way tokens can be produced lazily by the scanner
+    def __init__(self, tokens: Iterable[Token], lox_main):
         self.__lox_main = lox_main
-        self.__current: int = 0
-        self.__tokens: list[Token] = tokens
+        self.__tokens: Iterator[Token] = iter(tokens)
+        self.__current: Token = next(self.__tokens)
+        self.__previous_token: Token | None = None
 
     def parse(self) -> list[Stmt]:
-        statements: list[Stmt] = []
-        while not self.__is_at_end():
-            statements.append(self.__declaration())
+        return list(self.declarations())
 
-        return statements
+    # Yields top-level declarations one by one, as soon as each of them is parsed
+    def declarations(self) -> Iterator[Stmt | None]:
+        while not self.__is_at_end():
+            yield self.__declaration()
 
     def __statement(self) -> Stmt:
         stmt_tokens: dict[TokenType, callable] = {
@@ -101,12 +107,11 @@ class Parser:
 
         body: Stmt = self.__statement()
 
-        if increment is not None:
-            body = BlockStmt([body, ExpressionStmt(increment)])
-
+        # The increment is part of the loop rather than of a block wrapped around the body, which would be a scope (and
+        # for the tree-walking interpreter, a new environment) per iteration
         if condition is None:
             condition = LiteralExpr(True)
-        body = WhileStmt(condition, body)
+        body = WhileStmt(condition, body, increment)
 
         if initializer is not None:
             body = BlockStmt([initializer, body])
@@ -196,6 +201,8 @@ class Parser:
                 return AssignExpr(expr.name, value)
             elif isinstance(expr, GetExpr):
                 return SetExpr(expr.obj, expr.name, value)
+            elif isinstance(expr, IndexExpr):
+                return SetIndexExpr(expr.obj, expr.bracket, expr.index, value)
 
             self.__error(equals, "Invalid assignment target.")
 
@@ -304,6 +311,8 @@ class Parser:
             expr: Expr = self.__expression()
             self.__consume(TokenType.RIGHT_PAREN, "Expect ')' after expression.")
             return GroupingExpr(expr)
+        if self.__match(TokenType.LEFT_BRACKET):
+            return self.__list_or_map()
 
         self.__error(self.__peek(), "Expect expression.")
 
@@ -316,11 +325,57 @@ class Parser:
             elif self.__match(TokenType.DOT):
                 name: Token = self.__consume(TokenType.IDENTIFIER, "Expect property name after '.'.")
                 expr = GetExpr(expr, name)
+            elif self.__match(TokenType.LEFT_BRACKET):
+                expr = self.__finish_subscript(expr)
             else:
                 break
 
         return expr
 
+    # Lists ("[a, b]") and maps ("[key: value, ...]") share the brackets, the first element tells them apart. A
+    # lone colon ("[:]") makes the empty map
+    def __list_or_map(self) -> Expr:
+        if self.__match(TokenType.RIGHT_BRACKET):
+            return ListExpr([])
+        if self.__match(TokenType.COLON):
+            self.__consume(TokenType.RIGHT_BRACKET, "Expect ']' after ':' of an empty map.")
+            return MapExpr([], [])
+
+        first: Expr = self.__expression()
+        if self.__match(TokenType.COLON):
+            return self.__finish_map(first)
+
+        elements: list[Expr] = [first]
+        while self.__match(TokenType.COMMA):
+            elements.append(self.__expression())
+
+        self.__consume(TokenType.RIGHT_BRACKET, "Expect ']' after list elements.")
+        return ListExpr(elements)
+
+    def __finish_map(self, first_key: Expr) -> MapExpr:
+        keys: list[Expr] = [first_key]
+        values: list[Expr] = [self.__expression()]
+
+        while self.__match(TokenType.COMMA):
+            keys.append(self.__expression())
+            self.__consume(TokenType.COLON, "Expect ':' after map key.")
+            values.append(self.__expression())
+
+        self.__consume(TokenType.RIGHT_BRACKET, "Expect ']' after map entries.")
+        return MapExpr(keys, values)
+
+    # Either an index ("list[i]") or a slice ("list[start:end]", where both bounds may be omitted)
+    def __finish_subscript(self, obj: Expr) -> Expr:
+        start: Expr | None = None if self.__check(TokenType.COLON) else self.__expression()
+
+        if self.__match(TokenType.COLON):
+            end: Expr | None = None if self.__check(TokenType.RIGHT_BRACKET) else self.__expression()
+            bracket: Token = self.__consume(TokenType.RIGHT_BRACKET, "Expect ']' after slice.")
+            return SliceExpr(obj, bracket, start, end)
+
+        bracket = self.__consume(TokenType.RIGHT_BRACKET, "Expect ']' after index.")
+        return IndexExpr(obj, bracket, start)
+
     def __finish_call(self, callee: Expr) -> Expr:
         arguments: list[Expr] = []
 
@@ -360,18 +415,19 @@ class Parser:
 
     def __advance(self) -> Token:
         if not self.__is_at_end():
-            self.__current += 1
+            self.__previous_token = self.__current
+            self.__current = next(self.__tokens)
 
         return self.__previous()
 
     def __is_at_end(self) -> bool:
-        return self.__peek().type == TokenType.EOF
+        return self.__current.type == TokenType.EOF
 
     def __peek(self) -> Token:
-        return self.__tokens[self.__current]
+        return self.__current
 
     def __previous(self) -> Token:
-        return self.__tokens[self.__current - 1]
+        return self.__previous_token
 
     def __consume(self, typ: TokenType, message: str) -> Token:
         if self.__check(typ):
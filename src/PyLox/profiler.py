@@ -0,0 +1,263 @@
+import signal
+import sys
+import time
+from collections import Counter
+from enum import Enum
+from types import CodeType, FrameType
+from typing import Callable, TextIO
+
+from . import environment
+from .expr import Expr
+from .stmt import *
+from .tokenclass import Token
+
+# A Lox call stack, outermost call first: the name of each function called (None for the top level of the script) and
+# the line it's at, when known
+LoxStack = list[tuple[Token | None, int | None]]
+# The Python functions through which an engine calls Lox functions, by code object, and how to tell from the locals of
+# one of their frames which Lox function it's running, if it's running one yet
+CallFrames = dict[CodeType, Callable[[dict[str, object]], Token | None]]
+
+
+class ProfileMode(Enum):
+    SAMPLE = "sample"
+    TRACE = "trace"
+
+
+def nested_code(function: Callable, name: str) -> CodeType:
+    # The code of a function defined inside another one, which can't be reached otherwise before it has been created
+    return next(constant for constant in function.__code__.co_consts
+                if isinstance(constant, CodeType) and constant.co_name == name)
+
+
+def token_line(values: dict[str, object]) -> int | None:
+    # The line of the code a frame of an engine is working on, from the first token among its locals, or among the
+    # fields of the node it's visiting
+    for value in values.values():
+        if type(value) is Token:
+            return value.line
+
+        if isinstance(value, (Expr, Stmt)):
+            for field in vars(value).values():
+                if type(field) is Token:
+                    return field.line
+
+    return None
+
+
+def lox_call(frame: FrameType, calls: CallFrames) -> Token | None:
+    # The Lox function whose body a new Python frame runs, if any. Call frames also create environments (and may call
+    # each other), which aren't the Lox function itself
+    caller: FrameType | None = frame.f_back
+    code: CodeType = frame.f_code
+
+    if caller is not None and caller.f_code in calls and code not in calls and code.co_filename != environment.__file__:
+        return calls[caller.f_code](caller.f_locals)
+
+    return None
+
+
+def walk_frames(frame: FrameType | None, calls: CallFrames, files: set[str]) -> LoxStack:
+    # The Lox stack of an engine that makes a Python call for every Lox call: a call frame starts a new Lox call, and
+    # the innermost frame of the engine within it that knows about a token gives the line
+    stack: LoxStack = []
+    line: int | None = None
+
+    while frame is not None:
+        code: CodeType = frame.f_code
+
+        if code in calls:
+            name: Token | None = calls[code](frame.f_locals)
+            if name is not None:
+                stack.append((name, line))
+                line = None
+        elif line is None and code.co_filename in files:
+            line = token_line(frame.f_locals)
+
+        frame = frame.f_back
+
+    stack.append((None, line))
+    stack.reverse()
+    return stack
+
+
+class Profiler:
+    # Attributes the time spent running Lox code to Lox functions and lines, in one of two ways:
+    # - Sampling: a CPU-time timer interrupts the program every "interval" seconds, and the signal handler records the
+    #   Lox stack, which the engine rebuilds from the Python stack. The program itself runs at full speed, and the
+    #   report is statistical: self and total time as shares of the samples, and the lines where they were taken
+    # - Tracing: every Python call and return goes through a profile function, which records each Lox call as it
+    #   starts and ends. Call counts and times are exact, but the program runs several times slower, and there is no
+    #   line information
+    # Both modes can also write the stacks in the "collapsed" format of flame graph tools, one "outer;inner count" line
+    # per distinct stack, weighted by samples or by microseconds of self time
+    DEFAULT_INTERVAL: float = 0.001
+
+    def __init__(self, mode: ProfileMode, interval: float = DEFAULT_INTERVAL):
+        self.mode: ProfileMode = mode
+        self.__interval: float = interval
+        self.__engine = None
+        # Qualified names of the functions declared in the programs run so far, e.g. "Class.method", by name token
+        self.__names: dict[Token, str] = {}
+
+        # Sampling: how many samples each Lox stack got
+        self.__samples: Counter[tuple] = Counter()
+        self.__previous_handler = None
+
+        # Tracing: calls in progress (frame of the body, name, path of names, start time, time spent in callees), calls
+        # per function, exact time per function and self time per path
+        self.__calls: CallFrames = {}
+        self.__active: list[list] = []
+        self.__depths: Counter[Token | None] = Counter()
+        self.__counts: Counter[Token | None] = Counter()
+        self.__self_times: Counter[Token | None] = Counter()
+        self.__total_times: Counter[Token | None] = Counter()
+        self.__path_times: Counter[tuple] = Counter()
+
+    def attach(self, engine) -> None:
+        self.__engine = engine
+
+    def register(self, statements: list[Stmt], prefix: str = "") -> None:
+        for statement in statements:
+            if isinstance(statement, FunctionStmt):
+                name: str = prefix + statement.name.lexeme
+                self.__names[statement.name] = name
+                self.register(statement.body, f"{name}.")
+            elif isinstance(statement, ClassStmt):
+                for method in statement.methods:
+                    self.register([method], f"{prefix}{statement.name.lexeme}.")
+            elif isinstance(statement, BlockStmt):
+                self.register(statement.statements, prefix)
+            elif isinstance(statement, IfStmt):
+                self.register([statement.if_clause], prefix)
+                if statement.else_clause is not None:
+                    self.register([statement.else_clause], prefix)
+            elif isinstance(statement, WhileStmt):
+                self.register([statement.body], prefix)
+
+    def start(self) -> None:
+        if self.mode == ProfileMode.SAMPLE:
+            self.__previous_handler = signal.signal(signal.SIGPROF, self.__sample)
+            signal.setitimer(signal.ITIMER_PROF, self.__interval, self.__interval)
+        else:
+            self.__calls = self.__engine.start_tracing()
+            self.__active = [[None, None, (None,), time.perf_counter(), 0.0]]
+            self.__counts[None] += 1
+            sys.setprofile(self.__trace)
+
+    def stop(self) -> None:
+        if self.mode == ProfileMode.SAMPLE:
+            signal.setitimer(signal.ITIMER_PROF, 0, 0)
+            signal.signal(signal.SIGPROF, self.__previous_handler)
+        else:
+            sys.setprofile(None)
+            self.__engine.stop_tracing()
+
+            # Calls still in progress, the top level at least, end now
+            now: float = time.perf_counter()
+            while self.__active:
+                self.__end_call(now)
+
+    def __sample(self, signum: int, frame: FrameType | None) -> None:
+        self.__samples[tuple(self.__engine.lox_stack(frame))] += 1
+
+    def __trace(self, frame: FrameType, event: str, arg: object) -> None:
+        if event == "call":
+            name: Token | None = lox_call(frame, self.__calls)
+
+            if name is not None:
+                self.__active.append([frame, name, self.__active[-1][2] + (name,), time.perf_counter(), 0.0])
+                self.__depths[name] += 1
+                self.__counts[name] += 1
+
+        elif event == "return" and frame is self.__active[-1][0]:
+            self.__end_call(time.perf_counter())
+
+    def __end_call(self, now: float) -> None:
+        _, name, path, start, callees = self.__active.pop()
+        elapsed: float = now - start
+
+        self.__self_times[name] += elapsed - callees
+        self.__path_times[path] += elapsed - callees
+        if self.__active:
+            self.__active[-1][4] += elapsed
+
+        # Time spent in recursive calls is already part of the outermost call of the same function
+        self.__depths[name] -= 1
+        if self.__depths[name] <= 0:
+            self.__total_times[name] += elapsed
+
+    def __name(self, token: Token | None) -> str:
+        if token is None:
+            return "<script>"
+
+        return self.__names.get(token, token.lexeme)
+
+    def report(self, file: TextIO) -> None:
+        if self.mode == ProfileMode.SAMPLE:
+            self.__report_samples(file)
+        else:
+            self.__report_trace(file)
+
+    def __report_samples(self, file: TextIO) -> None:
+        total: int = sum(self.__samples.values())
+        print(f"Profile: {total} samples, one every {self.__interval * 1000:g} ms of CPU time", file=file)
+        if total == 0:
+            return
+
+        self_samples: Counter[str] = Counter()
+        total_samples: Counter[str] = Counter()
+        line_samples: Counter[str] = Counter()
+        for stack, count in self.__samples.items():
+            names: list[str] = [self.__name(name) for name, _ in stack]
+            self_samples[names[-1]] += count
+            for name in set(names):
+                total_samples[name] += count
+
+            line: int | None = stack[-1][1]
+            line_samples[f"{names[-1]}:{line if line is not None else '?'}"] += count
+
+        print(f"\n{'function':40} {'self':>8} {'total':>8}", file=file)
+        for name, count in sorted(total_samples.items(), key=lambda item: (-self_samples[item[0]], -item[1])):
+            print(f"{name:40} {self_samples[name] / total:8.1%} {count / total:8.1%}", file=file)
+
+        print(f"\n{'line':40} {'self':>8}", file=file)
+        for location, count in line_samples.most_common():
+            print(f"{location:40} {count / total:8.1%}", file=file)
+
+    def __report_trace(self, file: TextIO) -> None:
+        print(f"Profile: {sum(self.__counts.values()) - self.__counts[None]} calls traced", file=file)
+
+        print(f"\n{'function':40} {'calls':>10} {'self ms':>10} {'total ms':>10}", file=file)
+        for name, self_time in self.__self_times.most_common():
+            print(f"{self.__name(name):40} {self.__counts[name]:10} {self_time * 1000:10.2f} "
+                  f"{self.__total_times[name] * 1000:10.2f}", file=file)
+
+    def write_collapsed(self, file: TextIO) -> None:
+        stacks: Counter[str] = Counter()
+
+        if self.mode == ProfileMode.SAMPLE:
+            for stack, count in self.__samples.items():
+                stacks[";".join(self.__name(name) for name, _ in stack)] += count
+        else:
+            for path, elapsed in self.__path_times.items():
+                stacks[";".join(self.__name(name) for name in path)] += round(elapsed * 1_000_000)
+
+        for stack, weight in stacks.items():
+            if weight > 0:
+                file.write(f"{stack} {weight}\n")
+
+    # Results, for tests and other tools
+
+    def call_counts(self) -> dict[str, int]:
+        return {self.__name(name): count for name, count in self.__counts.items() if name is not None}
+
+    def stacks(self) -> Counter[tuple[str, ...]]:
+        stacks: Counter[tuple[str, ...]] = Counter()
+        for stack, count in self.__samples.items():
+            stacks[tuple(self.__name(name) for name, _ in stack)] += count
+
+        return stacks
+
+
+__all__ = "LoxStack", "CallFrames", "ProfileMode", "Profiler", "nested_code", "token_line", "lox_call", "walk_frames"
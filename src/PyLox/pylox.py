@@ -1,19 +1,66 @@
 import sys
+from enum import Enum
+from pathlib import Path
+from typing import Callable, Iterable, TextIO
 
+from .cache import ProgramCache
+from .closures import ClosureInterpreter
+from .environment import GlobalEnvironment
 from .errors import LoxRuntimeError
 from .interpreter import *
+from .lox_module import LoxModule
+from .lox_native import native_functions
+from .operators import stringify
+from .optimizer import Optimizer
+from .output import Output
 from .parser import Parser
+from .profiler import Profiler
 from .resolver import Resolver
-from .scanner import Scanner
+from .regex_scanner import RegexScanner
+from .stats import Stats
 from .stmt import Stmt
 from .tokenclass import *
+from .vm import VirtualMachine
+
+
+class Engine(Enum):
+    TREE = "tree"
+    CLOSURE = "closure"
+    VM = "vm"
 
 
 class Lox:
-    def __init__(self):
-        self.__interpreter: Interpreter = Interpreter(self)
+    def __init__(self, engine: Engine = Engine.TREE, optimize: bool = False, debug_optimizer: bool = False,
+                 cache: bool = False, search_path: list[str] | None = None, output: TextIO | None = None,
+                 buffer_size: int = Output.DEFAULT_BUFFER_SIZE, profiler: Profiler | None = None,
+                 stats: Stats | None = None):
+        engines: dict[Engine, type] = {
+            Engine.TREE: Interpreter,
+            Engine.CLOSURE: ClosureInterpreter,
+            Engine.VM: VirtualMachine
+        }
+
+        self.__interpreter: Interpreter | ClosureInterpreter | VirtualMachine = engines[engine](self)
         self.had_error: bool = False
         self.had_runtime_error: bool = False
+        # Where "print" writes, sys.stdout unless another file is given
+        self.output: Output = Output(output, buffer_size)
+        # Started and stopped by the caller, the interpreter only tells it about the functions of the programs it runs
+        self.profiler: Profiler | None = profiler
+        if profiler is not None:
+            profiler.attach(self.__interpreter)
+        # Same for the event counters, which the "stats" native reads. The engines count events whenever a Stats object
+        # is started, this one or not
+        self.stats: Stats | None = stats
+
+        self.__optimizer: Optimizer | None = Optimizer(debug_optimizer) if optimize or debug_optimizer else None
+        # Off by default, so that embedding the interpreter (and the test suite) doesn't litter source directories with
+        # cache files. The command line enables it unless told otherwise
+        self.__cache: ProgramCache | None = ProgramCache() if cache else None
+
+        # Modules loaded with "require", keyed by their resolved path, so that every module is executed at most once
+        self.__modules: dict[Path, LoxModule] = {}
+        self.__search_path: list[Path] = [Path(directory) for directory in search_path or []]
 
     def token_error(self, token: Token, message: str) -> None:
         where: str = " at end" if token.type == TokenType.EOF else f" at '{token.lexeme}'"
@@ -23,26 +70,95 @@ class Lox:
         self.__report(line, "", message)
 
     def runtime_error(self, err: LoxRuntimeError) -> None:
+        self.output.flush()
         print(f"Error: {err.message}\n[line {err.token.line}]", file=sys.stderr)
         self.had_runtime_error = True
 
     def __report(self, ln: int, where: str, msg: str) -> None:
+        self.output.flush()
         print(f"[line {ln}] Error{where}: {msg}", file=sys.stderr)
         self.had_error = True
 
-    def __run(self, source: str, mode: OpMode) -> None:
-        tokens: list[Token] = Scanner(source, self).scan_tokens()
+    def __run(self, source: str, mode: OpMode, path: str | None = None) -> None:
+        statements: list[Stmt] | None = self.__prepare(source, path)
+
+        if statements is not None:
+            self.__interpreter.interpret(statements, mode)
+
+    def __prepare(self, source: str, path: str | None) -> list[Stmt] | None:
+        # Programs are cached right after resolution: the optimizer rewrites the tree in place and is an option of the
+        # current run, not a property of the program
+        statements: list[Stmt] | None = None
+        if self.__cache is not None and path is not None:
+            statements = self.__cache.load(path, source)
+
+        if statements is None:
+            statements = self.__compile(source)
+
+            if statements is None:
+                return None
+
+            if self.__cache is not None and path is not None:
+                self.__cache.store(path, source, statements)
+
+        if self.__optimizer is not None:
+            statements = self.__optimizer.optimize(statements)
+
+        if self.profiler is not None:
+            self.profiler.register(statements)
+
+        return statements
+
+    def __compile(self, source: str) -> list[Stmt] | None:
+        tokens: list[Token] = RegexScanner(source, self).scan_tokens()
         statements: list[Stmt] = Parser(tokens, self).parse()
 
         if self.had_error:
-            return
+            return None
 
-        Resolver(self.__interpreter, self).resolve(statements)
+        Resolver(self).resolve(statements)
 
         if self.had_error:
-            return
+            return None
+
+        return statements
+
+    def find_module(self, name: str) -> Path | None:
+        # Modules are looked up relative to the working directory first, then in every directory of the search path.
+        # The ".lox" extension may be omitted
+        candidates: list[Path] = [Path(name)] if name.endswith(".lox") else [Path(name), Path(f"{name}.lox")]
+
+        for directory in [Path(), *self.__search_path]:
+            for candidate in candidates:
+                path: Path = directory / candidate
+                if path.is_file() and path.suffix == ".lox":
+                    return path.resolve()
+
+        return None
+
+    def load_module(self, path: Path) -> LoxModule | None:
+        if path in self.__modules:
+            return self.__modules[path]
+
+        with open(path, "rt", encoding="utf-8") as file:
+            code = file.read()
+
+        statements: list[Stmt] | None = self.__prepare(code, str(path))
+        if statements is None:
+            return None
+
+        # The module is registered before it's executed, so that circular requires get the (partially initialized)
+        # module instead of executing it over and over. A module that fails is forgotten, like in Python
+        module: LoxModule = LoxModule(path.stem, GlobalEnvironment(), native_functions)
+        self.__modules[path] = module
+
+        try:
+            self.__interpreter.interpret_module(statements, module.globals)
+        except LoxRuntimeError:
+            del self.__modules[path]
+            raise
 
-        self.__interpreter.interpret(statements, mode)
+        return module
 
     def run_repl(self) -> None:
         while True:
@@ -53,13 +169,91 @@ class Lox:
                 break
 
             self.__run(line, OpMode.INTERACTIVE)
+            self.output.flush()
             self.had_error = False  # Unset error flag to allow for printing after errors in REPL
 
-    def run_file(self, path: str) -> None:
+    def run_file(self, path: str, stream: bool = False) -> None:
+        with open(path, "rt", encoding="utf-8") as file:
+            if stream:
+                self.run_stream(file)
+                return
+
+            code = file.read()
+
+        try:
+            self.__run(code, OpMode.SCRIPT, path)
+        finally:
+            self.output.flush()
+
+        if self.had_error:
+            sys.exit(65)
+        if self.had_runtime_error:
+            sys.exit(70)
+
+    def run_lines(self, path: str, lines: Iterable[str], print_lines: bool = False) -> None:
+        # Runs a script once for every line of the input, like awk or "perl -n": the line, without its line break, is
+        # in the global variable "line" and its number (from 1) in "lineno". With print_lines, "line" is printed after
+        # every run, changed by the script or not, like "perl -p". The script is prepared only once, and the loop over
+        # the lines runs in Python rather than in Lox
         with open(path, "rt", encoding="utf-8") as file:
             code = file.read()
 
-        self.__run(code, OpMode.SCRIPT)
+        try:
+            statements: list[Stmt] | None = self.__prepare(code, path)
+
+            if statements is not None:
+                self.__run_lines(self.__interpreter.prepare(statements), lines, print_lines)
+        finally:
+            self.output.flush()
+
+        if self.had_error:
+            sys.exit(65)
+        if self.had_runtime_error:
+            sys.exit(70)
+
+    def __run_lines(self, run: Callable[[], None], lines: Iterable[str], print_lines: bool) -> None:
+        global_values: dict[str, object] = self.__interpreter.globals.values
+        write: Callable[[str], None] = self.output.print
+
+        try:
+            for number, text in enumerate(lines, 1):
+                global_values["line"] = text[:-1] if text.endswith("\n") else text
+                global_values["lineno"] = float(number)
+                run()
+
+                if print_lines:
+                    write(stringify(global_values["line"]))
+        except LoxRuntimeError as err:
+            self.runtime_error(err)
+
+    def run_stream(self, lines: Iterable[str]) -> None:
+        # Every top-level statement is resolved and executed as soon as it's parsed, while the rest of the input is
+        # still being read line by line. Memory use depends on the largest statement instead of the whole program, and
+        # piped input starts running at once. Unlike with run_file, though, a syntax error is only found after
+        # everything before it has been executed. Once an error is found, the rest is only parsed to report more errors
+        try:
+            for statement in Parser(RegexScanner(lines, self).tokens(), self).declarations():
+                if self.had_runtime_error:
+                    break
+                if self.had_error:
+                    continue
+
+                statements: list[Stmt] = [statement]
+                Resolver(self).resolve(statements)
+
+                if self.had_error:
+                    continue
+
+                if self.__optimizer is not None:
+                    statements = self.__optimizer.optimize(statements)
+                if self.profiler is not None:
+                    self.profiler.register(statements)
+
+                self.__interpreter.interpret(statements, OpMode.SCRIPT)
+                # Output shows up as the input is executed, one top-level statement at a time
+                self.output.flush()
+        finally:
+            self.output.flush()
 
         if self.had_error:
             sys.exit(65)
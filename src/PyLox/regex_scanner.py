@@ -0,0 +1,138 @@
+import re
+import string
+from typing import Iterable, Iterator
+
+from .tokenclass import *
+
+
+class RegexScanner:
+    # Produces exactly the same tokens and errors as Scanner (which is kept as the reference implementation), but
+    # instead of advancing one character at a time, it splits the source with a single compiled regular expression:
+    # every token, and every run of whitespace and comments, is one match, and the kind of a match is known from its
+    # first character. Only ASCII letters and digits are accepted, as in Scanner, hence no \w and \d
+    __token_pattern: re.Pattern = re.compile(r"""
+          [A-Za-z_][A-Za-z_0-9]*           # identifiers and keywords
+        | (?:[ \t\r\n]|//[^\n]*)+          # whitespace and comments
+        | [!=<>]=? | [(){}[\],.:\-+;*^%/]  # operators
+        | [0-9]+(?:\.[0-9]+)?              # numbers
+        | "[^"]*"?                         # strings, possibly unterminated
+        | .                                # anything else is an unexpected character
+    """, re.VERBOSE | re.DOTALL)
+
+    __identifier_start: frozenset[str] = frozenset(string.ascii_letters + "_")
+    __digits: frozenset[str] = frozenset(string.digits)
+
+    __keywords: dict[str, TokenType] = \
+        {"and": TokenType.AND,
+         "class": TokenType.CLASS,
+         "else": TokenType.ELSE,
+         "false": TokenType.FALSE,
+         "for": TokenType.FOR,
+         "fun": TokenType.FUN,
+         "if": TokenType.IF,
+         "nil": TokenType.NIL,
+         "or": TokenType.OR,
+         "print": TokenType.PRINT,
+         "return": TokenType.RETURN,
+         "super": TokenType.SUPER,
+         "this": TokenType.THIS,
+         "true": TokenType.TRUE,
+         "var": TokenType.VAR,
+         "while": TokenType.WHILE
+         }
+
+    __operators: dict[str, TokenType] = \
+        {"(": TokenType.LEFT_PAREN,
+         ")": TokenType.RIGHT_PAREN,
+         "{": TokenType.LEFT_BRACE,
+         "}": TokenType.RIGHT_BRACE,
+         "[": TokenType.LEFT_BRACKET,
+         "]": TokenType.RIGHT_BRACKET,
+         ":": TokenType.COLON,
+         ",": TokenType.COMMA,
+         ".": TokenType.DOT,
+         "-": TokenType.MINUS,
+         "+": TokenType.PLUS,
+         ";": TokenType.SEMICOLON,
+         "*": TokenType.STAR,
+         "^": TokenType.CARET,
+         "%": TokenType.PERCENT,
+         "/": TokenType.SLASH,
+         "!": TokenType.BANG,
+         "!=": TokenType.BANG_EQUAL,
+         "=": TokenType.EQUAL,
+         "==": TokenType.EQUAL_EQUAL,
+         "<": TokenType.LESS,
+         "<=": TokenType.LESS_EQUAL,
+         ">": TokenType.GREATER,
+         ">=": TokenType.GREATER_EQUAL
+         }
+
+    def __init__(self, source: str | Iterable[str], lox_main):
+        self.__lox_main = lox_main
+        # Either the whole source or its lines, e.g. a file opened in text mode (see tokens)
+        self.__source: str | Iterable[str] = source
+
+    def scan_tokens(self) -> list[Token]:
+        return list(self.tokens())
+
+    def tokens(self) -> Iterator[Token]:
+        # Tokens are produced lazily, one chunk of the source at a time: the whole source if it was given as a string or
+        # a single line otherwise, so that only the current line of a file has to be kept in memory. The only token
+        # that can span several lines is a string, the part of it seen so far is kept until its closing quote is found
+        chunks: Iterable[str] = [self.__source] if isinstance(self.__source, str) else self.__source
+
+        # Keywords and operators are recognized by their text alone
+        fixed_tokens: dict[str, TokenType] = self.__keywords | self.__operators
+        identifier_start: frozenset[str] = self.__identifier_start
+        digits: frozenset[str] = self.__digits
+        line: int = 1
+        string_parts: list[str] = []
+
+        for chunk in chunks:
+            if string_parts:
+                end: int = chunk.find("\"")
+                if end == -1:
+                    string_parts.append(chunk)
+                    continue
+
+                string_parts.append(chunk[:end + 1])
+                text: str = "".join(string_parts)
+                string_parts.clear()
+
+                line += text.count("\n")
+                yield Token(TokenType.STRING, text, text[1:-1], line)
+                chunk = chunk[end + 1:]
+
+            for text in self.__token_pattern.findall(chunk):
+                typ: TokenType | None = fixed_tokens.get(text)
+                if typ is not None:
+                    yield Token(typ, text, None, line)
+                    continue
+
+                first: str = text[0]
+                if first in identifier_start:
+                    yield Token(TokenType.IDENTIFIER, text, None, line)
+                elif first in " \t\r\n/":
+                    line += text.count("\n")
+                elif first in digits:
+                    yield Token(TokenType.NUMBER, text, float(text), line)
+                elif first == "\"":
+                    # A string without its closing quote extends to the end of the chunk, so it's always the last match
+                    if len(text) < 2 or text[-1] != "\"":
+                        string_parts.append(text)
+                    else:
+                        # Like in Scanner, a string token gets the line it ends on
+                        line += text.count("\n")
+                        yield Token(TokenType.STRING, text, text[1:-1], line)
+                else:
+                    self.__lox_main.line_error(line, "Unexpected character.")
+
+        if string_parts:
+            line += "".join(string_parts).count("\n")
+            self.__lox_main.line_error(line, "Unterminated string.")
+
+        yield Token(TokenType.EOF, "", None, line)
+
+
+__all__ = "RegexScanner",
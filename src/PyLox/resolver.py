@@ -20,12 +20,15 @@ class FunctionType(Enum):
 
 
 class Resolver(ExprVisitor, StmtVisitor):
-    def __init__(self, interpreter, lox_main):
+    def __init__(self, lox_main):
         self.__lox_main = lox_main
-        self.__interpreter = interpreter
         self.__scopes: deque[dict[str, bool]] = deque()
+        # Slot index of every local variable within its scope, used by the interpreter to address runtime frames
+        self.__slots: deque[dict[str, int]] = deque()
         self.__current_function: FunctionType = FunctionType.NONE
         self.__current_class: ClassType = ClassType.NONE
+        # Functions and classes declared so far, to tell which blocks they were declared in
+        self.__closures: int = 0
 
     def resolve(self, statements: list[Stmt]) -> None:
         for statement in statements:
@@ -51,6 +54,14 @@ class Resolver(ExprVisitor, StmtVisitor):
     def visit_grouping_expr(self, expr: GroupingExpr) -> None:
         self.__resolve(expr.expression)
 
+    def visit_index_expr(self, expr: IndexExpr) -> None:
+        self.__resolve(expr.obj)
+        self.__resolve(expr.index)
+
+    def visit_list_expr(self, expr: ListExpr) -> None:
+        for element in expr.elements:
+            self.__resolve(element)
+
     @staticmethod
     def visit_literal_expr(expr: LiteralExpr) -> None:
         pass
@@ -59,10 +70,28 @@ class Resolver(ExprVisitor, StmtVisitor):
         self.__resolve(expr.left)
         self.__resolve(expr.right)
 
+    def visit_map_expr(self, expr: MapExpr) -> None:
+        for key, value in zip(expr.keys, expr.values):
+            self.__resolve(key)
+            self.__resolve(value)
+
     def visit_set_expr(self, expr: SetExpr) -> None:
         self.__resolve(expr.value)
         self.__resolve(expr.obj)
 
+    def visit_set_index_expr(self, expr: SetIndexExpr) -> None:
+        self.__resolve(expr.obj)
+        self.__resolve(expr.index)
+        self.__resolve(expr.value)
+
+    def visit_slice_expr(self, expr: SliceExpr) -> None:
+        self.__resolve(expr.obj)
+
+        if expr.start is not None:
+            self.__resolve(expr.start)
+        if expr.end is not None:
+            self.__resolve(expr.end)
+
     def visit_super_expr(self, expr: SuperExpr) -> None:
         if self.__current_class == ClassType.NONE:
             self.__lox_main.token_error(expr.keyword, "Can't use 'super' outside of a class.")
@@ -90,11 +119,16 @@ class Resolver(ExprVisitor, StmtVisitor):
         self.__resolve_local(expr, expr.name)
 
     def visit_block_stmt(self, stmt: BlockStmt) -> None:
+        closures: int = self.__closures
+
         self.__begin_scope()
         self.resolve(stmt.statements)
         self.__end_scope()
 
+        stmt.escapes = self.__closures != closures
+
     def visit_class_stmt(self, stmt: ClassStmt) -> None:
+        self.__closures += 1
         enclosing_class: ClassType = self.__current_class
         self.__current_class = ClassType.CLASS
 
@@ -109,10 +143,10 @@ class Resolver(ExprVisitor, StmtVisitor):
             self.__resolve(stmt.superclass)
 
             self.__begin_scope()
-            self.__scopes[-1] |= {"super": True}
+            self.__declare_implicit("super")
 
         self.__begin_scope()
-        self.__scopes[-1] |= {"this": True}
+        self.__declare_implicit("this")
 
         for method in stmt.methods:
             declaration: FunctionType = \
@@ -130,6 +164,7 @@ class Resolver(ExprVisitor, StmtVisitor):
         self.__resolve(stmt.expression)
 
     def visit_function_stmt(self, stmt: FunctionStmt) -> None:
+        self.__closures += 1
         self.__declare(stmt.name)
         self.__define(stmt.name)
 
@@ -155,6 +190,16 @@ class Resolver(ExprVisitor, StmtVisitor):
 
             self.__resolve(stmt.value)
 
+            # Nothing is left to do in a function after the call whose result it returns, so the engines may make that
+            # call in place of the current one. Parentheses don't change that, so they are dropped around the call
+            value: Expr = stmt.value
+            while type(value) is GroupingExpr:
+                value = value.expression
+
+            if type(value) is CallExpr:
+                stmt.value = value
+                stmt.tail_call = True
+
     def visit_var_stmt(self, stmt: VarStmt) -> None:
         self.__declare(stmt.name)
 
@@ -166,14 +211,19 @@ class Resolver(ExprVisitor, StmtVisitor):
     def visit_while_stmt(self, stmt: WhileStmt) -> None:
         self.__resolve(stmt.condition)
         self.__resolve(stmt.body)
+        if stmt.increment is not None:
+            self.__resolve(stmt.increment)
 
     def __resolve(self, target: Expr | Stmt) -> None:
         target.accept(self)
 
-    def __resolve_local(self, expr: Expr, name: Token) -> None:
+    # Resolution results are stored on the expression itself, so the interpreter gets them without any lookups. If the
+    # variable isn't found in any scope, it's global and the fields stay None
+    def __resolve_local(self, expr: AssignExpr | SuperExpr | ThisExpr | VariableExpr, name: Token) -> None:
         for i in range(len(self.__scopes) - 1, -1, -1):
             if name.lexeme in self.__scopes[i]:
-                self.__interpreter.resolve(expr, len(self.__scopes) - 1 - i)
+                expr.depth = len(self.__scopes) - 1 - i
+                expr.slot = self.__slots[i][name.lexeme]
                 return
 
     def __resolve_function(self, function: FunctionStmt, typ: FunctionType) -> None:
@@ -191,9 +241,11 @@ class Resolver(ExprVisitor, StmtVisitor):
 
     def __begin_scope(self) -> None:
         self.__scopes.append({})
+        self.__slots.append({})
 
     def __end_scope(self) -> None:
         self.__scopes.pop()
+        self.__slots.pop()
 
     def __declare(self, name: Token) -> None:
         if self.__scopes:
@@ -203,9 +255,18 @@ class Resolver(ExprVisitor, StmtVisitor):
 
             scope |= {name.lexeme: False}
 
+            slots: dict[str, int] = self.__slots[-1]
+            if name.lexeme not in slots:
+                slots[name.lexeme] = len(slots)
+
     def __define(self, name: Token) -> None:
         if self.__scopes:
             self.__scopes[-1] |= {name.lexeme: True}
 
+    def __declare_implicit(self, name: str) -> None:
+        # "this" and "super" live alone in scopes of their own, created by the interpreter rather than by declarations
+        self.__scopes[-1] |= {name: True}
+        self.__slots[-1] |= {name: 0}
+
 
 __all__ = "Resolver",
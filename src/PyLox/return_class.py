@@ -1,7 +1,23 @@
-class Return(Exception):
+class Return:
+    # Completion signal of a "return" statement. Statements normally evaluate to None; a "return" makes them evaluate to
+    # an instance of this class instead, which is passed up through enclosing blocks, conditionals and loops until the
+    # function call that is being returned from. This is considerably cheaper than raising an exception
+    __slots__ = "value",
+
     def __init__(self, value: object | None):
-        super().__init__()
         self.value: object | None = value
 
 
-__all__ = "Return",
+class TailCall(Return):
+    # Completion of a "return" statement whose value is a call to a Lox function in tail position (see the Resolver).
+    # The call isn't made by the statement but by the function call being returned from, in place of itself, so that
+    # tail calls don't nest Python frames
+    __slots__ = "function", "arguments"
+
+    def __init__(self, function, arguments: list[object]):
+        super().__init__(None)
+        self.function = function
+        self.arguments: list[object] = arguments
+
+
+__all__ = "Return", "TailCall"
@@ -37,6 +37,9 @@ class Scanner:
              ")": lambda _: TokenType.RIGHT_PAREN,
              "{": lambda _: TokenType.LEFT_BRACE,
              "}": lambda _: TokenType.RIGHT_BRACE,
+             "[": lambda _: TokenType.LEFT_BRACKET,
+             "]": lambda _: TokenType.RIGHT_BRACKET,
+             ":": lambda _: TokenType.COLON,
              ",": lambda _: TokenType.COMMA,
              ".": lambda _: TokenType.DOT,
              "-": lambda _: TokenType.MINUS,
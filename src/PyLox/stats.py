@@ -0,0 +1,40 @@
+# The events counted, the same on every engine:
+# - calls: calls of Lox functions and methods, initializers run by a class call and calls in tail position included
+# - native_calls: calls of native functions
+# - environments: environments created. Unlike the other events, this depends on the engine, which may do without an
+#   environment for a block that declares nothing or reuse one from one iteration of a loop to the next
+# - instances: instances created
+# - binds: methods bound to an instance, by a property access ("obj.method", also when it's called right away) or a
+#   "super" expression, whether or not the engine actually makes a bound method
+# - property_gets, property_sets: property reads ("obj.name", method calls included) and writes ("obj.name = value")
+# - returns: "return" statements executed
+# - operator_dispatches: unary and binary operators applied, whether the engine computes them on a fast path or through
+#   the handlers of operators.py ("and" and "or" are control flow rather than operators)
+EVENTS: tuple[str, ...] = ("calls", "native_calls", "environments", "instances", "binds", "property_gets",
+                           "property_sets", "returns", "operator_dispatches")
+
+# The counts of the Stats object that is counting, None if none is. Every counting point checks it before counting, so
+# that not counting costs a single test per event
+active: dict[str, int] | None = None
+
+
+class Stats:
+    # Counts the events above while started. The engines and the runtime classes count them themselves, behind a test of
+    # "active", so the run that is counted is the same as one that isn't. Only one Stats object counts at a time
+    def __init__(self):
+        self.__counts: dict[str, int] = dict.fromkeys(EVENTS, 0)
+
+    def start(self) -> None:
+        global active
+        active = self.__counts
+
+    def stop(self) -> None:
+        global active
+        if active is self.__counts:
+            active = None
+
+    def counts(self) -> dict[str, int]:
+        return dict(sorted(self.__counts.items()))
+
+
+__all__ = "EVENTS", "Stats"
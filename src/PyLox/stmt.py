@@ -4,12 +4,16 @@ from .expr import Expr, VariableExpr
 from .tokenclass import Token
 
 
+# The "tail_call" field of a "return" statement is set by the Resolver if its value is a call that the enclosing
+# function returns as is. The "escapes" field of a block is set by the Resolver if a function or class is declared
+# within it, whose closure may keep the block's environment alive after the block is done
 class Stmt(ABC):
     @abstractmethod
     def accept(self, visitor): ...
 
 
-# All "visit_<type>_stmt" methods shouldn't produce output since statements don't produce values
+# All "visit_<type>_stmt" methods shouldn't produce output since statements don't produce values. The only exception is
+# the completion signal of a "return" statement, which the interpreter passes up to the enclosing function call
 class StmtVisitor(ABC):
     @abstractmethod
     def visit_block_stmt(self, stmt: Stmt) -> None: ...
@@ -42,6 +46,7 @@ class StmtVisitor(ABC):
 class BlockStmt(Stmt):
     def __init__(self, statements: list[Stmt]):
         self.statements: list[Stmt] = statements
+        self.escapes: bool | None = None
 
     def accept(self, visitor: StmtVisitor):
         return visitor.visit_block_stmt(self)
@@ -87,6 +92,7 @@ class ReturnStmt(Stmt):
     def __init__(self, keyword: Token, value: Expr | None):
         self.keyword: Token = keyword
         self.value: Expr | None = value
+        self.tail_call: bool | None = None
 
     def accept(self, visitor: StmtVisitor):
         return visitor.visit_return_stmt(self)
@@ -101,10 +107,12 @@ class VarStmt(Stmt):
         return visitor.visit_var_stmt(self)
 
 
+# A "for" loop is a "while" loop with an increment, evaluated after the body on every iteration
 class WhileStmt(Stmt):
-    def __init__(self, condition: Expr, body: Stmt):
+    def __init__(self, condition: Expr, body: Stmt, increment: Expr | None = None):
         self.condition: Expr = condition
         self.body: Stmt = body
+        self.increment: Expr | None = increment
 
     def accept(self, visitor: StmtVisitor):
         return visitor.visit_while_stmt(self)
@@ -7,7 +7,10 @@ class TokenType(Enum):
     RIGHT_PAREN = auto()
     LEFT_BRACE = auto()
     RIGHT_BRACE = auto()
+    LEFT_BRACKET = auto()
+    RIGHT_BRACKET = auto()
     CARET = auto()
+    COLON = auto()
     COMMA = auto()
     DOT = auto()
     MINUS = auto()
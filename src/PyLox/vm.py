@@ -0,0 +1,678 @@
+from types import FrameType
+from typing import Callable
+
+from . import stats
+from .bytecode import *
+from .compiler import Compiler
+from .environment import *
+from .errors import LoxRuntimeError, LoxFunctionError
+from .interpreter import OpMode
+from .lox_callable import LoxCallable
+from .lox_class import *
+from .lox_list import LoxList
+from .lox_map import LoxMap
+from .lox_native import *
+from .operators import *
+from .profiler import CallFrames, LoxStack
+from .stmt import Stmt
+from .tokenclass import Token
+
+
+class LoxVMFunction(LoxCallable):
+    __slots__ = "proto", "closure", "globals"
+
+    def __init__(self, proto: FunctionProto, closure: Environment, function_globals: GlobalEnvironment):
+        self.proto: FunctionProto = proto
+        self.closure: Environment = closure
+        # The globals of the module the function was defined in, which may not be those of its caller
+        self.globals: GlobalEnvironment = function_globals
+
+    def bind(self, instance: LoxInstance):
+        environment: Environment = Environment(self.closure)
+        environment.values.append(instance)
+
+        return LoxVMFunction(self.proto, environment, self.globals)
+
+    def call(self, interpreter, arguments: list[object]) -> object:
+        return interpreter.call_function(self, arguments)
+
+    def invoke(self, interpreter, instance: LoxInstance, arguments: list[object]) -> object:
+        return interpreter.call_method(self, instance, arguments)
+
+    def arity(self) -> int:
+        return self.proto.arity
+
+    def __str__(self) -> str:
+        return f"<fn {self.proto.name.lexeme}>"
+
+
+class VirtualMachine:
+    def __init__(self, lox_main):
+        self.lox_main = lox_main
+        self.globals: GlobalEnvironment = GlobalEnvironment()
+        # Whether Lox functions are called within the dispatch loop, or through call_function like natives call them.
+        # The tracing profiler turns it off to see every call as a Python call. Tail calls are always made in the loop,
+        # so that tail recursion still runs in constant stack
+        self.inline_calls: bool = True
+
+        self.__define_natives(native_functions)
+
+    def interpret(self, statements: list[Stmt], mode: OpMode) -> None:
+        script: FunctionProto = Compiler().compile(statements, mode == OpMode.INTERACTIVE)
+
+        try:
+            self.__run(script, self.globals, None, self.globals)
+        except LoxRuntimeError as err:
+            self.lox_main.runtime_error(err)
+
+    def prepare(self, statements: list[Stmt]) -> Callable[[], None]:
+        # Compiles the script once into a function that runs it every time it's called. Errors are left to the caller
+        script: FunctionProto = Compiler().compile(statements, False)
+
+        def run() -> None:
+            self.__run(script, self.globals, None, self.globals)
+
+        return run
+
+    def interpret_module(self, statements: list[Stmt], module_globals: GlobalEnvironment) -> None:
+        # Modules run in a global environment of their own, errors are left to the "require" call that loads them
+        self.__define_natives(native_functions, module_globals)
+        self.__run(Compiler().compile(statements, False), module_globals, None, module_globals)
+
+    def call_function(self, function: LoxVMFunction, arguments: list[object]) -> object:
+        if stats.active is not None:
+            stats.active["calls"] += 1
+
+        environment: Environment = Environment(function.closure)
+        environment.values = list(arguments)
+
+        return self.__run(function.proto, environment, function, function.globals)
+
+    # Same as call_function(method.bind(instance), arguments), without creating the bound method. Initializers return
+    # "this" from their closure, so they still need one
+    def call_method(self, method: LoxVMFunction, instance: LoxInstance, arguments: list[object]) -> object:
+        if method.proto.is_initializer:
+            return self.call_function(method.bind(instance), arguments)
+
+        if stats.active is not None:
+            stats.active["calls"] += 1
+
+        this_environment: Environment = Environment(method.closure)
+        this_environment.values.append(instance)
+        environment: Environment = Environment(this_environment)
+        environment.values = list(arguments)
+
+        return self.__run(method.proto, environment, method, method.globals)
+
+    # Profiling (see profiler.py)
+
+    def lox_stack(self, frame: FrameType | None) -> LoxStack:
+        # Lox calls are frames of the dispatch loop rather than of Python, saved in the "frames" local of __run, which
+        # itself only recurses when Lox code is called from Python (by a native or call_function)
+        runs: list[dict[str, object]] = []
+        while frame is not None:
+            if frame.f_code is VirtualMachine.__run.__code__:
+                runs.append(frame.f_locals)
+            frame = frame.f_back
+
+        stack: LoxStack = []
+        for values in reversed(runs):
+            proto: FunctionProto = values["proto"]
+            for _, _, ip, _, function, _, _ in values.get("frames", ()):
+                # Saved frames resume after the call they made
+                stack.append(self.__location(function.proto if function is not None else proto, ip - 1))
+
+            current: LoxVMFunction | None = values.get("function")
+            stack.append(self.__location(current.proto if current is not None else proto, values.get("ip", 0)))
+
+        if not stack or stack[0][0] is not None:
+            stack.insert(0, (None, None))
+        return stack
+
+    @staticmethod
+    def __location(proto: FunctionProto, ip: int) -> tuple[Token | None, int | None]:
+        lines: list[int] = proto.chunk.lines
+        return proto.name, lines[ip] if ip < len(lines) else None
+
+    def start_tracing(self) -> CallFrames:
+        self.inline_calls = False
+        return {
+            VirtualMachine.call_function.__code__: lambda values: values["function"].proto.name,
+            VirtualMachine.call_method.__code__: lambda values: values["method"].proto.name
+        }
+
+    def stop_tracing(self) -> None:
+        self.inline_calls = True
+
+    def __run(self, proto: FunctionProto, env: Environment | GlobalEnvironment, function: LoxVMFunction | None,
+              globals_: GlobalEnvironment) -> object:
+        # The whole dispatch loop lives in a single function and keeps its state in local variables, which are much
+        # cheaper to access than attributes. Lox calls don't recurse into this method: the state of the caller is
+        # saved on the frame stack and the loop simply continues with the callee's code
+        frames: list[tuple] = []
+        stack: list[object] = []
+        push = stack.append
+        pop = stack.pop
+        write: Callable[[str], None] = self.lox_main.output.print
+        inline_calls: bool = self.inline_calls
+        # The event counts, if they are being counted (see stats.py)
+        counts: dict[str, int] | None = stats.active
+
+        code: list[int] = proto.chunk.code
+        constants: list[object] = proto.chunk.constants
+        ip: int = 0
+        global_values: dict[str, object] = globals_.values
+
+        while True:
+            op: int = code[ip]
+
+            if op == OP_GET_LOCAL:
+                distance: int = code[ip + 1]
+                environment: Environment = env
+                while distance:
+                    environment = environment.enclosing
+                    distance -= 1
+                push(environment.values[code[ip + 2]])
+                ip += 3
+
+            elif op == OP_CONSTANT:
+                push(constants[code[ip + 1]])
+                ip += 2
+
+            elif op == OP_GET_GLOBAL:
+                name: str = constants[code[ip + 1]]
+                if name in global_values:
+                    push(global_values[name])
+                else:
+                    push(globals_.get(constants[code[ip + 2]]))
+                ip += 3
+
+            elif op == OP_POP:
+                pop()
+                ip += 1
+
+            elif op == OP_SET_LOCAL:
+                distance = code[ip + 1]
+                environment = env
+                while distance:
+                    environment = environment.enclosing
+                    distance -= 1
+                environment.values[code[ip + 2]] = stack[-1]
+                ip += 3
+
+            elif op == OP_ADD:
+                if counts is not None:
+                    counts["operator_dispatches"] += 1
+                right: object = pop()
+                left: object = stack[-1]
+                if type(left) is float and type(right) is float:
+                    stack[-1] = left + right
+                else:
+                    stack[-1] = binary_plus_handler(constants[code[ip + 1]], left, right)
+                ip += 2
+
+            elif op == OP_POP_JUMP_IF_FALSE:
+                condition: object = pop()
+                if condition is None or condition is False:
+                    ip = code[ip + 1]
+                else:
+                    ip += 2
+
+            elif op == OP_JUMP:
+                ip = code[ip + 1]
+
+            elif op == OP_LESS:
+                if counts is not None:
+                    counts["operator_dispatches"] += 1
+                right = pop()
+                left = stack[-1]
+                if type(left) is float and type(right) is float:
+                    stack[-1] = left < right
+                else:
+                    stack[-1] = binary_less_handler(constants[code[ip + 1]], left, right)
+                ip += 2
+
+            elif op == OP_SUBTRACT:
+                if counts is not None:
+                    counts["operator_dispatches"] += 1
+                right = pop()
+                left = stack[-1]
+                if type(left) is float and type(right) is float:
+                    stack[-1] = left - right
+                else:
+                    stack[-1] = binary_minus_handler(constants[code[ip + 1]], left, right)
+                ip += 2
+
+            elif op == OP_CALL:
+                arg_count: int = code[ip + 1]
+                ip += 3
+                callee: object = stack[-arg_count - 1]
+
+                if type(callee) is LoxVMFunction and (inline_calls or code[ip] == OP_RETURN):
+                    callee_proto: FunctionProto = callee.proto
+                    if arg_count != callee_proto.arity:
+                        raise LoxRuntimeError(constants[code[ip - 1]],
+                                              f"Expected {callee_proto.arity} arguments but got {arg_count}.")
+
+                    if counts is not None:
+                        counts["calls"] += 1
+
+                    # The arguments are the first slots of the callee's frame
+                    callee_env: Environment = Environment(callee.closure)
+                    callee_env.values = stack[len(stack) - arg_count:]
+                    del stack[-arg_count - 1:]
+
+                    # A call whose result is returned right away is a tail call (see the Resolver): the callee takes
+                    # the place of the current frame instead of being pushed on top of it. The "return" is never run
+                    # then, so it's counted here
+                    if code[ip] != OP_RETURN:
+                        frames.append((code, constants, ip, env, function, globals_, global_values))
+                    elif counts is not None and code[ip + 1]:
+                        counts["returns"] += 1
+                    code, constants, ip = callee_proto.chunk.code, callee_proto.chunk.constants, 0
+                    env, function = callee_env, callee
+
+                    # Functions run with the globals of the module they were defined in
+                    if callee.globals is not globals_:
+                        globals_ = callee.globals
+                        global_values = globals_.values
+
+                elif isinstance(callee, LoxClass):
+                    instance: LoxInstance = LoxInstance(callee)
+                    initializer: LoxCallable | None = callee.find_method("init")
+
+                    if initializer is None:
+                        if arg_count != 0:
+                            raise LoxRuntimeError(constants[code[ip - 1]],
+                                                  f"Expected 0 arguments but got {arg_count}.")
+                        del stack[-arg_count - 1:]
+                        push(instance)
+                    else:
+                        # Initializers always return "this", so the instance doesn't have to be kept around: the
+                        # callee's "return" will put it on the stack in place of the class
+                        stack[-arg_count - 1] = initializer.bind(instance)
+                        ip -= 3
+
+                elif isinstance(callee, LoxCallable):
+                    if arg_count != (arity := callee.arity()):
+                        raise LoxRuntimeError(constants[code[ip - 1]],
+                                              f"Expected {arity} arguments but got {arg_count}.")
+
+                    if counts is not None and isinstance(callee, LoxNativeFunction):
+                        counts["native_calls"] += 1
+
+                    arguments: list[object] = stack[len(stack) - arg_count:]
+                    del stack[-arg_count - 1:]
+                    try:
+                        push(callee.call(self, arguments))
+                    except LoxFunctionError as err:
+                        raise LoxRuntimeError(constants[code[ip - 1]],
+                                              f"in function {err.function}: {err.message}.")
+
+                else:
+                    raise LoxRuntimeError(constants[code[ip - 1]], "Can only call functions and classes.")
+
+            elif op == OP_GET_METHOD:
+                obj = stack[-1]
+                name_token: Token = constants[code[ip + 1]]
+                cache: list = constants[code[ip + 2]]
+
+                if counts is not None:
+                    counts["property_gets"] += 1
+
+                if type(obj) is LoxInstance and obj.shape is not cache[0]:
+                    self.__update_cache(obj.shape, name_token, cache)
+
+                if type(obj) is LoxInstance and cache[1] is None:
+                    method: LoxVMFunction | None = cache[2]
+                    if method is None:
+                        raise LoxRuntimeError(name_token, f"Undefined property '{name_token.lexeme}'.")
+                    if counts is not None:
+                        counts["binds"] += 1
+
+                    # Initializers called explicitly are rare enough to take the ordinary path
+                    if method.proto.is_initializer:
+                        stack[-1] = method.bind(obj)
+                        push(None)
+                    else:
+                        push(method)
+                else:
+                    stack[-1] = self.__get_property(obj, name_token, cache)
+                    push(None)
+                ip += 3
+
+            elif op == OP_CALL_METHOD:
+                # The stack holds either the instance and the unbound method, or the property's value and None
+                arg_count = code[ip + 1]
+                method = stack[-arg_count - 1]
+
+                if method is None:
+                    del stack[-arg_count - 1]
+                    ip += 3
+                elif not inline_calls and code[ip + 6] != OP_RETURN:
+                    if arg_count != method.proto.arity:
+                        raise LoxRuntimeError(constants[code[ip + 2]],
+                                              f"Expected {method.proto.arity} arguments but got {arg_count}.")
+
+                    arguments = stack[len(stack) - arg_count:]
+                    instance = stack[-arg_count - 2]
+                    del stack[-arg_count - 2:]
+                    push(self.call_method(method, instance, arguments))
+                    # Past the OP_CALL following this instruction
+                    ip += 6
+                else:
+                    callee_proto = method.proto
+                    if arg_count != callee_proto.arity:
+                        raise LoxRuntimeError(constants[code[ip + 2]],
+                                              f"Expected {callee_proto.arity} arguments but got {arg_count}.")
+
+                    if counts is not None:
+                        counts["calls"] += 1
+
+                    this_env: Environment = Environment(method.closure)
+                    this_env.values.append(stack[-arg_count - 2])
+                    callee_env = Environment(this_env)
+                    callee_env.values = stack[len(stack) - arg_count:]
+                    del stack[-arg_count - 2:]
+
+                    # The caller resumes after the OP_CALL following this instruction, unless it's a tail call
+                    if code[ip + 6] != OP_RETURN:
+                        frames.append((code, constants, ip + 6, env, function, globals_, global_values))
+                    elif counts is not None and code[ip + 7]:
+                        counts["returns"] += 1
+                    code, constants, ip = callee_proto.chunk.code, callee_proto.chunk.constants, 0
+                    env, function = callee_env, method
+
+                    if method.globals is not globals_:
+                        globals_ = method.globals
+                        global_values = globals_.values
+
+            elif op == OP_RETURN:
+                if counts is not None and code[ip + 1]:
+                    counts["returns"] += 1
+
+                result: object = pop()
+                if function is not None and function.proto.is_initializer:
+                    result = function.closure.values[0]
+
+                if not frames:
+                    return result
+
+                code, constants, ip, env, function, globals_, global_values = frames.pop()
+                push(result)
+
+            elif op == OP_GET_PROPERTY:
+                if counts is not None:
+                    counts["property_gets"] += 1
+
+                obj: object = stack[-1]
+                cache = constants[code[ip + 2]]
+                if type(obj) is LoxInstance and obj.shape is cache[0] and cache[1] is not None:
+                    stack[-1] = obj.values[cache[1]]
+                else:
+                    stack[-1] = self.__get_property(obj, constants[code[ip + 1]], cache)
+                ip += 3
+
+            elif op == OP_SET_GLOBAL:
+                name = constants[code[ip + 1]]
+                if name in global_values:
+                    global_values[name] = stack[-1]
+                else:
+                    globals_.assign(constants[code[ip + 2]], stack[-1])
+                ip += 3
+
+            elif op == OP_PUSH_SCOPE:
+                env = Environment(env)
+                ip += 1
+
+            elif op == OP_POP_SCOPE:
+                env = env.enclosing
+                ip += 1
+
+            elif op == OP_MULTIPLY:
+                if counts is not None:
+                    counts["operator_dispatches"] += 1
+                right = pop()
+                left = stack[-1]
+                if type(left) is float and type(right) is float:
+                    stack[-1] = left * right
+                else:
+                    stack[-1] = binary_star_handler(constants[code[ip + 1]], left, right)
+                ip += 2
+
+            elif op == OP_GREATER:
+                if counts is not None:
+                    counts["operator_dispatches"] += 1
+                right = pop()
+                left = stack[-1]
+                if type(left) is float and type(right) is float:
+                    stack[-1] = left > right
+                else:
+                    stack[-1] = binary_gtr_handler(constants[code[ip + 1]], left, right)
+                ip += 2
+
+            elif op == OP_LESS_EQUAL:
+                if counts is not None:
+                    counts["operator_dispatches"] += 1
+                right = pop()
+                stack[-1] = binary_leq_handler(constants[code[ip + 1]], stack[-1], right)
+                ip += 2
+
+            elif op == OP_GREATER_EQUAL:
+                if counts is not None:
+                    counts["operator_dispatches"] += 1
+                right = pop()
+                stack[-1] = binary_geq_handler(constants[code[ip + 1]], stack[-1], right)
+                ip += 2
+
+            elif op == OP_EQUAL:
+                if counts is not None:
+                    counts["operator_dispatches"] += 1
+                right = pop()
+                stack[-1] = is_equal(stack[-1], right)
+                ip += 1
+
+            elif op == OP_NOT_EQUAL:
+                if counts is not None:
+                    counts["operator_dispatches"] += 1
+                right = pop()
+                stack[-1] = not is_equal(stack[-1], right)
+                ip += 1
+
+            elif op == OP_DIVIDE:
+                if counts is not None:
+                    counts["operator_dispatches"] += 1
+                right = pop()
+                stack[-1] = binary_slash_handler(constants[code[ip + 1]], stack[-1], right)
+                ip += 2
+
+            elif op == OP_MODULO:
+                if counts is not None:
+                    counts["operator_dispatches"] += 1
+                right = pop()
+                stack[-1] = binary_percent_handler(constants[code[ip + 1]], stack[-1], right)
+                ip += 2
+
+            elif op == OP_POWER:
+                if counts is not None:
+                    counts["operator_dispatches"] += 1
+                right = pop()
+                stack[-1] = binary_caret_handler(constants[code[ip + 1]], stack[-1], right)
+                ip += 2
+
+            elif op == OP_NOT:
+                if counts is not None:
+                    counts["operator_dispatches"] += 1
+                stack[-1] = not is_truthy(stack[-1])
+                ip += 1
+
+            elif op == OP_NEGATE:
+                if counts is not None:
+                    counts["operator_dispatches"] += 1
+                stack[-1] = unary_minus_handler(constants[code[ip + 1]], stack[-1])
+                ip += 2
+
+            elif op == OP_NIL:
+                push(None)
+                ip += 1
+
+            elif op == OP_TRUE:
+                push(True)
+                ip += 1
+
+            elif op == OP_FALSE:
+                push(False)
+                ip += 1
+
+            elif op == OP_JUMP_IF_FALSE:
+                if is_truthy(stack[-1]):
+                    ip += 2
+                else:
+                    ip = code[ip + 1]
+
+            elif op == OP_JUMP_IF_TRUE:
+                if is_truthy(stack[-1]):
+                    ip = code[ip + 1]
+                else:
+                    ip += 2
+
+            elif op == OP_DEFINE:
+                env.values.append(pop())
+                ip += 1
+
+            elif op == OP_DEFINE_GLOBAL:
+                global_values[constants[code[ip + 1]]] = pop()
+                ip += 2
+
+            elif op == OP_CHECK_INSTANCE:
+                if not isinstance(stack[-1], LoxInstance):
+                    raise LoxRuntimeError(constants[code[ip + 1]], "Only instances have fields.")
+                ip += 2
+
+            elif op == OP_SET_PROPERTY:
+                value: object = pop()
+                stack[-1].set(constants[code[ip + 1]], value)
+                stack[-1] = value
+
+                if counts is not None:
+                    counts["property_sets"] += 1
+                ip += 2
+
+            elif op == OP_GET_SUPER:
+                method_name: Token = constants[code[ip + 3]]
+                superclass: LoxClass = env.get_at(code[ip + 1], 0)
+                method: LoxVMFunction | None = superclass.find_method(method_name.lexeme)
+
+                if method is None:
+                    raise LoxRuntimeError(method_name, f"Undefined property '{method_name.lexeme}'.")
+                if counts is not None:
+                    counts["binds"] += 1
+
+                push(method.bind(env.get_at(code[ip + 2], 0)))
+                ip += 4
+
+            elif op == OP_PRINT:
+                write(stringify(pop()))
+                ip += 1
+
+            elif op == OP_CLOSURE:
+                push(LoxVMFunction(constants[code[ip + 1]], env, globals_))
+                ip += 2
+
+            elif op == OP_LIST:
+                first: int = len(stack) - code[ip + 1]
+                elements: list[object] = stack[first:]
+                del stack[first:]
+                push(LoxList(elements))
+                ip += 2
+
+            elif op == OP_GET_INDEX:
+                index: object = pop()
+                stack[-1] = get_index(constants[code[ip + 1]], stack[-1], index)
+                ip += 2
+
+            elif op == OP_SET_INDEX:
+                value = pop()
+                index = pop()
+                stack[-1] = set_index(constants[code[ip + 1]], stack[-1], index, value)
+                ip += 2
+
+            elif op == OP_SLICE:
+                end: object = pop()
+                start: object = pop()
+                stack[-1] = get_slice(constants[code[ip + 1]], stack[-1], start, end)
+                ip += 2
+
+            elif op == OP_MAP:
+                # Keys and values alternate on the stack
+                first = len(stack) - 2 * code[ip + 1]
+                entries: dict[object, object] = {LoxMap.to_key(stack[i]): stack[i + 1]
+                                                 for i in range(first, len(stack), 2)}
+                del stack[first:]
+                push(LoxMap(entries))
+                ip += 2
+
+            elif op == OP_CLASS:
+                self.__define_class(constants[code[ip + 1]], env, globals_, stack)
+                ip += 2
+
+            else:
+                raise RuntimeError(f"Unknown opcode {op} at offset {ip}")
+
+    @staticmethod
+    def __get_property(obj: object, name: Token, cache: list) -> object:
+        # Plain instances are handled here to make use of the inline cache, anything else that has properties (i.e.
+        # modules) knows how to look them up itself
+        if type(obj) is LoxInstance:
+            if obj.shape is not cache[0]:
+                VirtualMachine.__update_cache(obj.shape, name, cache)
+
+            if cache[1] is not None:
+                return obj.values[cache[1]]
+            if cache[2] is not None:
+                if stats.active is not None:
+                    stats.active["binds"] += 1
+                return cache[2].bind(obj)
+
+            raise LoxRuntimeError(name, f"Undefined property '{name.lexeme}'.")
+
+        if isinstance(obj, LoxInstance):
+            return obj.get(name)
+
+        raise LoxRuntimeError(name, "Only instances have properties.")
+
+    @staticmethod
+    def __update_cache(shape: Shape, name: Token, cache: list) -> None:
+        # Monomorphic inline cache: every property access remembers the last shape it saw and where the property was
+        # found for it, either the index of a field or a method. A shape belongs to a single class and neither ever
+        # changes, so an entry never goes stale
+        cache[0] = shape
+        cache[1] = shape.indices.get(name.lexeme)
+        cache[2] = shape.klass.find_method(name.lexeme) if cache[1] is None else None
+
+    @staticmethod
+    def __define_class(proto: ClassProto, env: Environment | GlobalEnvironment, globals_: GlobalEnvironment,
+                       stack: list[object]) -> None:
+        superclass: object | None = None
+        if proto.superclass is not None:
+            superclass = stack.pop()
+            if not isinstance(superclass, LoxClass):
+                raise LoxRuntimeError(proto.superclass, "Superclass must be a class.")
+
+        method_env: Environment | GlobalEnvironment = env
+        if superclass is not None:
+            method_env = Environment(env)
+            method_env.values.append(superclass)
+
+        methods: dict[str, LoxVMFunction] = {method.name.lexeme: LoxVMFunction(method, method_env, globals_)
+                                             for method in proto.methods}
+
+        env.define(proto.name.lexeme, LoxClass(proto.name.lexeme, superclass, methods))
+
+    def __define_natives(self, functions, environment: GlobalEnvironment | None = None) -> None:
+        for native in functions:
+            native: LoxNativeFunction = native()
+            (environment or self.globals).define(native.name, native)
+
+
+__all__ = "VirtualMachine", "LoxVMFunction"
@@ -1,10 +1,21 @@
+import fileinput
+import json
+import os
+import signal
+import sys
 from argparse import ArgumentParser
-from PyLox.pylox import Lox
+from PyLox.output import Output
+from PyLox.profiler import ProfileMode, Profiler
+from PyLox.pylox import Engine, Lox
+from PyLox.stats import Stats
 
 
 if __name__ == '__main__':
     options_parser: ArgumentParser = ArgumentParser(prog="pylox.py")
-    options_parser.add_argument("script", nargs="?", default=None)
+    options_parser.add_argument("script", nargs="?", default=None,
+                                help="script to run, or - to read it from the standard input (implies --stream)")
+    options_parser.add_argument("inputs", nargs="*", metavar="input",
+                                help="files to read lines from with -n or -p (default: the standard input)")
     options_parser.add_argument("-i", "--interactive", action="store_true",
                                 help="run in interactive mode after executing a script "
                                      "(if no script is given, does nothing)")
@@ -12,22 +23,122 @@ if __name__ == '__main__':
                                 help="run the specified file before executing another"
                                      " script or entering interactive mode")
     options_parser.add_argument("-l", "--load", metavar="FILE", help="synonym to --execute")
+    options_parser.add_argument("--end", metavar="FILE",
+                                help="run the specified file after the script, e.g. to report totals gathered by -n")
+
+    line_modes = options_parser.add_mutually_exclusive_group()
+    line_modes.add_argument("-n", "--each-line", action="store_true",
+                            help="run the script for every line of input, found in the variable 'line' (its number "
+                                 "is in 'lineno')")
+    line_modes.add_argument("-p", "--print-lines", action="store_true",
+                            help="same as -n, but print 'line' after every run of the script")
+    options_parser.add_argument("--engine", choices=[engine.value for engine in Engine], default=Engine.TREE.value,
+                                help="execution engine to run the code with: the tree-walking interpreter (default), "
+                                     "the closure compiler or the bytecode virtual machine")
+
+    options_parser.add_argument("-O", "--optimize", action="store_true",
+                                help="fold constant expressions and remove unreachable branches before running")
+    options_parser.add_argument("--debug-optimizer", action="store_true",
+                                help="report everything the optimizer folds or removes (implies --optimize)")
+    options_parser.add_argument("--no-cache", action="store_true",
+                                help="don't read or write cached resolved programs in __loxcache__ directories")
+    options_parser.add_argument("--path", metavar="DIR", action="append", default=[],
+                                help="add a directory to search for modules loaded with require (may be repeated, "
+                                     "searched before the directories in LOX_PATH)")
+    options_parser.add_argument("--stream", action="store_true",
+                                help="execute every statement of the script as soon as it's read, instead of reading, "
+                                     "parsing and resolving the whole script first")
+    options_parser.add_argument("--buffer-size", metavar="CHARS", type=int, default=None,
+                                help="characters of printed output to collect before writing them out, 0 to write "
+                                     "every line at once (default: 0 on a terminal, "
+                                     f"{Output.DEFAULT_BUFFER_SIZE} otherwise)")
+    options_parser.add_argument("--profile", choices=[mode.value for mode in ProfileMode], default=None,
+                                help="report where the time goes, by Lox function and line, on the standard error: "
+                                     "'sample' takes samples of the Lox stack at regular intervals, 'trace' counts "
+                                     "and times every call exactly but slows the program down")
+    options_parser.add_argument("--profile-interval", metavar="MS", type=float,
+                                default=Profiler.DEFAULT_INTERVAL * 1000,
+                                help="milliseconds of CPU time between samples with --profile sample (default: "
+                                     f"{Profiler.DEFAULT_INTERVAL * 1000:g})")
+    options_parser.add_argument("--profile-output", metavar="FILE",
+                                help="also write the profiled stacks to FILE in the collapsed format of flame graph "
+                                     "tools (weighted by samples, or by microseconds with --profile trace)")
+    options_parser.add_argument("--stats", metavar="FILE",
+                                help="count calls, environments, instances, property accesses and other events while "
+                                     "the program runs (readable from Lox with stats()), and write the counts as JSON "
+                                     "to FILE at exit, - for the standard error")
 
     options = options_parser.parse_args()
+    line_mode: bool = options.each_line or options.print_lines
+
+    if line_mode and options.script in (None, "-"):
+        options_parser.error("-n and -p need a script file")
+    if options.inputs and not line_mode:
+        options_parser.error("input files are only read with -n or -p")
+    if options.profile == ProfileMode.SAMPLE.value and not hasattr(signal, "setitimer"):
+        options_parser.error("--profile sample isn't supported on this platform, use --profile trace")
+
+    lox_path: list[str] = os.environ.get("LOX_PATH", "").split(os.pathsep)
+    search_path: list[str] = options.path + [directory for directory in lox_path if directory]
+
+    # Someone watching a terminal wants to see every line as soon as it's printed, a pipe or a file doesn't
+    buffer_size: int = options.buffer_size
+    if buffer_size is None:
+        buffer_size = 0 if sys.stdout.isatty() else Output.DEFAULT_BUFFER_SIZE
 
-    lox: Lox = Lox()
+    profiler: Profiler | None = None
+    if options.profile is not None:
+        profiler = Profiler(ProfileMode(options.profile), options.profile_interval / 1000)
+    stats: Stats | None = Stats() if options.stats is not None else None
 
-    # Processing loading options
-    if options.execute is not None:
-        lox.run_file(options.execute)
-    if options.load is not None:
-        lox.run_file(options.load)
+    lox: Lox = Lox(Engine(options.engine), options.optimize, options.debug_optimizer, not options.no_cache,
+                   search_path, buffer_size=buffer_size, profiler=profiler, stats=stats)
+    if profiler is not None:
+        profiler.start()
+    if stats is not None:
+        stats.start()
 
-    # Processing main script (or lack thereof)
-    if options.script is not None:
-        lox.run_file(options.script)
+    try:
+        # Processing loading options
+        if options.execute is not None:
+            lox.run_file(options.execute)
+        if options.load is not None:
+            lox.run_file(options.load)
 
-        if options.interactive:
+        # Processing main script (or lack thereof)
+        if options.script is not None:
+            if line_mode:
+                with fileinput.input(options.inputs or ("-",), encoding="utf-8") as lines:
+                    lox.run_lines(options.script, lines, options.print_lines)
+            elif options.script == "-":
+                lox.run_stream(sys.stdin)
+            else:
+                lox.run_file(options.script, options.stream)
+
+            if options.end is not None:
+                lox.run_file(options.end)
+
+            if options.interactive:
+                lox.run_repl()
+        else:
             lox.run_repl()
-    else:
-        lox.run_repl()
+    finally:
+        # Also when the script fails or is interrupted, the profile of what did run is still of use
+        if stats is not None:
+            stats.stop()
+            lox.output.flush()
+
+            if options.stats == "-":
+                print(json.dumps(stats.counts(), indent=2), file=sys.stderr)
+            else:
+                with open(options.stats, "wt", encoding="utf-8") as file:
+                    json.dump(stats.counts(), file, indent=2)
+
+        if profiler is not None:
+            profiler.stop()
+            lox.output.flush()
+            profiler.report(sys.stderr)
+
+            if options.profile_output is not None:
+                with open(options.profile_output, "wt", encoding="utf-8") as file:
+                    profiler.write_collapsed(file)
@@ -0,0 +1,72 @@
+import shutil
+
+import pytest as pt
+
+from PyLox.cache import CACHE_DIRECTORY
+from PyLox.pylox import Lox
+from PyLox.regex_scanner import RegexScanner
+
+
+@pt.fixture
+def program(tmp_path):
+    path = tmp_path / "program.lox"
+    shutil.copy("cache/program.lox", path)
+    return path
+
+
+def cache_files(program):
+    return list((program.parent / CACHE_DIRECTORY).glob(f"{program.stem}.*.pickle"))
+
+
+def fail_to_scan(*_):
+    raise AssertionError("the source was scanned again")
+
+
+class TestCache:
+    def test_cold_and_warm_start(self, capsys, monkeypatch, program, engine):
+        Lox(engine, cache=True).run_file(str(program))
+        assert capsys.readouterr().out == "Hello, cache!\n55\n"
+        assert len(cache_files(program)) == 1
+
+        monkeypatch.setattr(RegexScanner, "scan_tokens", fail_to_scan)
+        Lox(engine, cache=True).run_file(str(program))
+        assert capsys.readouterr().out == "Hello, cache!\n55\n"
+
+    def test_warm_start_with_optimizer(self, capsys, program, engine):
+        Lox(engine, optimize=True, cache=True).run_file(str(program))
+        Lox(engine, cache=True).run_file(str(program))
+        Lox(engine, optimize=True, cache=True).run_file(str(program))
+        assert capsys.readouterr().out == "Hello, cache!\n55\n" * 3
+
+    def test_source_change_invalidates(self, capsys, program):
+        Lox(cache=True).run_file(str(program))
+        program.write_text('print "changed";\n', encoding="utf-8")
+        Lox(cache=True).run_file(str(program))
+
+        assert capsys.readouterr().out == "Hello, cache!\n55\nchanged\n"
+        assert len(cache_files(program)) == 1
+
+    def test_corrupted_entry_is_ignored(self, capsys, program):
+        Lox(cache=True).run_file(str(program))
+        for path in cache_files(program):
+            path.write_bytes(b"not a pickle")
+
+        Lox(cache=True).run_file(str(program))
+        assert capsys.readouterr().out == "Hello, cache!\n55\n" * 2
+
+    def test_disabled(self, capsys, program):
+        Lox().run_file(str(program))
+
+        assert capsys.readouterr().out == "Hello, cache!\n55\n"
+        assert not (program.parent / CACHE_DIRECTORY).exists()
+
+    def test_errors_are_not_cached(self, capsys, tmp_path):
+        path = tmp_path / "error.lox"
+        path.write_text("print 1 +;\n", encoding="utf-8")
+
+        with pt.raises(SystemExit) as exc:
+            Lox(cache=True).run_file(str(path))
+        assert exc.value.code == 65
+
+        assert capsys.readouterr().err == "[line 1] Error at ';': Expect expression.\n"
+        assert not cache_files(path)
@@ -1,10 +1,16 @@
 import pytest as pt
 
-from PyLox.pylox import Lox
+from PyLox.pylox import Engine, Lox
+
+
+# Every test is run against every execution engine, since they all must behave identically
+@pt.fixture(params=list(Engine), ids=[engine.value for engine in Engine])
+def engine(request):
+    return request.param
 
 
 @pt.fixture
-def lox():
-    interpreter = Lox()
+def lox(engine):
+    interpreter = Lox(engine)
     yield interpreter
     del interpreter
@@ -31,6 +31,16 @@ class TestFields:
         capture = capsys.readouterr().out
         assert capture == "\n".join(["bar value", "baz value"] * 2) + "\n"
 
+    def test_shapes(self, capsys, lox):
+        with pt.raises(SystemExit) as exc:
+            lox.run_file("field/shapes.lox")
+            assert exc.value == 70
+
+        capture = capsys.readouterr()
+        assert capture.out == "\n".join(["0", "0", "1", "10", "2", "20", "3", "30", "other x", "other y", "1", "2", "5",
+                                         "4", "z", "1", "2"]) + "\n"
+        assert capture.err == "Error: Undefined property 'z'.\n[line 44]\n"
+
     def test_method(self, capsys, lox):
         lox.run_file("field/method.lox")
         capture = capsys.readouterr().out
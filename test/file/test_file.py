@@ -0,0 +1,48 @@
+import io
+import sys
+from pathlib import Path
+
+import pytest as pt
+
+runtime_error_settings = [("file/missing.lox", "in function readfile: No such file or directory: 'file/missing.txt'.",
+                           1),
+                          ("file/closed.lox", "in function readline: I/O operation on closed file.", 3),
+                          ("file/bad_mode.lox", "in function open: Expect mode 'r', 'w' or 'a'.", 1),
+                          ("file/not_writable.lox", "in function write: Not writable.", 2)]
+runtime_error_ids = ["missing", "closed", "bad mode", "not writable"]
+
+
+class TestFile:
+    def test_read(self, capsys, lox):
+        lox.run_file("file/read.lox")
+        capture = capsys.readouterr().out
+        assert capture == "\n".join(["string", "33", "first line", "second line", "", "last line"]) + "\n"
+
+    def test_lines(self, capsys, lox):
+        lox.run_file("file/lines.lox")
+        capture = capsys.readouterr().out
+        assert capture == "\n".join(["file", "<file file/data.txt>", "first line", "second line", "", "last line",
+                                     "4", "nil"]) + "\n"
+
+    def test_write(self, capsys, monkeypatch, tmp_path, lox):
+        script = str(Path("file/write.lox").resolve())
+        monkeypatch.chdir(tmp_path)
+        lox.run_file(script)
+        capture = capsys.readouterr().out
+        assert capture == "\n".join(["one", "2one", "", "[3, nil]", "true", "new"]) + "\n"
+        assert (tmp_path / "out.txt").read_text() == "new"
+
+    def test_stdin(self, capsys, monkeypatch, lox):
+        monkeypatch.setattr(sys, "stdin", io.StringIO("header\nrest\nof input"))
+        lox.run_file("file/stdin.lox")
+        capture = capsys.readouterr().out
+        assert capture == "\n".join(["header", "rest", "of input", "nil"]) + "\n"
+
+    @pt.mark.parametrize("path,message,line", runtime_error_settings, ids=runtime_error_ids)
+    def test_runtime_errors(self, capsys, lox, path, message, line):
+        with pt.raises(SystemExit) as exc:
+            lox.run_file(path)
+            assert exc.value == 70
+
+        capture = capsys.readouterr()
+        assert capture.err == f"Error: {message}\n[line {line}]\n"
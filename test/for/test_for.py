@@ -69,3 +69,21 @@ class TestFor:
 
         capture = capsys.readouterr().err
         assert capture == "[line 2] Error at 'var': Expect expression.\n"
+
+    def test_counted(self, capsys, lox):
+        lox.run_file("for/counted.lox")
+
+        expected_val = [3, 2, 1, 0, 5, 6, 7, 0, 1, 2, 9, 8]
+        expected_val = "\n".join([str(i) for i in expected_val]) + "\n"
+
+        capture = capsys.readouterr().out
+        assert capture == expected_val
+
+    def test_counter_not_number(self, capsys, lox):
+        with pt.raises(SystemExit) as exc:
+            lox.run_file("for/counter_not_number.lox")
+            assert exc.value == 70
+
+        capture = capsys.readouterr()
+        assert capture.out == "0\n"
+        assert capture.err == "Error: Operands must be two numbers or two strings.\n[line 1]\n"
@@ -0,0 +1,35 @@
+import pytest as pt
+
+lines = ["first\n", "second\n", "", "last"]
+
+
+class TestLineMode:
+    def test_each_line(self, capsys, lox):
+        lox.run_lines("line_mode/each_line.lox", lines)
+        capture = capsys.readouterr().out
+        assert capture == "\n".join(["1", "first", "2", "second", "3", "", "4", "last"]) + "\n"
+
+    def test_state_between_lines(self, capsys, lox):
+        lox.run_file("line_mode/setup.lox")
+        lox.run_lines("line_mode/totals.lox", lines)
+        lox.run_file("line_mode/report.lox")
+        capture = capsys.readouterr().out
+        assert capture == "\n".join(["15", "second"]) + "\n"
+
+    def test_print_lines(self, capsys, lox):
+        lox.run_lines("line_mode/print_lines.lox", lines, print_lines=True)
+        capture = capsys.readouterr().out
+        assert capture == "\n".join(["first", "<second>", "", "last"]) + "\n"
+
+    def test_no_lines(self, capsys, lox):
+        lox.run_lines("line_mode/each_line.lox", [])
+        assert capsys.readouterr().out == ""
+
+    def test_runtime_error(self, capsys, lox):
+        with pt.raises(SystemExit) as exc:
+            lox.run_lines("line_mode/runtime_error.lox", lines)
+            assert exc.value == 70
+
+        capture = capsys.readouterr()
+        assert capture.out == "first\nsecond\n"
+        assert capture.err == "Error: Operands must be two numbers or two strings.\n[line 2]\n"
@@ -0,0 +1,57 @@
+import pytest as pt
+
+runtime_error_settings = [("list/index_out_of_range.lox", "Index out of range.", 3, "1\n"),
+                          ("list/index_not_integer.lox", "Index must be an integer.", 2, ""),
+                          ("list/index_non_list.lox", "Only lists and vectors can be indexed.", 2, ""),
+                          ("list/slice_bounds.lox", "Slice bounds must be integers.", 2, ""),
+                          ("list/pop_empty.lox", "in function pop: Can't pop from an empty list.", 1, "")]
+runtime_error_ids = ["index out of range", "index not integer", "index non-list", "slice bounds", "pop empty"]
+
+syntax_error_settings = [("list/unterminated.lox", "[line 1] Error at ';': Expect ']' after list elements."),
+                         ("list/slice_assignment.lox", "[line 2] Error at '=': Invalid assignment target.")]
+syntax_error_ids = ["unterminated", "slice assignment"]
+
+
+class TestList:
+    def test_literals(self, capsys, lox):
+        lox.run_file("list/literals.lox")
+        capture = capsys.readouterr().out
+        assert capture == "\n".join(["[]", "[1, 2, 3]", "[a, true, nil, 1.5, [2, [3]]]", "[1, 2, -1]", "list",
+                                     "[1, [2]]", "[1, [...]]"]) + "\n"
+
+    def test_index(self, capsys, lox):
+        lox.run_file("list/index.lox")
+        capture = capsys.readouterr().out
+        assert capture == "\n".join(["a", "c", "c", "a", "B", "[a, B, c]", "[x, B, x]", "32", "[10, 2]", "2",
+                                     "[1, 0]"]) + "\n"
+
+    def test_slice(self, capsys, lox):
+        lox.run_file("list/slice.lox")
+        capture = capsys.readouterr().out
+        assert capture == "\n".join(["[1, 2]", "[0, 1]", "[3, 4]", "[0, 1, 2, 3, 4]", "[3, 4]", "[0]", "[]",
+                                     "[2, 3, 4]", "0", "false"]) + "\n"
+
+    def test_natives(self, capsys, lox):
+        lox.run_file("list/natives.lox")
+        capture = capsys.readouterr().out
+        assert capture == "\n".join(["0", "nil", "[1, two, nil]", "3", "nil", "two", "[1]", "5", "true", "false",
+                                     "false", "truthy"]) + "\n"
+
+    @pt.mark.parametrize("path,message,line,output", runtime_error_settings, ids=runtime_error_ids)
+    def test_runtime_errors(self, capsys, lox, path, message, line, output):
+        with pt.raises(SystemExit) as exc:
+            lox.run_file(path)
+            assert exc.value == 70
+
+        capture = capsys.readouterr()
+        assert capture.out == output
+        assert capture.err == f"Error: {message}\n[line {line}]\n"
+
+    @pt.mark.parametrize("path,message", syntax_error_settings, ids=syntax_error_ids)
+    def test_syntax_errors(self, capsys, lox, path, message):
+        with pt.raises(SystemExit) as exc:
+            lox.run_file(path)
+            assert exc.value == 65
+
+        capture = capsys.readouterr().err
+        assert capture == message + "\n"
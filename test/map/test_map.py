@@ -0,0 +1,43 @@
+import pytest as pt
+
+syntax_error_settings = [("map/missing_colon.lox", "[line 1] Error at '2': Expect ':' after map key."),
+                         ("map/missing_value.lox", "[line 1] Error at ']': Expect expression.")]
+syntax_error_ids = ["missing colon", "missing value"]
+
+
+class TestMap:
+    def test_literals(self, capsys, lox):
+        lox.run_file("map/literals.lox")
+        capture = capsys.readouterr().out
+        assert capture == "\n".join(["[:]", "[a: 1, b: 2]", "[1: one, true: yes, nil: nothing]",
+                                     "[list: [1, 2], map: [nested: true]]", "[a: 2]", "[1: 2, 3: 4]", "map", "[k: v]",
+                                     "[self: [...]]"]) + "\n"
+
+    def test_natives(self, capsys, lox):
+        lox.run_file("map/natives.lox")
+        capture = capsys.readouterr().out
+        assert capture == "\n".join(["3", "nil", "true", "false", "true", "3", "true", "false", "[b, nil]", "[b, nil]",
+                                     "[b, nil, c]"]) + "\n"
+
+    def test_keys(self, capsys, lox):
+        lox.run_file("map/keys.lox")
+        capture = capsys.readouterr().out
+        assert capture == "\n".join(["3", "number", "boolean", "string", "2", "[0, false]", "p", "nil", "list",
+                                     "nil"]) + "\n"
+
+    def test_not_a_map(self, capsys, lox):
+        with pt.raises(SystemExit) as exc:
+            lox.run_file("map/not_a_map.lox")
+            assert exc.value == 70
+
+        capture = capsys.readouterr().err
+        assert capture == "Error: in function get: Expect type 'map'.\n[line 1]\n"
+
+    @pt.mark.parametrize("path,message", syntax_error_settings, ids=syntax_error_ids)
+    def test_syntax_errors(self, capsys, lox, path, message):
+        with pt.raises(SystemExit) as exc:
+            lox.run_file(path)
+            assert exc.value == 65
+
+        capture = capsys.readouterr().err
+        assert capture == message + "\n"
@@ -67,3 +67,27 @@ class TestMethods:
 
         capture = capsys.readouterr().err
         assert capture == "Error: Undefined variable 'method'.\n[line 3]\n"
+
+    def test_polymorphic_call_site(self, capsys, lox):
+        lox.run_file("method/polymorphic_call_site.lox")
+        capture = capsys.readouterr().out
+        assert capture == "A\nA\nB\nB\nA\nA\n" * 2
+
+    def test_field_shadows_method(self, capsys, lox):
+        lox.run_file("method/field_shadows_method.lox")
+        capture = capsys.readouterr().out
+        assert capture == "method\nfield\n" * 2
+
+    def test_call_init_explicitly(self, capsys, lox):
+        lox.run_file("method/call_init_explicitly.lox")
+        capture = capsys.readouterr().out
+        assert capture == "<Foo instance>\n2\n"
+
+    def test_lookup_before_arguments(self, capsys, lox):
+        with pt.raises(SystemExit) as exc:
+            lox.run_file("method/lookup_before_arguments.lox")
+            assert exc.value == 70
+
+        capture = capsys.readouterr()
+        assert capture.out == ""
+        assert capture.err == "Error: Undefined property 'missing'.\n[line 8]\n"
@@ -0,0 +1,52 @@
+import pytest as pt
+
+from PyLox.pylox import Lox
+
+
+class TestModules:
+    def test_load_once(self, capsys, lox):
+        lox.run_file("modules/load_once.lox")
+        capture = capsys.readouterr().out
+        assert capture == "\n".join(["loading counter", "true", "<module counter>", "module", "1", "2", "2"]) + "\n"
+
+    def test_namespaces(self, capsys, lox):
+        lox.run_file("modules/namespaces.lox")
+        capture = capsys.readouterr().out
+        assert capture == "\n".join(["loading counter", "1", "main", "main increment", "11", "42"]) + "\n"
+
+    def test_undefined_member(self, capsys, lox):
+        with pt.raises(SystemExit) as exc:
+            lox.run_file("modules/undefined_member.lox")
+            assert exc.value == 70
+
+        capture = capsys.readouterr()
+        assert capture.out == "loading counter\n"
+        assert capture.err == "Error: Undefined property 'missing'.\n[line 2]\n"
+
+    def test_native_member(self, capsys, lox):
+        with pt.raises(SystemExit) as exc:
+            lox.run_file("modules/native_member.lox")
+            assert exc.value == 70
+
+        capture = capsys.readouterr()
+        assert capture.out == "loading counter\n"
+        assert capture.err == "Error: Undefined property 'clock'.\n[line 2]\n"
+
+    def test_not_found(self, capsys, lox):
+        with pt.raises(SystemExit) as exc:
+            lox.run_file("modules/not_found.lox")
+            assert exc.value == 70
+
+        capture = capsys.readouterr().err
+        assert capture == "Error: in function require: modules/lib/missing not found or is not a valid Lox library.\n" \
+                          "[line 1]\n"
+
+    def test_cycle(self, capsys, lox):
+        lox.run_file("modules/cycle.lox")
+        capture = capsys.readouterr().out
+        assert capture == "a sees b\nb sees a\ntrue\n"
+
+    def test_search_path(self, capsys):
+        Lox(search_path=["modules/lib"]).run_file("modules/search_path.lox")
+        capture = capsys.readouterr().out
+        assert capture == "loading counter\n1\n"
@@ -63,6 +63,11 @@ class TestOperators:
         capture = capsys.readouterr().out
         assert capture == "\n".join(["4", "1"]) + "\n"
 
+    def test_divide_by_zero(self, capsys, lox):
+        lox.run_file("operator/divide_by_zero.lox")
+        capture = capsys.readouterr().out
+        assert capture == "\n".join(["inf", "-inf", "-inf", "nan", "vector[inf, -inf, -inf, nan]", "true"]) + "\n"
+
     def test_multiply(self, capsys, lox):
         lox.run_file("operator/multiply.lox")
         capture = capsys.readouterr().out
@@ -73,6 +78,11 @@ class TestOperators:
         capture = capsys.readouterr().out
         assert capture == "\n".join(["64", "28.9976173063065"]) + "\n"
 
+    def test_power_domain(self, capsys, lox):
+        lox.run_file("operator/power_domain.lox")
+        capture = capsys.readouterr().out
+        assert capture == "\n".join(["nan", "inf", "inf", "-inf", "-512", "vector[nan, inf, inf, -inf, -512]"]) + "\n"
+
     def test_compare(self, capsys, lox):
         lox.run_file("operator/comparison.lox")
 
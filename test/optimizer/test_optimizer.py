@@ -0,0 +1,43 @@
+import pytest as pt
+
+from PyLox.pylox import Lox
+
+
+@pt.fixture
+def optimized_lox(engine):
+    interpreter = Lox(engine, optimize=True)
+    yield interpreter
+    del interpreter
+
+
+class TestOptimizer:
+    def test_folding(self, capsys, optimized_lox):
+        optimized_lox.run_file("optimizer/folding.lox")
+        capture = capsys.readouterr().out
+        assert capture == "\n".join(["7", "2", "concat", "yes", "3", "nan", "true", "false"]) + "\n"
+
+    def test_dead_branches(self, capsys, optimized_lox):
+        optimized_lox.run_file("optimizer/dead_branches.lox")
+        capture = capsys.readouterr().out
+        assert capture == "then\nelse\ndone\n"
+
+    def test_scopes(self, capsys, optimized_lox):
+        optimized_lox.run_file("optimizer/scopes.lox")
+        capture = capsys.readouterr().out
+        assert capture == "outer global\nreassigned\nAB\n"
+
+    def test_runtime_error_not_folded(self, capsys, optimized_lox):
+        with pt.raises(SystemExit) as exc:
+            optimized_lox.run_file("optimizer/runtime_error.lox")
+            assert exc.value == 70
+
+        capture = capsys.readouterr()
+        assert capture.out == "before\n"
+        assert capture.err == "Error: Operands must be two numbers or two strings.\n[line 2]\n"
+
+    def test_debug_report(self, capsys):
+        Lox(debug_optimizer=True).run_file("optimizer/dead_branches.lox")
+        capture = capsys.readouterr().err.splitlines()
+
+        assert "Optimizer: removed the else branch of an 'if' with constant condition true." in capture
+        assert "Optimizer: removed a 'while' loop with constant condition false." in capture
@@ -0,0 +1,48 @@
+import io
+
+import pytest as pt
+
+from PyLox.pylox import Lox
+
+
+class RecordingFile(io.StringIO):
+    # Remembers every write, to tell how the output was split into chunks
+    def __init__(self):
+        super().__init__()
+        self.writes = []
+
+    def write(self, text):
+        self.writes.append(text)
+        return super().write(text)
+
+
+class TestOutput:
+    def test_redirect(self, capsys, engine):
+        file = io.StringIO()
+        Lox(engine, output=file).run_file("output/flush.lox")
+        assert file.getvalue() == "a\nb\nc\n"
+        assert capsys.readouterr().out == ""
+
+    def test_buffered(self, engine):
+        file = RecordingFile()
+        Lox(engine, output=file).run_file("output/flush.lox")
+        assert file.writes == ["a\nb\n", "c\n"]
+
+    def test_unbuffered(self, engine):
+        file = RecordingFile()
+        Lox(engine, output=file, buffer_size=0).run_file("output/flush.lox")
+        assert file.writes == ["a\n", "b\n", "c\n"]
+
+    def test_buffer_size(self, engine):
+        file = RecordingFile()
+        Lox(engine, output=file, buffer_size=3).run_file("output/flush.lox")
+        assert file.writes == ["a\nb\n", "c\n"]
+
+    def test_flushed_on_runtime_error(self, capsys, engine):
+        file = io.StringIO()
+        with pt.raises(SystemExit) as exc:
+            Lox(engine, output=file).run_file("output/runtime_error.lox")
+            assert exc.value == 70
+
+        assert file.getvalue() == "before\n"
+        assert capsys.readouterr().err == "Error: Operands must be two numbers or two strings.\n[line 2]\n"
@@ -0,0 +1,65 @@
+import io
+import re
+
+from PyLox.profiler import ProfileMode, Profiler
+from PyLox.pylox import Lox
+
+
+def profile(engine, mode, path, interval=Profiler.DEFAULT_INTERVAL):
+    profiler = Profiler(mode, interval)
+    output = io.StringIO()
+    lox = Lox(engine, output=output, profiler=profiler)
+
+    profiler.start()
+    try:
+        lox.run_file(path)
+    finally:
+        profiler.stop()
+
+    return profiler, output.getvalue()
+
+
+class TestProfile:
+    def test_trace_calls(self, engine):
+        profiler, output = profile(engine, ProfileMode.TRACE, "profile/calls.lox")
+        assert output == "55\n20\n"
+        assert profiler.call_counts() == {"fib": 177, "Counter.init": 1, "Counter.add": 5, "outer": 1,
+                                          "outer.inner": 5}
+
+    def test_trace_report(self, engine):
+        profiler, _ = profile(engine, ProfileMode.TRACE, "profile/calls.lox")
+        report = io.StringIO()
+        profiler.report(report)
+
+        lines = report.getvalue().splitlines()
+        assert lines[0] == "Profile: 189 calls traced"
+        assert re.fullmatch(r"fib +177 +[\d.]+ +[\d.]+", next(line for line in lines if line.startswith("fib ")))
+
+    def test_trace_collapsed(self, engine):
+        profiler, _ = profile(engine, ProfileMode.TRACE, "profile/calls.lox")
+        collapsed = io.StringIO()
+        profiler.write_collapsed(collapsed)
+
+        stacks = [line.rsplit(" ", 1)[0] for line in collapsed.getvalue().splitlines()]
+        assert all(re.fullmatch(r"\S+ \d+", line) for line in collapsed.getvalue().splitlines())
+        assert "<script>;outer;Counter.add" in stacks
+        assert "<script>;fib;fib;fib" in stacks
+
+    def test_sample(self, engine):
+        profiler, output = profile(engine, ProfileMode.SAMPLE, "profile/spin.lox", 0.0005)
+        assert output == "2666646666700000\n"
+
+        stacks = profiler.stacks()
+        assert stacks[("<script>", "spin")] > 0
+        assert all(stack[0] == "<script>" for stack in stacks)
+
+        report = io.StringIO()
+        profiler.report(report)
+        assert re.search(r"^spin:3 ", report.getvalue(), re.MULTILINE)
+
+    def test_not_profiling(self, capsys, engine):
+        # Nothing is collected until the profiler is started
+        profiler = Profiler(ProfileMode.TRACE)
+        Lox(engine, profiler=profiler).run_file("profile/calls.lox")
+        assert capsys.readouterr().out == "55\n20\n"
+        assert profiler.call_counts() == {}
@@ -0,0 +1,56 @@
+import io
+import random
+from pathlib import Path
+
+import pytest as pt
+
+from PyLox.regex_scanner import RegexScanner
+from PyLox.scanner import Scanner
+
+
+# Stands in for Lox to record the errors reported by a scanner
+class ErrorLog:
+    def __init__(self):
+        self.errors: list[tuple[int, str]] = []
+
+    def line_error(self, line: int, message: str) -> None:
+        self.errors.append((line, message))
+
+
+def scan(scanner_class, source: str):
+    log = ErrorLog()
+    tokens = scanner_class(source, log).scan_tokens()
+    return [(token.type, token.lexeme, token.literal, token.line) for token in tokens], log.errors
+
+
+# Scans the source line by line, the way files are scanned in streaming mode
+def stream_scanner(source: str, log: ErrorLog) -> RegexScanner:
+    return RegexScanner(io.StringIO(source), log)
+
+
+def assert_same_scan(source: str):
+    expected = scan(Scanner, source)
+    assert scan(RegexScanner, source) == expected
+    assert scan(stream_scanner, source) == expected
+
+
+# The RegexScanner must reproduce the tokens and errors of the reference Scanner exactly
+class TestScanner:
+    @pt.mark.parametrize("path", sorted(Path(".").glob("**/*.lox")), ids=str)
+    def test_suite_sources(self, path):
+        assert_same_scan(path.read_text(encoding="utf-8"))
+
+    @pt.mark.parametrize("source", [
+        "", "\n\n", "1.", ".5", "1.2.3", "123abc", "_a1 b_2", "a//b\nc", "/ / /", "//", "!!=== <<=>>= =",
+        "\"multi\nline\" after", "\"unterminated\n", "\"a\n\nb\nc\" d \"e\nf\"\n\"g", "\"\n\"\"\n\"", "\"", "\"\"",
+        "@#$ `~\f\v\0é", "\"a\" @ \"b", "var\tx\r\n= 1;", "a[1:-1] = [b, [c]];"
+    ])
+    def test_edge_cases(self, source):
+        assert_same_scan(source)
+
+    def test_random_sources(self):
+        rng = random.Random(1337)
+        alphabet = "ab_z09.\"/\n \t(){}[],;:+-*^%!=<>#é"
+
+        for _ in range(2000):
+            assert_same_scan("".join(rng.choice(alphabet) for _ in range(rng.randint(0, 40))))
@@ -0,0 +1,59 @@
+import io
+
+from PyLox.pylox import Engine, Lox
+from PyLox.stats import Stats
+
+
+def count(engine, path):
+    stats = Stats()
+    output = io.StringIO()
+    lox = Lox(engine, output=output, stats=stats)
+
+    stats.start()
+    try:
+        lox.run_file(path)
+    finally:
+        stats.stop()
+
+    return stats, output.getvalue()
+
+
+class TestStats:
+    def test_off(self, capsys, lox):
+        lox.run_file("stats/off.lox")
+        assert capsys.readouterr().out == "nil\n"
+
+    def test_from_lox(self, engine):
+        # The call to stats() itself is the only native call so far
+        _, output = count(engine, "stats/events.lox")
+        assert output == "90\n20\n10\n1\n"
+
+    def test_counts(self, engine):
+        stats, _ = count(engine, "stats/engines.lox")
+        counts = stats.counts()
+
+        # How many environments there are depends on the engine
+        assert counts.pop("environments") > 0
+        assert counts == {"binds": 20, "calls": 38, "instances": 5, "native_calls": 9, "operator_dispatches": 85,
+                          "property_gets": 40, "property_sets": 10, "returns": 28}
+
+    def test_same_on_every_engine(self):
+        counts = []
+        for engine in Engine:
+            for path in ["stats/events.lox", "stats/engines.lox", "stats/loop.lox"]:
+                stats, _ = count(engine, path)
+                counts.append({event: number for event, number in stats.counts().items() if event != "environments"})
+
+        assert counts[:3] == counts[3:6] == counts[6:]
+
+    def test_counted_loop(self, engine):
+        stats, output = count(engine, "stats/loop.lox")
+        assert output == "19900\n"
+        assert stats.counts()["operator_dispatches"] == 601
+
+    def test_stopped(self, engine):
+        stats, _ = count(engine, "stats/events.lox")
+        before = stats.counts()
+
+        Lox(engine, output=io.StringIO(), stats=stats).run_file("stats/events.lox")
+        assert stats.counts() == before
@@ -0,0 +1,38 @@
+import pytest as pt
+
+
+class TestStreaming:
+    def test_program(self, capsys, lox):
+        lox.run_file("streaming/program.lox", stream=True)
+        capture = capsys.readouterr().out
+        assert capture == "Hello,\nstreaming\n110\n"
+
+    def test_statements_run_while_reading(self, capsys, lox):
+        def lines():
+            yield "print \"first\";\n"
+            yield "print \"second\";\n"
+            # The first statement is complete once the token after it has been read
+            assert capsys.readouterr().out == "first\n"
+            yield "print \"third\";\n"
+
+        lox.run_stream(lines())
+        assert capsys.readouterr().out == "second\nthird\n"
+
+    def test_syntax_error(self, capsys, lox):
+        with pt.raises(SystemExit) as exc:
+            lox.run_file("streaming/syntax_error.lox", stream=True)
+            assert exc.value == 65
+
+        capture = capsys.readouterr()
+        assert capture.out == "before\n"
+        assert capture.err == "[line 2] Error at ';': Expect expression.\n" \
+                              "[line 4] Error at '=': Expect a variable name.\n"
+
+    def test_runtime_error(self, capsys, lox):
+        with pt.raises(SystemExit) as exc:
+            lox.run_file("streaming/runtime_error.lox", stream=True)
+            assert exc.value == 70
+
+        capture = capsys.readouterr()
+        assert capture.out == "before\n"
+        assert capture.err == "Error: Operands must be two numbers or two strings.\n[line 2]\n"
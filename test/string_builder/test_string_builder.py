@@ -0,0 +1,22 @@
+import pytest as pt
+
+
+class TestStringBuilder:
+    def test_build(self, capsys, lox):
+        lox.run_file("string_builder/build.lox")
+        capture = capsys.readouterr().out
+        assert capture == "\n".join(["stringbuilder", "0", "true", "nil", "abc1.5niltrue", "13", "23",
+                                     "abc1.5niltrue!", "[1, two]", "true"]) + "\n"
+
+    def test_loop(self, capsys, lox):
+        lox.run_file("string_builder/loop.lox")
+        capture = capsys.readouterr().out
+        assert capture == "\n".join(["0, 1, 4, 9, 16", "string", "14"]) + "\n"
+
+    def test_not_a_builder(self, capsys, lox):
+        with pt.raises(SystemExit) as exc:
+            lox.run_file("string_builder/not_a_builder.lox")
+            assert exc.value == 70
+
+        capture = capsys.readouterr().err
+        assert capture == "Error: in function append: Expect type 'stringbuilder'.\n[line 1]\n"
@@ -0,0 +1,41 @@
+import pytest as pt
+
+
+class TestTailCall:
+    def test_deep(self, capsys, lox):
+        lox.run_file("tail_call/deep.lox")
+        capture = capsys.readouterr().out
+        assert capture == "60000\n"
+
+    def test_grouping(self, capsys, lox):
+        lox.run_file("tail_call/grouping.lox")
+        capture = capsys.readouterr().out
+        assert capture == "done\n"
+
+    def test_mutual(self, capsys, lox):
+        lox.run_file("tail_call/mutual.lox")
+        capture = capsys.readouterr().out
+        assert capture == "\n".join(["true", "true"]) + "\n"
+
+    def test_method(self, capsys, lox):
+        lox.run_file("tail_call/method.lox")
+        capture = capsys.readouterr().out
+        assert capture == "\n".join(["a", "a", "b"]) + "\n"
+
+    def test_other_callees(self, capsys, lox):
+        lox.run_file("tail_call/other_callees.lox")
+        capture = capsys.readouterr().out
+        assert capture == "\n".join(["1", "boolean", "2", "inner"]) + "\n"
+
+    def test_module(self, capsys, lox):
+        lox.run_file("tail_call/module.lox")
+        capture = capsys.readouterr().out
+        assert capture == "\n".join(["done", "10000", "main done"]) + "\n"
+
+    def test_arity(self, capsys, lox):
+        with pt.raises(SystemExit) as exc:
+            lox.run_file("tail_call/arity.lox")
+            assert exc.value == 70
+
+        capture = capsys.readouterr().err
+        assert capture == "Error: Expected 2 arguments but got 1.\n[line 6]\n"
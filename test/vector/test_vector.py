@@ -0,0 +1,46 @@
+import pytest as pt
+
+runtime_error_settings = [("vector/length_mismatch.lox", "Vectors must have the same length.", 1),
+                          ("vector/bad_operand.lox", "Operands must be numbers or vectors.", 1),
+                          ("vector/set_non_number.lox", "Vector elements must be numbers.", 2),
+                          ("vector/non_numeric_list.lox", "in function vector: Expect a list of numbers.", 1),
+                          ("vector/domain.lox", "in function log: Math domain error.", 1)]
+runtime_error_ids = ["length mismatch", "bad operand", "set non-number", "non-numeric list", "domain"]
+
+
+class TestVector:
+    def test_create(self, capsys, lox):
+        lox.run_file("vector/create.lox")
+        capture = capsys.readouterr().out
+        assert capture == "\n".join(["vector[1, 2.5, -3]", "vector[0, 0, 0]", "vector[]",
+                                     "vector[0, 0.25, 0.5, 0.75, 1]", "vector[2]", "vector", "vector[4]", "11",
+                                     "vector[1, 2]", "vector[10, 2]", "true", "false", "[vector[1]]"]) + "\n"
+
+    def test_index(self, capsys, lox):
+        lox.run_file("vector/index.lox")
+        capture = capsys.readouterr().out
+        assert capture == "\n".join(["1", "4", "vector[1, 2]", "vector[0, 1]", "7", "vector[0, 1, 2, 7, 4]", "14",
+                                     "0"]) + "\n"
+
+    def test_arithmetic(self, capsys, lox):
+        lox.run_file("vector/arithmetic.lox")
+        capture = capsys.readouterr().out
+        assert capture == "\n".join(["vector[5, 7, 9]", "vector[3, 3, 3]", "vector[4, 10, 18]", "vector[4, 2.5, 2]",
+                                     "vector[1, 4, 9]", "vector[2, 3, 4]", "vector[9, 8, 7]", "vector[2, 4, 6]",
+                                     "vector[6, 3, 2]", "vector[2, 4, 8]", "vector[-1, -2, -3]", "vector[1, 2, 3]",
+                                     "vector[inf, -inf, nan]", "vector[nan, 2]"]) + "\n"
+
+    def test_math(self, capsys, lox):
+        lox.run_file("vector/math.lox")
+        capture = capsys.readouterr().out
+        assert capture == "\n".join(["vector[1, 2.718281828459045]", "vector[1, 1]", "vector[1.5, 2]",
+                                     "vector[1, -2]", "vector[-1, 0, 1]", "true", "1"]) + "\n"
+
+    @pt.mark.parametrize("path,message,line", runtime_error_settings, ids=runtime_error_ids)
+    def test_runtime_errors(self, capsys, lox, path, message, line):
+        with pt.raises(SystemExit) as exc:
+            lox.run_file(path)
+            assert exc.value == 70
+
+        capture = capsys.readouterr()
+        assert capture.err == f"Error: {message}\n[line {line}]\n"
@@ -1,21 +1,35 @@
+-- Fields after a semicolon aren't constructor parameters: they are filled in later (by the resolver, or by the engines
+-- for inline caches) and start as None
+-- Visitor methods are named after the class in snake case, e.g. "visit_set_index_expr" for SetIndexExpr
+function snake_case(class_name)
+    return class_name:gsub("(%l)(%u)", "%1_%2"):lower()
+end
+
 function define_type(file, base_name, class_name, fields)
+    local params, resolved = fields:match "^([^;]*);%s*(.*)$"
+    params = params or fields
+
     file:write("class ", class_name, base_name, "(", base_name, "):\n")
-    file:write("    def __init__(self, ", fields, "):\n")
+    file:write("    def __init__(self, ", params, "):\n")
+
+    -- A parameter may have a default value ("name: Type = value"), which only goes in the signature
+    for val, type in params:gmatch "([%a_]+): ([%[%]%a%s|]+)" do
+        file:write("        self.", val, ": ", (type:gsub("%s+$", "")), " = ", val, "\n")
+    end
 
-    for field in fields:gmatch "([%a_]+: [%[%]%a%s|]+)" do
-        local val = field:match "([%a_]+):"
-        file:write("        self.", field, " = ", val, "\n")
+    for field in (resolved or ""):gmatch "([%a_]+: [%[%]%a%s|]+)" do
+        file:write("        self.", field, " = None\n")
     end
 
     file:write("\n    def accept(self, visitor: ", base_name, "Visitor", "):\n")
-    file:write("        return visitor.visit_", class_name:lower(), "_", base_name:lower(), "(self)\n")
+    file:write("        return visitor.visit_", snake_case(class_name), "_", base_name:lower(), "(self)\n")
     file:write "\n\n"
 end
 
 function define_visitor(file, base_name, class_name)
     local base = base_name:lower()
     file:write "    @abstractmethod\n"
-    file:write("    def visit_", class_name:lower(), "_", base, "(self, ", base, ": ", base_name, "): ...\n\n")
+    file:write("    def visit_", snake_case(class_name), "_", base, "(self, ", base, ": ", base_name, "): ...\n\n")
 end
 
 function define_all(file, exprtypes)
@@ -66,27 +80,33 @@ function define_ast(out_dir, base_name, exprtypes, imports)
     file:close()
 end
 
-exprs = {"Assign   : name: Token, value: Expr",
+exprs = {"Assign   : name: Token, value: Expr; depth: int | None, slot: int | None",
          "Binary   : left: Expr, operator: Token, right: Expr",
          "Call     : callee: Expr, paren: Token, arguments: list[Expr]",
-         "Get      : obj: Expr, name: Token",
+         "Get      : obj: Expr, name: Token; cached_shape: object | None, cached_index: int | None, "
+         .. "cached_method: object | None",
          "Grouping : expression: Expr",
+         "Index    : obj: Expr, bracket: Token, index: Expr",
+         "List     : elements: list[Expr]",
          "Literal  : value: object",
          "Logical  : left: Expr, operator: Token, right: Expr",
+         "Map      : keys: list[Expr], values: list[Expr]",
          "Set      : obj: Expr, name: Token, value: Expr",
-         "Super    : keyword: Token, method: Token",
-         "This     : keyword: Token",
+         "SetIndex : obj: Expr, bracket: Token, index: Expr, value: Expr",
+         "Slice    : obj: Expr, bracket: Token, start: Expr | None, end: Expr | None",
+         "Super    : keyword: Token, method: Token; depth: int | None, slot: int | None",
+         "This     : keyword: Token; depth: int | None, slot: int | None",
          "Unary    : operator: Token, right: Expr",
-         "Variable : name: Token"}
+         "Variable : name: Token; depth: int | None, slot: int | None"}
 define_ast("../src/PyLox", "Expr", exprs, {{from = ".tokenclass", what = "Token"}})
 
-stmts = {"Block      : statements: list[Stmt]",
+stmts = {"Block      : statements: list[Stmt]; escapes: bool | None",
          "Expression : expression: Expr",
          "Function   : name: Token, params: list[Token], body: list[Stmt]",
          "If         : condition: Expr, if_clause: Stmt, else_clause: Stmt | None",
          "Print      : expression: Expr",
-         "Return     : keyword: Token, value: Expr | None",
+         "Return     : keyword: Token, value: Expr | None; tail_call: bool | None",
          "Var        : name: Token, initializer: Expr",
-         "While      : condition: Expr, body: Stmt",
+         "While      : condition: Expr, body: Stmt, increment: Expr | None = None",
          "Class      : name: Token, superclass: VariableExpr | None, methods: list[FunctionStmt]"}
 define_ast("../src/PyLox", "Stmt", stmts, {{from = ".expr", what = "Expr, VariableExpr"}, {from = ".tokenclass", what = "Token"}})